@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user, login_user, logout_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from models import User, Course, Enrollment, StudentProfile, InstructorProfile, db
+from services.calendar_cache import calendar_cache
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SelectField, TextAreaField, SubmitField, BooleanField, IntegerField, DateField, TimeField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, Optional
@@ -352,6 +353,7 @@ def delete_user(user_id):
     # Delete user
     db.session.delete(user)
     db.session.commit()
+    calendar_cache.invalidate_user(user_id)
     
     flash('User deleted successfully!', 'success')
     return redirect(url_for('admin.users'))
@@ -511,6 +513,8 @@ def edit_course(course_id):
         course.enable_assignments = form.enable_assignments.data
         
         db.session.commit()
+        # Meeting days, time and dates feed every enrolled student's calendar
+        calendar_cache.invalidate_course(course_id)
         flash('Course updated successfully!', 'success')
         return redirect(url_for('admin.courses'))
     
@@ -534,6 +538,7 @@ def delete_course(course_id):
     # Delete course (cascade will handle related records)
     db.session.delete(course)
     db.session.commit()
+    calendar_cache.invalidate_course(course_id)
     
     flash('Course deleted successfully!', 'success')
     return redirect(url_for('admin.courses'))
@@ -547,6 +552,7 @@ def toggle_course_status(course_id):
     
     course.is_active = not course.is_active
     db.session.commit()
+    calendar_cache.invalidate_course(course_id)
     
     status = 'activated' if course.is_active else 'deactivated'
     flash(f'Course {status} successfully!', 'success')
@@ -569,6 +575,49 @@ def api_stats():
     }
     return jsonify(stats)
 
+# Behavior log writer queue depth and flush latency
+@admin_bp.route('/api/behavior_writer_stats')
+@login_required
+@admin_required
+def api_behavior_writer_stats():
+    from services.emotion_log_writer import emotion_log_writer
+    return jsonify(emotion_log_writer.stats())
+
+# Frame analysis pool backpressure statistics
+@admin_bp.route('/api/frame_analysis_stats')
+@login_required
+@admin_required
+def api_frame_analysis_stats():
+    from services.frame_analysis_service import frame_executor
+    return jsonify(frame_executor.stats())
+
+# Columnar export of behavior samples for offline analysis
+@admin_bp.route('/api/export/emotion_logs')
+@login_required
+@admin_required
+def api_export_emotion_logs():
+    from flask import Response, stream_with_context
+    from services import behavior_export
+    from services.behavior_history import parse_date
+    fmt = request.args.get('format', 'arrow')
+    if fmt not in behavior_export.EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(behavior_export.EXPORT_FORMATS)}"}), 400
+    if behavior_export.pa is None:
+        return jsonify({'error': 'pyarrow is not installed on this server'}), 501
+    try:
+        filters = {
+            'start': parse_date(request.args.get('start')),
+            'end': parse_date(request.args.get('end'), end_of_day=True),
+            'student_id': request.args.get('student_id', type=int),
+            'course_id': request.args.get('course_id', type=int),
+        }
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates'}), 400
+    chunks = behavior_export.stream_export(fmt, quiz_windows=request.args.get('quiz_windows') == '1', **filters)
+    extension = 'arrows' if fmt == 'arrow' else 'parquet'
+    return Response(stream_with_context(chunks), mimetype=behavior_export.MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename=emotion_logs.{extension}'})
+
 # User Search API
 @admin_bp.route('/api/users/search')
 @login_required
@@ -5,21 +5,34 @@ from flask_migrate import Migrate
 from flask_wtf import CSRFProtect
 from flask_wtf.csrf import CSRFError
 from config import Config
-from models import db, Enrollment, EmotionLog
+from models import db
+from services.emotion_log_writer import emotion_log_writer
+from services.emotion_log_partitions import emotion_log_partitions
+from services.emotion_retention import emotion_log_retention
+from services.behavior_window_cache import behavior_window_cache
+from services.behavior_push import behavior_push, student_room, BEHAVIOR_UPDATE_EVENT
+from services.frame_analysis_service import frame_executor
+from services.activity_store import activity_store
+from services.calendar_cache import calendar_cache
+from services.quiz_plan import quiz_plans
+from services.answer_keys import answer_keys
+from services.answer_buffer import answer_buffer
+from services.adaptive_engine import adaptive_engine
+from services.quiz_analytics import quiz_analytics
+from student_behavior_monitor import behavior_scheduler
+from services.behavior_scoring import behavior_scorer
+from services.socketio_scaling import socketio_options, socketio_url_for, check_worker_config
+from services.capture_service import negotiate_capture, capture_rate_controller
 import json
 import os
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room
 import eventlet
 
 # Disable DeepFace and related imports to avoid TensorFlow issues
 DEEPFACE_AVAILABLE = False
 print("Warning: DeepFace not available. Emotion analysis will be disabled.")
 
-# Keep necessary imports
-import numpy as np
-import base64
 from datetime import datetime
-import math
 
 # Extensions
 login_manager = LoginManager()
@@ -31,8 +44,6 @@ socketio = SocketIO(async_mode='eventlet')
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-user_activity = {}
-
 def from_json_filter(s):
     try:
         return json.loads(s)
@@ -59,6 +70,74 @@ def basename_filter(p):
     except Exception:
         return p
 
+def store_frame_result(student_id, result):
+    """Forward a finished frame analysis to the batched EmotionLog writer."""
+    now = datetime.utcnow()
+    capture_rate_controller.record(student_id, result['focus_score'])
+    emotion_log_writer.update_enrollment(student_id, latest_focus_score=result['focus_score'], last_updated=now)
+    emotion_log_writer.enqueue(
+        student_id,
+        focus_score=result['focus_score'],
+        frustration_score=result['frustration_score'],
+        source_data_summary=result.get('source_data_summary'),
+        source_data=result.get('source_data'),
+        timestamp=now,
+        resolve_course=True
+    )
+
+def register_media_handlers(sio, executor):
+    """
+    Register the activity and media_frame handlers on a Socket.IO server.
+
+    create_app() registers them on the app's server with the shared frame
+    executor; load_test_workers.py registers them on each of its workers.
+    """
+    def frame_ack(status):
+        # The ack tells the client how often and how large to capture next
+        ack = {'status': 'received', 'analysis': status}
+        if current_user.is_authenticated:
+            ack['capture'] = capture_rate_controller.suggest(current_user.id, executor.load())
+        return ack
+
+    # WebSocket handler for video/audio data
+    @sio.on('activity_data')
+    def handle_activity_data(data):
+        if current_user.is_authenticated:
+            activity_store.set(current_user.id, data)
+
+    @sio.on('media_frame')
+    def handle_media_frame(data):
+        # Analysis runs in the frame executor; this handler only enqueues and acknowledges
+        status = 'ignored'
+        if 'video' in data and current_user.is_authenticated:
+            activity = activity_store.get(current_user.id)
+            status = executor.submit(current_user.id, {
+                'video': data['video'],
+                'activity': activity,
+                'deepface': DEEPFACE_AVAILABLE
+            })
+        emit('ack', frame_ack(status))
+
+    @sio.on('capture_hello')
+    def handle_capture_hello(data):
+        # Agree on frame format, size and rate with the client
+        config = negotiate_capture(data, executor.load())
+        emit('capture_config', config)
+
+    @sio.on('media_frame_bin')
+    def handle_media_frame_bin(data):
+        # Raw JPEG/WebP bytes; decoded with np.frombuffer on the received buffer, no base64 step
+        status = 'ignored'
+        frame = data.get('frame') if isinstance(data, dict) else None
+        if isinstance(frame, (bytes, bytearray)) and current_user.is_authenticated:
+            activity = activity_store.get(current_user.id)
+            status = executor.submit(current_user.id, {
+                'video': frame,
+                'activity': activity,
+                'deepface': DEEPFACE_AVAILABLE
+            })
+        emit('ack', frame_ack(status))
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
@@ -70,7 +149,21 @@ def create_app():
     csrf.init_app(app)
     app.config['WTF_CSRF_ENABLED'] = True
     app.config['WTF_CSRF_SECRET_KEY'] = app.config['SECRET_KEY']
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(app, cors_allowed_origins="*", **socketio_options(app.config))
+    check_worker_config(app)
+    emotion_log_writer.init_app(app)
+    emotion_log_partitions.init_app(app)
+    emotion_log_retention.init_app(app)
+    behavior_window_cache.init_app(app)
+    behavior_push.init_app(app, socketio)
+    calendar_cache.init_app(app)
+    quiz_plans.init_app(app)
+    answer_keys.init_app(app)
+    answer_buffer.init_app(app)
+    adaptive_engine.init_app(app)
+    quiz_analytics.init_app(app)
+    activity_store.init_app(app)
+    frame_executor.init_app(app, result_handler=store_frame_result, socketio=socketio)
 
     from models import User
     @login_manager.user_loader
@@ -81,6 +174,13 @@ def create_app():
     def inject_csrf_token():
         from flask_wtf.csrf import generate_csrf
         return dict(csrf_token=generate_csrf)
+
+    @app.context_processor
+    def inject_socketio_url():
+        # Sticky routing: each student's socket always goes to the same worker
+        if current_user.is_authenticated:
+            return dict(socketio_url=socketio_url_for(app.config, current_user.id))
+        return dict(socketio_url='')
         
     @app.errorhandler(CSRFError)
     def handle_csrf_error(e):
@@ -90,6 +190,9 @@ def create_app():
     app.jinja_env.filters['uploads_rel'] = uploads_rel_filter
     app.jinja_env.filters['basename'] = basename_filter
 
+    behavior_scorer.init_app(app)
+    behavior_scheduler.init_app(app)
+
     # Import and register blueprints
     from auth.views import auth_bp
     from student.views import student_bp
@@ -190,144 +293,16 @@ def create_app():
             return send_from_directory(UPLOAD_FOLDER, filename, mimetype='text/vtt')
         return send_from_directory(UPLOAD_FOLDER, filename)
 
-    # WebSocket handler for video/audio data
-    @socketio.on('activity_data')
-    def handle_activity_data(data):
+    @socketio.on('connect')
+    def handle_connect():
+        # Each student's tabs share a room that receives behavior_update pushes
         if current_user.is_authenticated:
-            user_activity[current_user.id] = data
+            join_room(student_room(current_user.id))
+            payload = behavior_push.current_payload(current_user.id)
+            if payload is not None:
+                emit(BEHAVIOR_UPDATE_EVENT, payload)
 
-    @socketio.on('media_frame')
-    def handle_media_frame(data):
-        print('Received media frame:', list(data.keys()))
-        if 'video' in data:
-            try:
-                base64_img = data['video']
-                if base64_img.startswith('data:image'):
-                    base64_img = base64_img.split(',')[1]
-                img_data = base64.b64decode(base64_img)
-                np_arr = np.frombuffer(img_data, np.uint8)
-                img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-                # Analyze with DeepFace (get face region)
-                if DEEPFACE_AVAILABLE:
-                    result = DeepFace.analyze(img, actions=['emotion'], enforce_detection=False)
-                    print('DeepFace result:', result)
-                    if isinstance(result, list):
-                        result = result[0]
-                    face_region = result.get('region', {})
-                    focus_score = 0.0
-                    if face_region and all(k in face_region for k in ['x', 'y', 'w', 'h']):
-                        # Crop face
-                        x, y, w, h = face_region['x'], face_region['y'], face_region['w'], face_region['h']
-                        face_img = img[y:y+h, x:x+w]
-                        # Use OpenCV to detect landmarks and estimate head pose
-                        gray = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
-                        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-                        faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-                        if len(faces) > 0:
-                            # Use the first detected face
-                            (fx, fy, fw, fh) = faces[0]
-                            face_roi = gray[fy:fy+fh, fx:fx+fw]
-                            # Use OpenCV's built-in facial landmark detector (if available)
-                            # For simplicity, use the center of the face as the nose tip
-                            image_points = np.array([
-                                (fw/2, fh/2),     # Nose tip (approx)
-                                (fw/2, fh*0.8),   # Chin (approx)
-                                (fw*0.3, fh*0.35), # Left eye left corner (approx)
-                                (fw*0.7, fh*0.35), # Right eye right corner (approx)
-                                (fw*0.25, fh*0.7), # Left mouth corner (approx)
-                                (fw*0.75, fh*0.7)  # Right mouth corner (approx)
-                            ], dtype='double')
-                            # 3D model points.
-                            model_points = np.array([
-                                (0.0, 0.0, 0.0),             # Nose tip
-                                (0.0, -63.6, -12.5),         # Chin
-                                (-43.3, 32.7, -26.0),        # Left eye left corner
-                                (43.3, 32.7, -26.0),         # Right eye right corner
-                                (-28.9, -28.9, -24.1),       # Left mouth corner
-                                (28.9, -28.9, -24.1)         # Right mouth corner
-                            ])
-                            # Camera internals
-                            size = face_roi.shape
-                            focal_length = size[1]
-                            center = (size[1]/2, size[0]/2)
-                            camera_matrix = np.array(
-                                [[focal_length, 0, center[0]],
-                                 [0, focal_length, center[1]],
-                                 [0, 0, 1]], dtype = 'double'
-                            )
-                            dist_coeffs = np.zeros((4,1)) # Assuming no lens distortion
-                            success, rotation_vector, translation_vector = cv2.solvePnP(model_points, image_points, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE)
-                            if success:
-                                # Convert rotation vector to Euler angles
-                                rmat, _ = cv2.Rodrigues(rotation_vector)
-                                sy = math.sqrt(rmat[0,0] * rmat[0,0] +  rmat[1,0] * rmat[1,0])
-                                singular = sy < 1e-6
-                                if not singular:
-                                    x_angle = math.atan2(rmat[2,1], rmat[2,2])
-                                    y_angle = math.atan2(-rmat[2,0], sy)
-                                    z_angle = math.atan2(rmat[1,0], rmat[0,0])
-                                else:
-                                    x_angle = math.atan2(-rmat[1,2], rmat[1,1])
-                                    y_angle = math.atan2(-rmat[2,0], sy)
-                                    z_angle = 0
-                                # Convert radians to degrees
-                                pitch = math.degrees(x_angle)
-                                yaw = math.degrees(y_angle)
-                                roll = math.degrees(z_angle)
-                                print(f'Head pose: pitch={pitch:.2f}, yaw={yaw:.2f}, roll={roll:.2f}')
-                                # If yaw and pitch are within ±20 degrees, consider focused
-                                if abs(yaw) < 20 and abs(pitch) < 20:
-                                    focus_score = 1.0
-                                else:
-                                    focus_score = 0.0
-                    # Combine with recent activity
-                    activity = user_activity.get(current_user.id, {'keypresses': 0, 'mousemoves': 0, 'mouseclicks': 0})
-                    activity_score = min(1.0, (activity['keypresses'] + activity['mousemoves'] + activity['mouseclicks']) / 20.0)
-                    final_focus_score = 0.7 * focus_score + 0.3 * activity_score
-                    # Update DB for current user (if available)
-                    if current_user.is_authenticated:
-                        enrollment = Enrollment.query.filter_by(student_id=current_user.id).first()
-                        if enrollment:
-                            enrollment.latest_focus_score = final_focus_score
-                            enrollment.last_updated = datetime.utcnow()
-                            db.session.commit()
-                            elog = EmotionLog(
-                                student_id=current_user.id,
-                                course_id=enrollment.course_id,
-                                timestamp=datetime.utcnow(),
-                                focus_score=final_focus_score,
-                                frustration_score=result['emotion'].get('angry', 0) / 100.0,
-                                source_data_summary=str(result['emotion'])
-                            )
-                            db.session.add(elog)
-                            db.session.commit()
-                            print('Updated enrollment and logged emotion for user:', current_user.id)
-                else:
-                    # DeepFace not available, use basic activity tracking only
-                    activity = user_activity.get(current_user.id, {'keypresses': 0, 'mousemoves': 0, 'mouseclicks': 0})
-                    activity_score = min(1.0, (activity['keypresses'] + activity['mousemoves'] + activity['mouseclicks']) / 20.0)
-                    final_focus_score = activity_score
-                    # Update DB for current user (if available)
-                    if current_user.is_authenticated:
-                        enrollment = Enrollment.query.filter_by(student_id=current_user.id).first()
-                        if enrollment:
-                            enrollment.latest_focus_score = final_focus_score
-                            enrollment.last_updated = datetime.utcnow()
-                            db.session.commit()
-                            elog = EmotionLog(
-                                student_id=current_user.id,
-                                course_id=enrollment.course_id,
-                                timestamp=datetime.utcnow(),
-                                focus_score=final_focus_score,
-                                frustration_score=0.0,  # No emotion data available
-                                source_data_summary="DeepFace not available - activity only"
-                            )
-                            db.session.add(elog)
-                            db.session.commit()
-                            print('Updated enrollment with activity-only data for user:', current_user.id)
-            except Exception as e:
-                print('Media processing error:', e)
-        emit('ack', {'status': 'received'})
+    register_media_handlers(socketio, frame_executor)
 
     return app
 
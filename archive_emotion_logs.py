@@ -0,0 +1,19 @@
+from app import create_app
+from models import db
+from services.emotion_log_partitions import emotion_log_partitions
+
+app = create_app()
+
+with app.app_context():
+    if not emotion_log_partitions.enabled:
+        print('EMOTION_LOG_PARTITIONING is off; nothing to archive.')
+    else:
+        cutoff = emotion_log_partitions.hot_cutoff()
+        print(f'Archiving emotion logs older than {cutoff:%Y-%m-%d}...')
+        try:
+            moved = emotion_log_partitions.archive()
+            print(f'Moved {moved} rows into monthly partitions.')
+            print('Partitions:', ', '.join(emotion_log_partitions.existing_partitions(refresh=True)) or 'none')
+        except Exception as e:
+            db.session.rollback()
+            print(f'Error archiving emotion logs: {e}')
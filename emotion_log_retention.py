@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Apply the EmotionLog raw-data TTL.
+
+Folds expired raw rows into the minute/hour/day rollups, deletes them in
+bounded batches and reports rows reclaimed and time taken. Defaults come
+from EMOTION_LOG_RAW_TTL_DAYS and EMOTION_LOG_RETENTION_BATCH; minute and
+hour rollups are then pruned past EMOTION_LOG_ROLLUP_TTL_DAYS.
+
+Example:
+    python emotion_log_retention.py --ttl-days 14 --dry-run
+"""
+import argparse
+
+from app import create_app
+from models import db
+from services.emotion_retention import emotion_log_retention
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold and delete EmotionLog rows older than the retention TTL.')
+    parser.add_argument('--ttl-days', type=int, default=None, help='Override EMOTION_LOG_RAW_TTL_DAYS')
+    parser.add_argument('--batch-size', type=int, default=None, help='Rows deleted per transaction')
+    parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+    parser.add_argument('--dry-run', action='store_true', help='Only count expired rows')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.batch_size:
+            emotion_log_retention.batch_size = args.batch_size
+        try:
+            report = emotion_log_retention.run(ttl_days=args.ttl_days, max_batches=args.max_batches,
+                                               dry_run=args.dry_run)
+        except Exception as e:
+            db.session.rollback()
+            print(f'Error applying EmotionLog retention: {e}')
+            return 1
+
+    print(f"Cutoff: {report['cutoff']}")
+    if report['dry_run']:
+        print(f"Expired rows: {report['expired']} ({report['unrolled']} not yet rolled up)")
+        print(f"Expired rollups: {report['expired_rollups']}")
+    else:
+        print(f"Rows folded into rollups: {report['folded']}")
+        print(f"Rows reclaimed: {report['deleted']} in {report['batches']} batches")
+        print(f"Partitions dropped: {report['partitions_dropped']}")
+        print(f"Rollups pruned: {report['rollups_pruned']}")
+    print(f"Time taken: {report['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
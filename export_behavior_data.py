@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Export EmotionLog samples to Arrow IPC or Parquet for offline analysis.
+
+Rows are read in id-ordered chunks (main table and any archive partitions)
+and written batch by batch, so memory stays bounded by --chunk-size. With
+--quiz-windows each sample is tagged with the quiz submission it fell in.
+
+Example:
+    python export_behavior_data.py --out semester.parquet --start 2024-01-01 --quiz-windows
+
+    import pyarrow.parquet as pq
+    df = pq.read_table('semester.parquet').to_pandas()
+"""
+import argparse
+import time
+
+from app import create_app
+from services.behavior_export import write_export, EXPORT_FORMATS, DEFAULT_CHUNK_SIZE
+from services.behavior_history import parse_date
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export EmotionLog samples in a columnar format.')
+    parser.add_argument('--out', required=True, help='Output file path')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default=None,
+                        help='Output format (default: from the file extension, else parquet)')
+    parser.add_argument('--start', default=None, help='Earliest sample date (YYYY-MM-DD)')
+    parser.add_argument('--end', default=None, help='Latest sample date (YYYY-MM-DD, inclusive)')
+    parser.add_argument('--student-id', type=int, default=None)
+    parser.add_argument('--course-id', type=int, default=None)
+    parser.add_argument('--quiz-windows', action='store_true', help='Add quiz_submission_id and quiz_id columns')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per record batch')
+    args = parser.parse_args()
+
+    fmt = args.format or ('arrow' if args.out.endswith(('.arrow', '.arrows', '.feather')) else 'parquet')
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        try:
+            result = write_export(args.out, fmt=fmt, quiz_windows=args.quiz_windows,
+                                  start=parse_date(args.start), end=parse_date(args.end, end_of_day=True),
+                                  student_id=args.student_id, course_id=args.course_id,
+                                  chunk_size=args.chunk_size)
+        except Exception as e:
+            print(f'Error exporting behavior data: {e}')
+            return 1
+
+    print(f"Exported {result['rows']} rows to {result['path']} ({fmt})")
+    print(f"Time taken: {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,5 +1,6 @@
 from app import create_app
 from models import EmotionLog, User, db
+from services.emotion_encoding import encode_monitor
 from datetime import datetime, timedelta
 import random
 import json
@@ -59,7 +60,7 @@ def generate_sample_logs(user_id, num_logs=10):
                 timestamp=timestamp,
                 focus_score=focus_score,
                 frustration_score=frustration_score,
-                source_data_summary=str(source_data)
+                source_data=encode_monitor(source_data)
             )
             
             db.session.add(log)
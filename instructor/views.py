@@ -17,6 +17,10 @@ from datetime import datetime
 import requests
 from services.tts_service import TTSService
 from services.subtitle_service import SubtitleService
+from services.calendar_service import calendar_items as build_calendar_items
+from services.calendar_cache import calendar_cache, feed_response, FEED_FORMATS
+from services.answer_keys import answer_keys, regrade_quiz
+from services.quiz_analytics import quiz_analytics
 from app import csrf
 
 instructor_bp = Blueprint('instructor', __name__, url_prefix='/instructor')
@@ -513,87 +517,26 @@ def calendar():
     instructor_courses = Course.query.filter_by(instructor_id=current_user.id).all()
     course_ids = [course.id for course in instructor_courses]
     
-    # Fetch all events created by the instructor
-    events = Event.query.filter_by(user_id=current_user.id).order_by(Event.event_date).all()
-    
-    # Fetch all meetings for instructor's courses
-    meetings = Meeting.query.filter(Meeting.course_id.in_(course_ids)).order_by(Meeting.scheduled_time).all()
-    
-    # Fetch all assignments for instructor's courses
-    assignments = Assignment.query.filter(Assignment.course_id.in_(course_ids)).order_by(Assignment.due_date).all()
-    
-    # Fetch all quizzes for instructor's courses
-    quizzes = Quiz.query.filter(Quiz.course_id.in_(course_ids)).order_by(Quiz.start_time).all()
-    
-    # Combine all calendar items
-    calendar_items = []
-    
-    # Add events
-    for event in events:
-        calendar_items.append({
-            'id': event.id,
-            'title': event.title,
-            'description': event.description,
-            'date': event.event_date,
-            'type': 'event',
-            'course_name': None,
-            'color': 'primary'
-        })
-    
-    # Add meetings
-    for meeting in meetings:
-        course = Course.query.get(meeting.course_id)
-        calendar_items.append({
-            'id': meeting.id,
-            'title': meeting.title,
-            'description': meeting.description,
-            'date': meeting.scheduled_time,
-            'type': 'meeting',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'success',
-            'meeting_link': meeting.meeting_link
-        })
-    
-    # Add assignments
-    for assignment in assignments:
-        course = Course.query.get(assignment.course_id)
-        calendar_items.append({
-            'id': assignment.id,
-            'title': f"Assignment: {assignment.title}",
-            'description': assignment.instructions,
-            'date': assignment.due_date,
-            'type': 'assignment',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'warning',
-            'points': assignment.points
-        })
-    
-    # Add quizzes
-    for quiz in quizzes:
-        course = Course.query.get(quiz.course_id)
-        calendar_items.append({
-            'id': quiz.id,
-            'title': f"Quiz: {quiz.title}",
-            'description': quiz.description,
-            'date': quiz.start_time,
-            'type': 'quiz',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'info',
-            'end_time': quiz.end_time,
-            'time_limit': quiz.time_limit
-        })
-    
-    # Sort all items by date
-    calendar_items.sort(key=lambda x: x['date'])
+    # Instructor's own events plus everything scheduled in their courses, sorted by date
+    calendar_items = _calendar_entry(course_ids).items
     
     return render_template('calendar.html', 
                          calendar_items=calendar_items,
-                         events=events,
-                         meetings=meetings,
-                         assignments=assignments,
-                         quizzes=quizzes,
                          courses=instructor_courses)
 
+def _calendar_entry(course_ids):
+    return calendar_cache.get(current_user.id, course_ids,
+                              lambda: build_calendar_items(course_ids, event_user_id=current_user.id,
+                                                           order=('event', 'meeting', 'assignment', 'quiz')))
+
+@instructor_bp.route('/calendar/feed.<fmt>')
+@login_required
+def calendar_feed(fmt):
+    if fmt not in FEED_FORMATS:
+        return jsonify({'error': 'Unknown feed format'}), 404
+    course_ids = [row.id for row in db.session.query(Course.id).filter_by(instructor_id=current_user.id)]
+    return feed_response(_calendar_entry(course_ids), fmt, 'My Teaching')
+
 @instructor_bp.route('/history')
 @login_required
 def history():
@@ -630,6 +573,7 @@ def delete_course(course_id):
         return redirect(url_for('instructor.courses'))
     db.session.delete(course)
     db.session.commit()
+    calendar_cache.invalidate_course(course_id)
     flash('Course deleted successfully.', 'success')
     return redirect(url_for('instructor.courses'))
 
@@ -793,6 +737,7 @@ def create_quiz(course_id):
             )
             db.session.add(quiz)
             db.session.commit()
+            calendar_cache.invalidate_course(course_id)
             flash('Quiz created successfully!', 'success')
             return redirect(url_for('instructor.manage_course', course_id=course_id))
         except ValueError as e:
@@ -844,6 +789,7 @@ def create_meeting(course_id):
         )
         db.session.add(meeting)
         db.session.commit()
+        calendar_cache.invalidate_course(course.id)
         flash('Meeting created successfully!', 'success')
         return redirect(url_for('instructor.manage_course', course_id=course.id))
     return render_template('create_meeting.html', form=form, course=course)
@@ -877,6 +823,7 @@ def create_event():
         )
         db.session.add(event)
         db.session.commit()
+        calendar_cache.invalidate_events()
         flash('Event created successfully!', 'success')
         return redirect(url_for('instructor.calendar'))
     return render_template('create_event.html', form=form)
@@ -887,6 +834,7 @@ def delete_event(event_id):
     event = Event.query.filter_by(id=event_id, user_id=current_user.id).first_or_404()
     db.session.delete(event)
     db.session.commit()
+    calendar_cache.invalidate_events()
     flash('Event deleted successfully.', 'success')
     return redirect(url_for('instructor.calendar'))
 
@@ -931,6 +879,7 @@ def add_question(course_id, quiz_id):
         )
         db.session.add(question)
         db.session.commit()
+        answer_keys.invalidate(quiz.id)
         flash('Question added!', 'success')
         return redirect(url_for('instructor.manage_quiz', course_id=course_id, quiz_id=quiz.id))
     return render_template('add_edit_question.html', form=form, course=course, quiz=quiz, action='Add')
@@ -964,6 +913,8 @@ def edit_question(course_id, quiz_id, question_id):
         question.correct_answer = form.correct_answer.data
         question.difficulty = form.difficulty.data
         db.session.commit()
+        answer_keys.invalidate(quiz.id)
+        quiz_analytics.invalidate(quiz.id)
         flash('Question updated!', 'success')
         return redirect(url_for('instructor.manage_quiz', course_id=course_id, quiz_id=quiz.id))
     return render_template('add_edit_question.html', form=form, course=course, quiz=quiz, action='Edit')
@@ -977,9 +928,25 @@ def delete_question(course_id, quiz_id, question_id):
     question = Question.query.get_or_404(question_id)
     db.session.delete(question)
     db.session.commit()
+    answer_keys.invalidate(quiz_id)
+    quiz_analytics.invalidate(quiz_id)
     flash('Question deleted.', 'info')
     return redirect(url_for('instructor.manage_quiz', course_id=course_id, quiz_id=quiz_id))
 
+@instructor_bp.route('/courses/<int:course_id>/quiz/<int:quiz_id>/regrade', methods=['POST'])
+@login_required
+def regrade_quiz_submissions(course_id, quiz_id):
+    # Check if instructor owns the course
+    course = Course.query.filter_by(id=course_id, instructor_id=current_user.id).first_or_404()
+    quiz = Quiz.query.filter_by(id=quiz_id, course_id=course_id).first_or_404()
+    answer_keys.invalidate(quiz.id)
+    result = regrade_quiz(quiz.id)
+    quiz_analytics.invalidate(quiz.id)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(result)
+    flash(f"Regraded {result['submissions_rescored']} submissions; {result['answers_changed']} answers changed.", 'success')
+    return redirect(url_for('instructor.manage_quiz', course_id=course_id, quiz_id=quiz_id))
+
 @instructor_bp.route('/courses/<int:course_id>/delete_module/<int:module_id>', methods=['POST'])
 @login_required
 def delete_module(course_id, module_id):
@@ -1005,6 +972,7 @@ def delete_quiz(course_id, quiz_id):
     # Now delete the quiz (questions will be deleted automatically due to cascade)
     db.session.delete(quiz)
     db.session.commit()
+    calendar_cache.invalidate_course(course_id)
     flash('Quiz deleted.', 'info')
     return redirect(url_for('instructor.manage_course', course_id=course_id))
 
@@ -1014,6 +982,7 @@ def delete_assignment(course_id, assignment_id):
     assignment = Assignment.query.get_or_404(assignment_id)
     db.session.delete(assignment)
     db.session.commit()
+    calendar_cache.invalidate_course(course_id)
     flash('Assignment deleted.', 'info')
     return redirect(url_for('instructor.manage_course', course_id=course_id))
 
@@ -1041,6 +1010,7 @@ def delete_meeting(course_id, meeting_id):
     meeting = Meeting.query.get_or_404(meeting_id)
     db.session.delete(meeting)
     db.session.commit()
+    calendar_cache.invalidate_course(course_id)
     flash('Meeting deleted.', 'info')
     return redirect(url_for('instructor.manage_course', course_id=course_id))
 
@@ -1072,6 +1042,7 @@ def create_assignment(course_id):
             )
             db.session.add(assignment)
             db.session.commit()
+            calendar_cache.invalidate_course(course.id)
             flash('Assignment created successfully!', 'success')
             return redirect(url_for('instructor.manage_course', course_id=course.id))
         except ValueError:
@@ -1111,77 +1082,17 @@ def quiz_results(course_id, quiz_id):
     course = Course.query.filter_by(id=course_id, instructor_id=current_user.id).first_or_404()
     quiz = Quiz.query.filter_by(id=quiz_id, course_id=course_id).first_or_404()
     
-    # Get all submissions for this quiz
-    submissions = QuizSubmission.query.filter_by(quiz_id=quiz_id).all()
-    
-    # Calculate statistics
-    total_submissions = len(submissions)
-    if total_submissions > 0:
-        avg_score = sum(sub.score for sub in submissions) / total_submissions
-        highest_score = max(sub.score for sub in submissions)
-        lowest_score = min(sub.score for sub in submissions)
-    else:
-        avg_score = highest_score = lowest_score = 0
-    
-    # Get behavior statistics
-    behavior_stats = []
-    for submission in submissions:
-        student = submission.student
-        
-        # Get behavior data during quiz
-        behavior_logs = EmotionLog.query.filter(
-            EmotionLog.student_id == student.id,
-            EmotionLog.timestamp >= submission.start_time,
-            EmotionLog.timestamp <= submission.end_time
-        ).all()
-        
-        avg_focus = 0
-        avg_frustration = 0
-        
-        if behavior_logs:
-            avg_focus = sum(log.focus_score for log in behavior_logs) / len(behavior_logs)
-            avg_frustration = sum(log.frustration_score for log in behavior_logs) / len(behavior_logs)
-        
-        # Calculate difficulty breakdown
-        easy_questions = [answer for answer in submission.answers if answer.question.difficulty == 'Easy']
-        medium_questions = [answer for answer in submission.answers if answer.question.difficulty == 'Medium']
-        hard_questions = [answer for answer in submission.answers if answer.question.difficulty == 'Hard']
-        
-        easy_correct = sum(1 for answer in easy_questions if answer.is_correct)
-        medium_correct = sum(1 for answer in medium_questions if answer.is_correct)
-        hard_correct = sum(1 for answer in hard_questions if answer.is_correct)
-        
-        # Calculate time taken
-        time_taken = submission.end_time - submission.start_time
-        time_taken_minutes = round(time_taken.total_seconds() / 60, 1)
-        
-        behavior_stats.append({
-            'student': student,
-            'submission': submission,
-            'avg_focus_percent': round(avg_focus * 100, 1),
-            'avg_frustration_percent': round(avg_frustration * 100, 1),
-            'easy_questions_count': len(easy_questions),
-            'medium_questions_count': len(medium_questions),
-            'hard_questions_count': len(hard_questions),
-            'easy_correct_count': easy_correct,
-            'medium_correct_count': medium_correct,
-            'hard_correct_count': hard_correct,
-            'time_taken_minutes': time_taken_minutes,
-            'total_questions': len(submission.answers),
-            'correct_answers_count': sum(1 for answer in submission.answers if answer.is_correct)
-        })
-    
-    # Sort by score (highest first)
-    behavior_stats.sort(key=lambda x: x['submission'].score, reverse=True)
+    # Per-student behavior and difficulty breakdowns, cached until a submission lands
+    analytics = quiz_analytics.get(quiz_id)
     
     return render_template('instructor/quiz_results.html',
                          course=course,
                          quiz=quiz,
-                         behavior_stats=behavior_stats,
-                         total_submissions=total_submissions,
-                         avg_score=round(avg_score, 1),
-                         highest_score=round(highest_score, 1),
-                         lowest_score=round(lowest_score, 1))
+                         behavior_stats=analytics.stats,
+                         total_submissions=analytics.total_submissions,
+                         avg_score=analytics.avg_score,
+                         highest_score=analytics.highest_score,
+                         lowest_score=analytics.lowest_score)
 
 @instructor_bp.route('/courses/<int:course_id>/quiz/<int:quiz_id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -1203,6 +1114,7 @@ def edit_quiz(course_id, quiz_id):
             quiz.end_time = end_time
             
             db.session.commit()
+            calendar_cache.invalidate_course(course_id)
             flash('Quiz updated successfully!', 'success')
             return redirect(url_for('instructor.manage_quiz', course_id=course_id, quiz_id=quiz.id))
         except ValueError:
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Load test for multi-worker Socket.IO media_frame handling.
+
+For each worker count 1..N, starts that many Flask-SocketIO app workers,
+each with its own frame executor and the real handlers from
+register_media_handlers(), all sharing one message queue channel.
+Simulated students run in separate client processes, connect to the
+worker socketio_url_for() picks for them, send media_frame events back to
+back and wait for each ack. Finished analyses are emitted to the student's
+room through the queue as behavior_update events, so the report also shows
+how many pushes made it back across workers.
+
+Two modes:
+
+* --message-queue redis://... (or any Kombu URL): every worker is its own
+  OS process, as in a real deployment, and the speedup column shows how
+  the media_frame ack rate scales as workers are added.
+* No --message-queue: workers are threads in this process on the
+  LocalQueueManager stand-in, which cannot cross processes. They share one
+  interpreter, so this mode only checks routing, queue fan-out and
+  backpressure, and no speedup is reported.
+
+Only Socket.IO state is routed by WorkerRing; see PROCESS_LOCAL_STATE in
+services/socketio_scaling.py for the HTTP-side state that also needs
+sticky routing in a real deployment.
+
+Example:
+    python load_test_workers.py --max-workers 4 --students 40 --seconds 10 \
+        --message-queue redis://localhost:6379/0
+"""
+import argparse
+import base64
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+from collections import Counter
+
+import socketio as socketio_client
+from flask import Flask, request
+from flask_login import LoginManager, UserMixin
+from flask_socketio import SocketIO, join_room
+from werkzeug.serving import make_server
+
+from app import register_media_handlers
+from services.behavior_push import BEHAVIOR_UPDATE_EVENT, student_room
+from services.frame_analysis_service import FrameAnalysisExecutor
+from services.socketio_scaling import LocalQueueManager, socketio_url_for
+
+# Spawn, not fork: in-process workers already have server threads running
+mp = multiprocessing.get_context('spawn')
+
+
+class LoadTestUser(UserMixin):
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Worker:
+    """One Socket.IO app worker: its own server, frame executor and HTTP listener."""
+
+    def __init__(self, name, port, channel, analysis_workers, message_queue=None):
+        self.name = name
+        self.port = port
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.connections = Counter()
+
+        self.app = Flask(name)
+        self.app.config['SECRET_KEY'] = 'load-test'
+        login_manager = LoginManager(self.app)
+
+        @login_manager.request_loader
+        def load_student(req):
+            # Students identify themselves in the connect URL; no DB needed
+            student_id = req.args.get('student')
+            return LoadTestUser(int(student_id)) if student_id else None
+
+        if message_queue:
+            self.socketio = SocketIO(self.app, async_mode='threading', message_queue=message_queue, channel=channel)
+        else:
+            self.socketio = SocketIO(self.app, async_mode='threading',
+                                     client_manager=LocalQueueManager(channel=channel))
+        self.executor = FrameAnalysisExecutor(mode='thread', max_workers=analysis_workers,
+                                              result_handler=self.push_result)
+        self.executor.socketio = self.socketio
+
+        @self.socketio.on('connect')
+        def handle_connect():
+            student_id = int(request.args['student'])
+            self.connections[student_id] += 1
+            join_room(student_room(student_id))
+
+        register_media_handlers(self.socketio, self.executor)
+        self.server = make_server('127.0.0.1', self.port, self.app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def push_result(self, student_id, result):
+        # Published through the queue; whichever worker holds the room delivers it
+        self.socketio.emit(BEHAVIOR_UPDATE_EVENT, {'latest_focus': result['focus_score']},
+                           to=student_room(student_id))
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.executor.shutdown(wait=False)
+
+
+def worker_main(name, port, channel, analysis_workers, message_queue, ready, stop, reports):
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    worker = Worker(name, port, channel, analysis_workers, message_queue)
+    worker.start()
+    ready.set()
+    stop.wait()
+    reports.put((worker.url, dict(worker.connections)))
+    worker.stop()
+
+
+class Student:
+    """A browser stand-in that sends one frame at a time and waits for its ack."""
+
+    def __init__(self, student_id, url, frame):
+        self.student_id = student_id
+        self.url = url
+        self.frame = frame
+        self.acks = 0
+        self.statuses = Counter()
+        self.updates = 0
+        self._acked = threading.Event()
+        self.client = socketio_client.Client(reconnection=False)
+        self.client.on('ack', self.on_ack)
+        self.client.on(BEHAVIOR_UPDATE_EVENT, self.on_update)
+
+    def on_ack(self, data):
+        self.acks += 1
+        self.statuses[data.get('analysis')] += 1
+        self._acked.set()
+
+    def on_update(self, data):
+        self.updates += 1
+
+    def connect(self):
+        self.client.connect(f'{self.url}?student={self.student_id}', wait_timeout=10)
+
+    def run(self, deadline):
+        activity = {'keypresses': self.student_id % 7, 'mousemoves': 3, 'mouseclicks': 1}
+        self.client.emit('activity_data', activity)
+        while time.perf_counter() < deadline:
+            self._acked.clear()
+            self.client.emit('media_frame', {'video': self.frame})
+            if not self._acked.wait(5):
+                break
+
+    def disconnect(self):
+        self.client.disconnect()
+
+
+def client_main(routes, frame, seconds, connected, go, results):
+    """Run a share of the students in this process and report their totals."""
+    clients = [Student(student_id, url, frame) for student_id, url in routes]
+    for client in clients:
+        client.connect()
+    connected.release()
+    go.wait()
+
+    started = time.perf_counter()
+    deadline = started + seconds
+    threads = [threading.Thread(target=client.run, args=(deadline,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    time.sleep(0.5)  # Let the last results travel through the queue
+
+    results.put({
+        'acks': sum(client.acks for client in clients),
+        'updates': sum(client.updates for client in clients),
+        'rejected': sum(client.statuses['rejected'] for client in clients),
+        'routes': [(client.student_id, client.url) for client in clients],
+        'elapsed': elapsed,
+    })
+    for client in clients:
+        client.disconnect()
+
+
+def run(worker_count, students, seconds, analysis_workers, frame, client_processes, message_queue=None):
+    channel = f'load-test-{worker_count}-{os.getpid()}'
+    ports = [free_port() for _ in range(worker_count)]
+    names = [f'worker-{i}' for i in range(worker_count)]
+    stop = mp.Event()
+    reports = mp.Queue()
+
+    if message_queue:
+        processes = []
+        for name, port in zip(names, ports):
+            ready = mp.Event()
+            process = mp.Process(target=worker_main, daemon=True,
+                                              args=(name, port, channel, analysis_workers, message_queue,
+                                                    ready, stop, reports))
+            process.start()
+            ready.wait(30)
+            processes.append(process)
+    else:
+        workers = [Worker(name, port, channel, analysis_workers) for name, port in zip(names, ports)]
+        for worker in workers:
+            worker.start()
+    urls = [f'http://127.0.0.1:{port}' for port in ports]
+    config = {'SOCKETIO_WORKER_URLS': urls}
+
+    routes = [(student_id, socketio_url_for(config, student_id)) for student_id in range(1, students + 1)]
+    connected = mp.Semaphore(0)
+    go = mp.Event()
+    results = mp.Queue()
+    shares = [routes[i::client_processes] for i in range(client_processes) if routes[i::client_processes]]
+    clients = [mp.Process(target=client_main, args=(share, frame, seconds, connected, go, results))
+               for share in shares]
+    for process in clients:
+        process.start()
+    for _ in clients:
+        connected.acquire()
+    go.set()
+    totals = [results.get() for _ in clients]
+    for process in clients:
+        process.join()
+
+    if message_queue:
+        stop.set()
+        connections = dict(reports.get() for _ in processes)
+        for process in processes:
+            process.join(10)
+    else:
+        connections = {worker.url: dict(worker.connections) for worker in workers}
+        for worker in workers:
+            worker.stop()
+        LocalQueueManager.reset(channel)
+
+    sent_to = [route for total in totals for route in total['routes']]
+    return {
+        'acks': sum(total['acks'] for total in totals),
+        'updates': sum(total['updates'] for total in totals),
+        'rejected': sum(total['rejected'] for total in totals),
+        'per_worker': [len(connections.get(url, {})) for url in urls],
+        'misrouted': sum(1 for student_id, url in sent_to if student_id not in connections.get(url, {})),
+        'elapsed': max(total['elapsed'] for total in totals),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the media_frame ack rate as Socket.IO workers are added.')
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--analysis-workers', type=int, default=2, help='Frame executor threads per worker')
+    parser.add_argument('--client-processes', type=int, default=4, help='Processes the simulated students are spread over')
+    parser.add_argument('--message-queue', default=None,
+                        help='Redis/Kombu URL shared by worker processes; omit to check routing in-process only')
+    parser.add_argument('--frame-bytes', type=int, default=4096, help='Size of the synthetic frame payload')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    rng = random.Random(args.seed)
+    frame = 'data:image/jpeg;base64,' + base64.b64encode(bytes(rng.getrandbits(8) for _ in range(args.frame_bytes))).decode()
+
+    scaling = bool(args.message_queue)
+    if not scaling:
+        print("No --message-queue: workers share this process, so only routing and fan-out are checked.")
+    print(f"{'workers':>8} {'acks':>8} {'acks/sec':>9}" + (f" {'speedup':>8}" if scaling else '') +
+          f" {'pushes':>8} {'rejected':>9} {'misrouted':>10}  students per worker")
+    baseline = None
+    for worker_count in range(1, args.max_workers + 1):
+        report = run(worker_count, args.students, args.seconds, args.analysis_workers, frame,
+                     args.client_processes, args.message_queue)
+        rate = report['acks'] / report['elapsed'] if report['elapsed'] else 0.0
+        baseline = baseline or rate
+        print(f"{worker_count:>8} {report['acks']:>8} {rate:>9.1f}" +
+              (f" {rate / baseline:>7.2f}x" if scaling else '') +
+              f" {report['updates']:>8} {report['rejected']:>9} {report['misrouted']:>10}  {report['per_worker']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Add emotion_log_rollup table and emotion_log.rolled_up flag
+
+Revision ID: 2c9e4f7a1b53
+Revises: 8d3f0a6b4c21
+Create Date: 2026-10-16 12:20:51.093347
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c9e4f7a1b53'
+down_revision = '8d3f0a6b4c21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('emotion_log_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('resolution', sa.String(length=10), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('sample_count', sa.Integer(), nullable=False),
+    sa.Column('focus_sum', sa.Float(), nullable=False),
+    sa.Column('focus_min', sa.Float(), nullable=True),
+    sa.Column('focus_max', sa.Float(), nullable=True),
+    sa.Column('frustration_sum', sa.Float(), nullable=False),
+    sa.Column('frustration_min', sa.Float(), nullable=True),
+    sa.Column('frustration_max', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['student_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('student_id', 'resolution', 'bucket_start', name='uq_emotion_log_rollup_bucket')
+    )
+
+    # Existing rows start un-rolled; rollup_emotion_logs.py folds them in
+    with op.batch_alter_table('emotion_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rolled_up', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.create_index('ix_emotion_log_rolled_up_id', ['rolled_up', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('emotion_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_emotion_log_rolled_up_id')
+        batch_op.drop_column('rolled_up')
+
+    op.drop_table('emotion_log_rollup')
@@ -0,0 +1,33 @@
+"""Add unique index on quiz_answer (submission_id, question_id)
+
+Revision ID: 4e8a2d6c1f37
+Revises: 2c9e4f7a1b53
+Create Date: 2026-10-16 14:05:12.418223
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e8a2d6c1f37'
+down_revision = '2c9e4f7a1b53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # take_quiz used to insert the final question's answer twice; keep the
+    # newest row of each (submission_id, question_id) before enforcing uniqueness
+    op.execute(
+        "DELETE FROM quiz_answer WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MAX(id) AS keep_id FROM quiz_answer "
+        "GROUP BY submission_id, question_id) AS newest)"
+    )
+    with op.batch_alter_table('quiz_answer', schema=None) as batch_op:
+        batch_op.create_index('uq_quiz_answer_submission_question', ['submission_id', 'question_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_answer', schema=None) as batch_op:
+        batch_op.drop_index('uq_quiz_answer_submission_question')
@@ -0,0 +1,192 @@
+"""Add compact source_data blob to emotion_log
+
+Revision ID: 5b1e7c2d9a40
+Revises: cf7dbb64d476
+Create Date: 2026-10-16 10:12:04.118203
+
+Existing str(dict) summaries are re-encoded into source_data. The legacy
+source_data_summary text is left in place so downgrade loses nothing; a
+later contract migration can clear it once every reader uses source_data.
+The encoder below is a frozen copy of format version 1 from
+services/emotion_encoding.py, so this revision does not change when that
+module does.
+
+"""
+import ast
+import logging
+import math
+import re
+import struct
+import sys
+from array import array
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e7c2d9a40'
+down_revision = 'cf7dbb64d476'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+emotion_log = sa.table(
+    'emotion_log',
+    sa.column('id', sa.Integer),
+    sa.column('source_data_summary', sa.Text),
+    sa.column('source_data', sa.LargeBinary),
+)
+
+# Frozen format version 1 encoding
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BBH')
+SCHEMA_MONITOR, SCHEMA_DEEPFACE, SCHEMA_ACTIVITY = 1, 2, 3
+SCHEMAS = {
+    SCHEMA_MONITOR: (
+        ('face', 'emotions', 'happy'), ('face', 'emotions', 'sad'), ('face', 'emotions', 'angry'),
+        ('face', 'emotions', 'surprised'), ('face', 'emotions', 'disgusted'), ('face', 'emotions', 'neutral'),
+        ('face', 'attention'), ('voice', 'tone'), ('voice', 'volume'),
+        ('keyboard', 'activity'), ('keyboard', 'typing_speed'), ('keyboard', 'error_rate'),
+        ('mouse', 'movement'), ('mouse', 'clicks'),
+    ),
+    SCHEMA_DEEPFACE: (('angry',), ('disgust',), ('fear',), ('happy',), ('sad',), ('surprise',), ('neutral',)),
+    SCHEMA_ACTIVITY: (('keypresses',), ('mousemoves',), ('mouseclicks',)),
+}
+# np.float64(0.5) / numpy.float32(1.0) as written by str() of NumPy scalars
+NUMPY_SCALAR = re.compile(r'\b(?:np|numpy)\.[a-z]+\d*\(([^()]*)\)')
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return math.nan
+        data = data[key]
+    try:
+        return float(data)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _encode(schema_id, data):
+    values = array('f', (_lookup(data, path) for path in SCHEMAS[schema_id]))
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return HEADER.pack(FORMAT_VERSION, schema_id, len(SCHEMAS[schema_id])) + values.tobytes()
+
+
+def _decode(blob):
+    version, schema_id, count = HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION or schema_id not in SCHEMAS:
+        return None
+    values = array('f')
+    values.frombytes(blob[HEADER.size:HEADER.size + count * 4])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    result = {}
+    for path, value in zip(SCHEMAS[schema_id], values):
+        if math.isnan(value):
+            continue
+        node = result
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = round(value, 6)
+    return result
+
+
+def _schema_for(data):
+    if any(key in data for key in ('face', 'voice', 'keyboard', 'mouse')):
+        return SCHEMA_MONITOR
+    if any(key in data for key in ('angry', 'happy', 'neutral', 'sad')):
+        return SCHEMA_DEEPFACE
+    if any(key in data for key in ('keypresses', 'mousemoves', 'mouseclicks')):
+        return SCHEMA_ACTIVITY
+    return None
+
+
+def _encode_legacy(summary):
+    """Blob for a str(dict) summary; None if it is free text or cannot be parsed."""
+    if not summary or not summary.lstrip().startswith('{'):
+        return None
+    try:
+        data = ast.literal_eval(NUMPY_SCALAR.sub(r'\1', summary))
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        raise ValueError('unparseable summary')
+    schema_id = _schema_for(data) if isinstance(data, dict) else None
+    if schema_id is None:
+        raise ValueError('unrecognised summary')
+    return _encode(schema_id, data)
+
+
+def upgrade():
+    with op.batch_alter_table('emotion_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('source_data', sa.LargeBinary(), nullable=True))
+
+    # Re-encode existing str(dict) summaries in id order, one batch at a time
+    conn = op.get_bind()
+    last_id = 0
+    converted_total = 0
+    skipped = 0
+    while True:
+        rows = conn.execute(
+            sa.select(emotion_log.c.id, emotion_log.c.source_data_summary)
+            .where(emotion_log.c.id > last_id)
+            .order_by(emotion_log.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        converted = []
+        for row_id, summary in rows:
+            try:
+                blob = _encode_legacy(summary)
+            except ValueError:
+                skipped += 1
+                continue
+            if blob is not None:
+                converted.append({'row_id': row_id, 'blob': blob})
+        if converted:
+            conn.execute(
+                emotion_log.update()
+                .where(emotion_log.c.id == sa.bindparam('row_id'))
+                .values(source_data=sa.bindparam('blob')),
+                converted
+            )
+            converted_total += len(converted)
+
+    logger.info("emotion_log source_data: %d summaries converted, %d dict-like summaries skipped "
+                "(left as text)", converted_total, skipped)
+
+
+def downgrade():
+    # Rows written after the upgrade only have the blob; give them a str(dict) summary
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(emotion_log.c.id, emotion_log.c.source_data)
+            .where(emotion_log.c.id > last_id, emotion_log.c.source_data.isnot(None),
+                   emotion_log.c.source_data_summary.is_(None))
+            .order_by(emotion_log.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        restored = [{'row_id': row_id, 'summary': str(data)} for row_id, data in
+                    ((row_id, _decode(blob)) for row_id, blob in rows) if data is not None]
+        if restored:
+            conn.execute(
+                emotion_log.update()
+                .where(emotion_log.c.id == sa.bindparam('row_id'))
+                .values(source_data_summary=sa.bindparam('summary')),
+                restored
+            )
+
+    with op.batch_alter_table('emotion_log', schema=None) as batch_op:
+        batch_op.drop_column('source_data')
@@ -0,0 +1,28 @@
+"""Add student/course timestamp indexes to emotion_log
+
+Revision ID: 8d3f0a6b4c21
+Revises: 5b1e7c2d9a40
+Create Date: 2026-10-16 11:02:37.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f0a6b4c21'
+down_revision = '5b1e7c2d9a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('emotion_log', schema=None) as batch_op:
+        batch_op.create_index('ix_emotion_log_student_id_timestamp', ['student_id', 'timestamp'], unique=False)
+        batch_op.create_index('ix_emotion_log_course_id_timestamp', ['course_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('emotion_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_emotion_log_course_id_timestamp')
+        batch_op.drop_index('ix_emotion_log_student_id_timestamp')
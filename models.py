@@ -251,6 +251,10 @@ class QuizSubmission(db.Model):
     student = db.relationship('User', backref='quiz_submissions')
 
 class QuizAnswer(db.Model):
+    __table_args__ = (
+        db.Index('uq_quiz_answer_submission_question', 'submission_id', 'question_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     submission_id = db.Column(db.Integer, db.ForeignKey('quiz_submission.id', ondelete='CASCADE'), nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
@@ -259,13 +263,56 @@ class QuizAnswer(db.Model):
     question = db.relationship('Question', backref='answers')
 
 class EmotionLog(db.Model):
+    __table_args__ = (
+        db.Index('ix_emotion_log_student_id_timestamp', 'student_id', 'timestamp'),
+        db.Index('ix_emotion_log_course_id_timestamp', 'course_id', 'timestamp'),
+        db.Index('ix_emotion_log_rolled_up_id', 'rolled_up', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     course_id = db.Column(db.Integer, db.ForeignKey('course.id'))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     focus_score = db.Column(db.Float)
     frustration_score = db.Column(db.Float)
-    source_data_summary = db.Column(db.Text)
+    source_data_summary = db.Column(db.Text)  # Legacy str(dict) summary or free-text note
+    source_data = db.Column(db.LargeBinary)  # Compact encoding, see services/emotion_encoding.py
+    rolled_up = db.Column(db.Boolean, default=False, nullable=False)  # Counted in EmotionLogRollup
+
+    @property
+    def source_details(self):
+        """Source data as a dict from either column, or the legacy text when it is not a dict."""
+        from services.emotion_encoding import decode, parse_legacy_summary
+        if self.source_data:
+            return decode(self.source_data)
+        legacy = parse_legacy_summary(self.source_data_summary)
+        return legacy if legacy is not None else self.source_data_summary
+
+class EmotionLogRollup(db.Model):
+    """Per-minute/hour/day focus and frustration aggregates of EmotionLog, per student."""
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'resolution', 'bucket_start', name='uq_emotion_log_rollup_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    resolution = db.Column(db.String(10), nullable=False)  # 'minute', 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    focus_sum = db.Column(db.Float, nullable=False, default=0.0)
+    focus_min = db.Column(db.Float)
+    focus_max = db.Column(db.Float)
+    frustration_sum = db.Column(db.Float, nullable=False, default=0.0)
+    frustration_min = db.Column(db.Float)
+    frustration_max = db.Column(db.Float)
+
+    @property
+    def focus_mean(self):
+        return self.focus_sum / self.sample_count if self.sample_count else None
+
+    @property
+    def frustration_mean(self):
+        return self.frustration_sum / self.sample_count if self.sample_count else None
 
 class Lecture(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,17 @@
+import time
+
+from app import create_app
+from models import db
+from services.emotion_rollups import rollup_pending
+
+app = create_app()
+
+with app.app_context():
+    print('Folding un-rolled emotion logs into minute/hour/day rollups...')
+    started = time.perf_counter()
+    try:
+        folded = rollup_pending()
+        print(f'Rolled up {folded} rows in {time.perf_counter() - started:.1f}s.')
+    except Exception as e:
+        db.session.rollback()
+        print(f'Error rolling up emotion logs: {e}')
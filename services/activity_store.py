@@ -0,0 +1,184 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+ACTIVITY_FIELDS = ('keypresses', 'mousemoves', 'mouseclicks')
+
+
+class ActivityRecord:
+    """Latest keyboard/mouse counters reported by one user."""
+
+    __slots__ = ('keypresses', 'mousemoves', 'mouseclicks', 'updated_at')
+
+    def __init__(self, keypresses: int = 0, mousemoves: int = 0, mouseclicks: int = 0,
+                 updated_at: Optional[float] = None):
+        self.keypresses = keypresses
+        self.mousemoves = mousemoves
+        self.mouseclicks = mouseclicks
+        self.updated_at = updated_at if updated_at is not None else time.time()
+
+    @classmethod
+    def from_payload(cls, data: Optional[Dict[str, Any]]):
+        data = data or {}
+        counters = []
+        for field in ACTIVITY_FIELDS:
+            try:
+                counters.append(max(0, int(data.get(field, 0))))
+            except (TypeError, ValueError):
+                counters.append(0)
+        return cls(*counters)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {'keypresses': self.keypresses, 'mousemoves': self.mousemoves, 'mouseclicks': self.mouseclicks}
+
+
+class InProcessActivityStore:
+    """
+    Bounded, TTL-evicting activity store for a single worker.
+
+    Records are kept in update order, so expired entries are always at the
+    front and eviction never scans the whole store.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._records: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set(self, user_id: int, data: Optional[Dict[str, Any]]):
+        record = ActivityRecord.from_payload(data)
+        with self._lock:
+            self._records.pop(user_id, None)
+            self._records[user_id] = record
+            self._evict(record.updated_at)
+
+    def get(self, user_id: int) -> Optional[Dict[str, int]]:
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            record = self._records.get(user_id)
+        return record.as_dict() if record else None
+
+    def _evict(self, now: float):
+        cutoff = now - self.ttl_seconds
+        while self._records:
+            user_id, record = next(iter(self._records.items()))
+            if record.updated_at >= cutoff and len(self._records) <= self.max_entries:
+                break
+            self._records.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+
+class SQLiteActivityStore:
+    """
+    Activity store shared by every worker on one host, kept in a SQLite file
+    in WAL mode so readers never block the writer. Lookups go through the
+    primary key; expired and excess rows are pruned every `prune_every` writes.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 60, max_entries: int = 10000, prune_every: int = 500):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_activity ("
+            "user_id INTEGER PRIMARY KEY, keypresses INTEGER, mousemoves INTEGER, "
+            "mouseclicks INTEGER, updated_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_user_activity_updated_at ON user_activity (updated_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def set(self, user_id: int, data: Optional[Dict[str, Any]]):
+        record = ActivityRecord.from_payload(data)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO user_activity (user_id, keypresses, mousemoves, mouseclicks, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (user_id, record.keypresses, record.mousemoves, record.mouseclicks, record.updated_at)
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def get(self, user_id: int) -> Optional[Dict[str, int]]:
+        row = self._connection().execute(
+            "SELECT keypresses, mousemoves, mouseclicks FROM user_activity WHERE user_id = ? AND updated_at >= ?",
+            (user_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(ACTIVITY_FIELDS, row))
+
+    def prune(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM user_activity WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM user_activity WHERE user_id IN ("
+            "SELECT user_id FROM user_activity ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM user_activity").fetchone()[0]
+
+
+class ActivityStore:
+    """
+    Latest keyboard/mouse counters per user, read by the media_frame handler.
+
+    ACTIVITY_STORE selects the backend: 'memory' (default, per worker) or
+    'sqlite' (shared between workers through ACTIVITY_STORE_PATH).
+    """
+
+    DEFAULT_ACTIVITY = {'keypresses': 0, 'mousemoves': 0, 'mouseclicks': 0}
+
+    def __init__(self, app=None):
+        self.backend = InProcessActivityStore()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('ACTIVITY_STORE', 'memory')
+        ttl = app.config.get('ACTIVITY_TTL_SECONDS', 60)
+        max_entries = app.config.get('ACTIVITY_MAX_ENTRIES', 10000)
+        if backend == 'sqlite':
+            path = app.config.get('ACTIVITY_STORE_PATH') or os.path.join(app.instance_path, 'activity.db')
+            self.backend = SQLiteActivityStore(path, ttl_seconds=ttl, max_entries=max_entries)
+        elif backend == 'memory':
+            self.backend = InProcessActivityStore(ttl_seconds=ttl, max_entries=max_entries)
+        else:
+            raise ValueError(f"Unknown ACTIVITY_STORE backend: {backend!r}")
+        app.extensions['activity_store'] = self
+
+    def set(self, user_id: int, data: Optional[Dict[str, Any]]):
+        self.backend.set(user_id, data)
+
+    def get(self, user_id: int) -> Dict[str, int]:
+        """Latest counters for the user, or zeros if nothing recent was reported."""
+        return self.backend.get(user_id) or dict(self.DEFAULT_ACTIVITY)
+
+
+activity_store = ActivityStore()
@@ -0,0 +1,224 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Sequence
+
+from services.quiz_plan import DIFFICULTIES
+
+# Behavior thresholds shared by take_quiz and get_quiz_behavior_data
+HIGH_FOCUS = 0.7
+LOW_FRUSTRATION = 0.3
+LOW_FOCUS = 0.4
+HIGH_FRUSTRATION = 0.6
+# Seconds spent on the previous question, used when there is no behavior data
+QUICK_ANSWER_SECONDS = 20
+SLOW_ANSWER_SECONDS = 60
+
+# Item difficulty of each bucket on the ability (logit) scale
+DIFFICULTY_LEVELS = {'Easy': -1.0, 'Medium': 0.0, 'Hard': 1.0}
+
+HARDEST_FIRST = ('Hard', 'Medium', 'Easy')
+EASIEST_FIRST = ('Easy', 'Medium', 'Hard')
+
+
+def behavior_difficulty(avg_focus: float, avg_frustration: float) -> Tuple[str, str]:
+    """Suggested difficulty and the reason for it from average focus and frustration."""
+    if avg_focus >= HIGH_FOCUS and avg_frustration <= LOW_FRUSTRATION:
+        return 'Hard', 'High focus and low frustration detected'
+    if avg_focus <= LOW_FOCUS or avg_frustration >= HIGH_FRUSTRATION:
+        return 'Easy', 'Low focus or high frustration detected'
+    return 'Medium', 'Moderate focus and frustration levels'
+
+
+class Signals:
+    """What is known about the student when the next question is picked."""
+
+    __slots__ = ('avg_focus', 'avg_frustration', 'time_taken')
+
+    def __init__(self, avg_focus: Optional[float] = None, avg_frustration: Optional[float] = None,
+                 time_taken: Optional[float] = None):
+        self.avg_focus = avg_focus
+        self.avg_frustration = avg_frustration
+        self.time_taken = time_taken
+
+    @property
+    def has_behavior(self) -> bool:
+        return self.avg_focus is not None and self.avg_frustration is not None
+
+    @classmethod
+    def from_window(cls, window: Dict[str, Any], time_taken: Optional[float] = None):
+        """Signals from a BehaviorWindowCache snapshot, preferring the last minute."""
+        if window.get('count_1m'):
+            return cls(window['avg_focus_1m'], window['avg_frustration_1m'], time_taken)
+        return cls(window.get('avg_focus_5m'), window.get('avg_frustration_5m'), time_taken)
+
+
+class AbilityState:
+    """Per-student state the policies learn from: an ability estimate and per-difficulty reward stats."""
+
+    __slots__ = ('theta', 'answered', 'pulls', 'rewards')
+
+    def __init__(self):
+        self.theta = 0.0
+        self.answered = 0
+        self.pulls = {difficulty: 0 for difficulty in DIFFICULTIES}
+        self.rewards = {difficulty: 0.0 for difficulty in DIFFICULTIES}
+
+
+class AdaptivePolicy(ABC):
+    """
+    Strategy interface for picking the next question's difficulty.
+
+    choose() returns difficulties in order of preference (the plan falls
+    back down the list when a pool is empty) and a reason for the debug
+    log; None means "next question in quiz order". observe() is called
+    with each graded answer.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def choose(self, state: AbilityState, signals: Signals) -> Tuple[Optional[Sequence[str]], str]:
+        """Difficulties in order of preference (or None) and the reason."""
+
+    def observe(self, state: AbilityState, difficulty: Optional[str], correct: bool, signals: Signals):
+        state.answered += 1
+
+
+class ThresholdPolicy(AdaptivePolicy):
+    """The original rules: behavior thresholds first, then time spent on the last question."""
+
+    name = 'threshold'
+
+    def choose(self, state, signals):
+        if signals.has_behavior:
+            difficulty, _ = behavior_difficulty(signals.avg_focus, signals.avg_frustration)
+            if difficulty == 'Hard':
+                return HARDEST_FIRST, 'Behavior: High focus/low frustration, picking hard question.'
+            if difficulty == 'Easy':
+                return EASIEST_FIRST, 'Behavior: Low focus/high frustration, picking easy question.'
+            return ('Medium', 'Easy', 'Hard'), 'Behavior: Medium state, picking medium question.'
+        if signals.time_taken is not None:
+            prefix = f'Time taken: {signals.time_taken:.2f} seconds. '
+            if signals.time_taken < QUICK_ANSWER_SECONDS:
+                return HARDEST_FIRST, prefix + 'Very quick, picking hard question.'
+            if signals.time_taken < SLOW_ANSWER_SECONDS:
+                return ('Medium', 'Hard', 'Easy'), prefix + 'Medium time, picking medium question.'
+            return EASIEST_FIRST, prefix + 'Took a long time, picking easy question.'
+        return None, 'No timing info, fallback to default order.'
+
+
+class IRTPolicy(AdaptivePolicy):
+    """
+    Rasch (1PL) ability estimate. Picks the difficulty whose level is
+    closest to the current ability, where the item is most informative,
+    and moves the estimate by a gradient step on each answer. Low focus or
+    high frustration nudges the pick one level easier.
+    """
+
+    name = 'irt'
+
+    def __init__(self, learning_rate: float = 0.4):
+        self.learning_rate = learning_rate
+
+    def choose(self, state, signals):
+        target = state.theta
+        if signals.has_behavior and behavior_difficulty(signals.avg_focus, signals.avg_frustration)[0] == 'Easy':
+            target -= 1.0
+        preference = tuple(sorted(DIFFICULTIES, key=lambda d: (abs(DIFFICULTY_LEVELS[d] - target), DIFFICULTY_LEVELS[d])))
+        return preference, f'IRT: ability {state.theta:+.2f}, picking {preference[0].lower()} question.'
+
+    def observe(self, state, difficulty, correct, signals):
+        super().observe(state, difficulty, correct, signals)
+        if difficulty not in DIFFICULTY_LEVELS:
+            return
+        expected = 1.0 / (1.0 + math.exp(DIFFICULTY_LEVELS[difficulty] - state.theta))
+        # Larger steps while the estimate is still settling
+        step = self.learning_rate * max(0.25, 1.0 / math.sqrt(state.answered))
+        state.theta = max(-3.0, min(3.0, state.theta + step * ((1.0 if correct else 0.0) - expected)))
+
+
+class BanditPolicy(AdaptivePolicy):
+    """
+    UCB1 over the three difficulties. A correct answer pays the level's
+    weight (harder pays more) and a wrong one pays nothing, so the policy
+    settles on the hardest level the student still answers correctly.
+    """
+
+    name = 'bandit'
+    WEIGHTS = {'Easy': 0.5, 'Medium': 0.75, 'Hard': 1.0}
+
+    def __init__(self, exploration: float = 0.5):
+        self.exploration = exploration
+
+    def choose(self, state, signals):
+        total = sum(state.pulls.values())
+        for difficulty in ('Medium', 'Easy', 'Hard'):
+            if not state.pulls[difficulty]:
+                return (difficulty,) + tuple(d for d in DIFFICULTIES if d != difficulty), \
+                    f'Bandit: trying {difficulty.lower()} questions.'
+
+        def upper_bound(difficulty):
+            pulls = state.pulls[difficulty]
+            return state.rewards[difficulty] / pulls + self.exploration * math.sqrt(2 * math.log(total) / pulls)
+
+        preference = tuple(sorted(DIFFICULTIES, key=upper_bound, reverse=True))
+        return preference, f'Bandit: best expected reward at {preference[0].lower()} level.'
+
+    def observe(self, state, difficulty, correct, signals):
+        super().observe(state, difficulty, correct, signals)
+        if difficulty in state.pulls:
+            state.pulls[difficulty] += 1
+            state.rewards[difficulty] += self.WEIGHTS[difficulty] if correct else 0.0
+
+
+POLICIES = {policy.name: policy for policy in (ThresholdPolicy, IRTPolicy, BanditPolicy)}
+
+
+class AdaptiveEngine:
+    """
+    Picks each attempt's next question with a pluggable AdaptivePolicy
+    (ADAPTIVE_POLICY: 'threshold', 'irt' or 'bandit') and keeps the
+    per-student AbilityState it learns from in memory, least recently
+    used students evicted past `max_students`.
+    """
+
+    def __init__(self, app=None, policy: str = 'threshold', max_students: int = 10000):
+        self.policy = POLICIES[policy]()
+        self.max_students = max_students
+        self._states: 'OrderedDict[int, AbilityState]' = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        name = app.config.get('ADAPTIVE_POLICY', self.policy.name)
+        if name not in POLICIES:
+            raise ValueError(f"Unknown ADAPTIVE_POLICY {name!r}; expected one of {', '.join(POLICIES)}")
+        self.policy = POLICIES[name]()
+        self.max_students = app.config.get('ADAPTIVE_MAX_STUDENTS', self.max_students)
+        app.extensions['adaptive_engine'] = self
+
+    def state(self, student_id: int) -> AbilityState:
+        with self._lock:
+            state = self._states.get(student_id)
+            if state is None:
+                state = self._states[student_id] = AbilityState()
+                while len(self._states) > self.max_students:
+                    self._states.popitem(last=False)
+            else:
+                self._states.move_to_end(student_id)
+            return state
+
+    def select(self, plan, student_id: int, signals: Signals):
+        """Serve the plan's next question; returns (question or None, reason)."""
+        preference, reason = self.policy.choose(self.state(student_id), signals)
+        question = plan.take(preference) if preference is not None else plan.next_in_order()
+        return question, reason
+
+    def observe(self, student_id: int, difficulty: Optional[str], correct: bool, signals: Signals):
+        self.policy.observe(self.state(student_id), difficulty, correct, signals)
+
+
+adaptive_engine = AdaptiveEngine()
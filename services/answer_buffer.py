@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Mapping
+
+
+class AnswerBuffer:
+    """
+    In-progress quiz answers, keyed by QuizSubmission.id, held in memory
+    until the attempt is submitted.
+
+    take_quiz records each step here only. The 30s saveProgress autosave
+    also writes through to quiz_answer (ungraded), and load() merges those
+    rows under the buffered answers, so a restart, eviction or request on
+    another worker falls back to the last autosave. flush() grades and
+    stores the whole attempt at once on submit.
+    """
+
+    def __init__(self, app=None, max_attempts: int = 5000, ttl_seconds: int = 4 * 3600):
+        self.max_attempts = max_attempts
+        self.ttl_seconds = ttl_seconds
+        self._answers: 'OrderedDict[int, Dict[int, str]]' = OrderedDict()
+        self._touched: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_attempts = app.config.get('ANSWER_BUFFER_MAX', self.max_attempts)
+        self.ttl_seconds = app.config.get('ANSWER_BUFFER_TTL_SECONDS', self.ttl_seconds)
+        app.extensions['answer_buffer'] = self
+
+    def record(self, submission_id: int, answers: Mapping[Any, Optional[str]]) -> int:
+        """Merge {question_id: letter} into the attempt's answers; returns how many it now holds."""
+        with self._lock:
+            buffered = self._answers.setdefault(submission_id, {})
+            for question_id, letter in answers.items():
+                if letter:
+                    buffered[int(question_id)] = letter
+            self._touched[submission_id] = time.monotonic()
+            self._answers.move_to_end(submission_id)
+            while len(self._answers) > self.max_attempts:
+                evicted, _ = self._answers.popitem(last=False)
+                self._touched.pop(evicted, None)
+            return len(buffered)
+
+    def answers(self, submission_id: int) -> Dict[int, str]:
+        with self._lock:
+            touched = self._touched.get(submission_id)
+            if touched is not None and time.monotonic() - touched > self.ttl_seconds:
+                self._answers.pop(submission_id, None)
+                self._touched.pop(submission_id, None)
+            return dict(self._answers.get(submission_id, {}))
+
+    def load(self, submission_id: int) -> Dict[int, str]:
+        """Answers stored by earlier autosaves, overlaid with those buffered in this process."""
+        from models import db, QuizAnswer
+        stored = dict(db.session.query(QuizAnswer.question_id, QuizAnswer.answer)
+                      .filter(QuizAnswer.submission_id == submission_id))
+        stored.update(self.answers(submission_id))
+        return stored
+
+    def save(self, submission_id: int, answers: Mapping[int, str]) -> int:
+        """
+        Record answers and write them through to quiz_answer, ungraded, in
+        the caller's transaction. Returns how many the buffer now holds.
+        """
+        held = self.record(submission_id, answers)
+        self._write(submission_id, {question_id: letter for question_id, letter in answers.items() if letter}, None)
+        return held
+
+    def discard(self, submission_id: int):
+        with self._lock:
+            self._answers.pop(submission_id, None)
+            self._touched.pop(submission_id, None)
+
+    def flush(self, submission_id: int, answers: Mapping[int, str], correct: Mapping[int, bool]) -> int:
+        """
+        Write an attempt's answers in the caller's transaction: one
+        bulk_insert_mappings for new (submission_id, question_id) pairs and
+        one bulk_update_mappings for pairs already stored, so flushing the
+        same attempt twice leaves one row per question. Returns rows written.
+        """
+        return self._write(submission_id, answers, correct)
+
+    def _write(self, submission_id: int, answers: Mapping[int, str], correct: Optional[Mapping[int, bool]]) -> int:
+        # correct=None stores the answers ungraded (is_correct NULL)
+        from models import db, QuizAnswer
+        existing = dict(db.session.query(QuizAnswer.question_id, QuizAnswer.id)
+                        .filter(QuizAnswer.submission_id == submission_id))
+        inserts = []
+        updates = []
+        for question_id, letter in answers.items():
+            row = {'submission_id': submission_id, 'question_id': question_id, 'answer': letter,
+                   'is_correct': None if correct is None else bool(correct.get(question_id, False))}
+            if question_id in existing:
+                row['id'] = existing[question_id]
+                updates.append(row)
+            else:
+                inserts.append(row)
+        if inserts:
+            db.session.bulk_insert_mappings(QuizAnswer, inserts)
+        if updates:
+            db.session.bulk_update_mappings(QuizAnswer, updates)
+        return len(inserts) + len(updates)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'attempts': len(self._answers), 'answers': sum(len(a) for a in self._answers.values())}
+
+
+answer_buffer = AnswerBuffer()
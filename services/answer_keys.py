@@ -0,0 +1,152 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Mapping
+
+import numpy as np
+import sqlalchemy as sa
+
+from services.quiz_plan import LETTERS, parse_options, correct_letter
+
+# Answer letters as small ints; 0 means no answer, or no option matches the key
+LETTER_CODES = {letter: code for code, letter in enumerate(LETTERS, start=1)}
+
+
+class AnswerKey:
+    """
+    A quiz's answer key compiled to arrays: question ids in ascending order
+    and the correct letter code of each, so a whole submission or a whole
+    quiz's answers are graded with one array comparison.
+    """
+
+    __slots__ = ('quiz_id', 'question_ids', 'codes', 'positions')
+
+    def __init__(self, quiz_id: int, letters: Mapping[int, Optional[str]]):
+        self.quiz_id = quiz_id
+        ordered = sorted(letters)
+        self.question_ids = np.asarray(ordered, dtype=np.int64)
+        self.codes = np.asarray([LETTER_CODES.get(letters[question_id], 0) for question_id in ordered], dtype=np.int8)
+        self.positions = {question_id: i for i, question_id in enumerate(ordered)}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def letter(self, question_id: int) -> Optional[str]:
+        position = self.positions.get(question_id)
+        if position is None or not self.codes[position]:
+            return None
+        return LETTERS[self.codes[position] - 1]
+
+    def submitted_codes(self, answers: Mapping[str, str]) -> np.ndarray:
+        """Letter codes aligned with question_ids from a {question_id: letter} mapping."""
+        return np.fromiter((LETTER_CODES.get(answers.get(str(question_id)), 0) for question_id in self.positions),
+                           dtype=np.int8, count=len(self.positions))
+
+    def grade(self, answers: Mapping[str, str]) -> np.ndarray:
+        """Boolean array, aligned with question_ids, of which questions were answered correctly."""
+        return (self.submitted_codes(answers) == self.codes) & (self.codes > 0)
+
+    def score(self, answers: Mapping[str, str]) -> float:
+        """Percentage score of a submission, as take_quiz stores it."""
+        if not len(self):
+            return 0
+        return float(self.grade(answers).sum()) / len(self) * 100
+
+
+class AnswerKeyCache:
+    """
+    Compiled AnswerKeys per quiz. The question views invalidate a quiz's key
+    when a question is added, edited or deleted; the next grade recompiles
+    it with one query.
+    """
+
+    def __init__(self, app=None, max_quizzes: int = 1000):
+        self.max_quizzes = max_quizzes
+        self._keys: 'OrderedDict[int, AnswerKey]' = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_quizzes = app.config.get('ANSWER_KEY_CACHE_MAX', self.max_quizzes)
+        app.extensions['answer_keys'] = self
+
+    def compile(self, quiz_id: int) -> AnswerKey:
+        from models import db, Question
+        rows = db.session.query(Question.id, Question.options, Question.correct_answer)\
+            .filter(Question.quiz_id == quiz_id).all()
+        return AnswerKey(quiz_id, {question_id: correct_letter(parse_options(options), correct)
+                                   for question_id, options, correct in rows})
+
+    def get(self, quiz_id: int) -> AnswerKey:
+        with self._lock:
+            key = self._keys.get(quiz_id)
+            if key is not None:
+                self._keys.move_to_end(quiz_id)
+                return key
+        key = self.compile(quiz_id)
+        with self._lock:
+            self._keys[quiz_id] = key
+            while len(self._keys) > self.max_quizzes:
+                self._keys.popitem(last=False)
+        return key
+
+    def invalidate(self, quiz_id: int):
+        with self._lock:
+            self._keys.pop(quiz_id, None)
+
+
+def regrade_quiz(quiz_id: int, key: Optional[AnswerKey] = None) -> Dict[str, Any]:
+    """
+    Re-mark every saved answer of a quiz against its current key and
+    re-score its completed submissions. Answers are compared in one array
+    operation; only rows whose correctness changed are written, with one
+    executemany per table. Returns counts of answers changed and
+    submissions re-scored.
+    """
+    from models import db, QuizAnswer, QuizSubmission
+    key = key or answer_keys.get(quiz_id)
+    rows = db.session.query(QuizAnswer.id, QuizAnswer.submission_id, QuizAnswer.question_id,
+                            QuizAnswer.answer, QuizAnswer.is_correct)\
+        .join(QuizSubmission, QuizAnswer.submission_id == QuizSubmission.id)\
+        .filter(QuizSubmission.quiz_id == quiz_id).all()
+    submissions = [submission_id for (submission_id,) in db.session.query(QuizSubmission.id)
+                   .filter(QuizSubmission.quiz_id == quiz_id, QuizSubmission.end_time.isnot(None))]
+
+    correct_counts: Dict[int, int] = {}
+    changed = []
+    if rows:
+        answer_ids, submission_ids, question_ids, letters, previous = zip(*rows)
+        question_ids = np.asarray(question_ids, dtype=np.int64)
+        submitted = np.fromiter((LETTER_CODES.get(letter, 0) for letter in letters), dtype=np.int8, count=len(rows))
+        if len(key):
+            positions = np.minimum(np.searchsorted(key.question_ids, question_ids), len(key) - 1)
+            known = key.question_ids[positions] == question_ids
+            expected = np.where(known, key.codes[positions], 0)
+        else:
+            expected = np.zeros(len(rows), dtype=np.int8)
+        correct = (submitted == expected) & (expected > 0)
+        previous = np.asarray([bool(value) for value in previous])
+        changed = [{'b_id': answer_ids[i], 'b_correct': bool(correct[i])}
+                   for i in np.flatnonzero(correct != previous)]
+        # Count each (submission, question) once even if an answer was saved twice
+        pairs = set(zip(np.asarray(submission_ids)[correct].tolist(), question_ids[correct].tolist()))
+        for submission_id, _ in pairs:
+            correct_counts[submission_id] = correct_counts.get(submission_id, 0) + 1
+
+    answers_table = QuizAnswer.__table__
+    if changed:
+        db.session.execute(answers_table.update().where(answers_table.c.id == sa.bindparam('b_id'))
+                           .values(is_correct=sa.bindparam('b_correct')), changed)
+    scores = [{'b_id': submission_id,
+               'b_score': correct_counts.get(submission_id, 0) / len(key) * 100 if len(key) else 0}
+              for submission_id in submissions]
+    submissions_table = QuizSubmission.__table__
+    if scores:
+        db.session.execute(submissions_table.update().where(submissions_table.c.id == sa.bindparam('b_id'))
+                           .values(score=sa.bindparam('b_score')), scores)
+    db.session.commit()
+    return {'quiz_id': quiz_id, 'answers_checked': len(rows), 'answers_changed': len(changed),
+            'submissions_rescored': len(scores)}
+
+
+answer_keys = AnswerKeyCache()
@@ -0,0 +1,216 @@
+import io
+from bisect import bisect_right
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterator, List
+
+import sqlalchemy as sa
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from models import db, QuizSubmission
+from services.emotion_log_partitions import emotion_log_partitions
+
+EXPORT_FORMATS = ('arrow', 'parquet')
+DEFAULT_CHUNK_SIZE = 50000
+
+MIMETYPES = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def export_schema(quiz_windows: bool = False):
+    """Arrow schema of the export; nullable ints map to pandas Int32 via types_mapper."""
+    fields = [
+        pa.field('id', pa.int64(), nullable=False),
+        pa.field('student_id', pa.int32()),
+        pa.field('course_id', pa.int32()),
+        pa.field('timestamp', pa.timestamp('us')),
+        pa.field('focus_score', pa.float32()),
+        pa.field('frustration_score', pa.float32()),
+        pa.field('source_schema', pa.uint8()),
+        pa.field('source_data', pa.binary()),
+    ]
+    if quiz_windows:
+        fields += [
+            pa.field('quiz_submission_id', pa.int32()),
+            pa.field('quiz_id', pa.int32()),
+        ]
+    return pa.schema(fields)
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for behavior exports (pip install pyarrow)")
+
+
+class QuizWindowIndex:
+    """Per-student sorted quiz submission windows for tagging samples."""
+
+    def __init__(self, submissions):
+        self._windows: Dict[int, List[tuple]] = {}
+        for submission_id, quiz_id, student_id, start_time, end_time in submissions:
+            if start_time is None:
+                continue
+            self._windows.setdefault(student_id, []).append((start_time, end_time or start_time, submission_id, quiz_id))
+        self._starts = {}
+        for student_id, windows in self._windows.items():
+            windows.sort()
+            self._starts[student_id] = [window[0] for window in windows]
+
+    @classmethod
+    def load(cls, student_ids, start: datetime, end: datetime):
+        rows = db.session.query(QuizSubmission.id, QuizSubmission.quiz_id, QuizSubmission.student_id,
+                                QuizSubmission.start_time, QuizSubmission.end_time)\
+            .filter(QuizSubmission.student_id.in_(student_ids),
+                    QuizSubmission.start_time <= end,
+                    sa.or_(QuizSubmission.end_time.is_(None), QuizSubmission.end_time >= start))\
+            .all()
+        return cls(rows)
+
+    def lookup(self, student_id: int, timestamp: datetime):
+        """(submission_id, quiz_id) of the window containing the sample, or (None, None)."""
+        starts = self._starts.get(student_id)
+        if not starts or timestamp is None:
+            return None, None
+        i = bisect_right(starts, timestamp) - 1
+        if i < 0:
+            return None, None
+        # A student has one attempt open at a time, so the latest window to start is the only candidate
+        start_time, end_time, submission_id, quiz_id = self._windows[student_id][i]
+        if end_time >= timestamp:
+            return submission_id, quiz_id
+        return None, None
+
+
+def iter_chunks(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                student_id: Optional[int] = None, course_id: Optional[int] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE, quiz_windows: bool = False) -> Iterator[Any]:
+    """
+    Yield pyarrow RecordBatches of at most `chunk_size` EmotionLog rows,
+    read by id keyset from the main table and any archive partitions in
+    range. Only plain column tuples are fetched, never ORM objects.
+    """
+    require_pyarrow()
+    schema = export_schema(quiz_windows)
+    for table in emotion_log_partitions.tables_for_range(start, end):
+        last_id = 0
+        while True:
+            stmt = sa.select(table.c.id, table.c.student_id, table.c.course_id, table.c.timestamp,
+                             table.c.focus_score, table.c.frustration_score, table.c.source_data)\
+                .where(table.c.id > last_id)
+            if start is not None:
+                stmt = stmt.where(table.c.timestamp >= start)
+            if end is not None:
+                stmt = stmt.where(table.c.timestamp <= end)
+            if student_id is not None:
+                stmt = stmt.where(table.c.student_id == student_id)
+            if course_id is not None:
+                stmt = stmt.where(table.c.course_id == course_id)
+            rows = db.session.execute(stmt.order_by(table.c.id).limit(chunk_size)).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield _record_batch(rows, schema, quiz_windows)
+            if len(rows) < chunk_size:
+                break
+
+
+def _record_batch(rows, schema, quiz_windows: bool):
+    ids, student_ids, course_ids, timestamps, focus, frustration, blobs = (list(column) for column in zip(*rows))
+    columns = [
+        pa.array(ids, pa.int64()),
+        pa.array(student_ids, pa.int32()),
+        pa.array(course_ids, pa.int32()),
+        pa.array(timestamps, pa.timestamp('us')),
+        pa.array(focus, pa.float32()),
+        pa.array(frustration, pa.float32()),
+        pa.array([blob[1] if blob else None for blob in blobs], pa.uint8()),
+        pa.array([bytes(blob) if blob else None for blob in blobs], pa.binary()),
+    ]
+    if quiz_windows:
+        present = [ts for ts in timestamps if ts is not None]
+        index = QuizWindowIndex.load({sid for sid in student_ids if sid is not None}, min(present), max(present)) \
+            if present else QuizWindowIndex([])
+        tagged = [index.lookup(sid, ts) for sid, ts in zip(student_ids, timestamps)]
+        columns.append(pa.array([t[0] for t in tagged], pa.int32()))
+        columns.append(pa.array([t[1] for t in tagged], pa.int32()))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class _DrainSink(io.RawIOBase):
+    """Write-only file object whose buffered bytes can be taken between batches."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def stream_export(fmt: str = 'arrow', quiz_windows: bool = False, **filters) -> Iterator[bytes]:
+    """
+    Encode the export as Arrow IPC stream or Parquet bytes, yielding after
+    each chunk so only one chunk is held in memory at a time.
+    """
+    require_pyarrow()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    sink = _DrainSink()
+    schema = export_schema(quiz_windows)
+    if fmt == 'arrow':
+        writer = pa.ipc.new_stream(sink, schema)
+    else:
+        writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    for batch in iter_chunks(quiz_windows=quiz_windows, **filters):
+        if fmt == 'arrow':
+            writer.write_batch(batch)
+        else:
+            writer.write_table(pa.Table.from_batches([batch], schema=schema))
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+def write_export(path: str, fmt: str = 'parquet', quiz_windows: bool = False, **filters) -> Dict[str, Any]:
+    """Write the export to a file and return the number of rows written."""
+    require_pyarrow()
+    schema = export_schema(quiz_windows)
+    rows = 0
+    if fmt == 'arrow':
+        writer = pa.ipc.new_file(path, schema)
+    elif fmt == 'parquet':
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+    else:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    try:
+        for batch in iter_chunks(quiz_windows=quiz_windows, **filters):
+            if fmt == 'arrow':
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch], schema=schema))
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    return {'rows': rows, 'path': path}
@@ -0,0 +1,74 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple, Iterable, Iterator
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp: datetime, log_id: int) -> str:
+    """Opaque keyset cursor for the (timestamp, id) of the last row on a page."""
+    raw = f'{timestamp.isoformat()}|{log_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Parse a cursor from encode_cursor(); raises ValueError if it is malformed."""
+    if not cursor:
+        return None
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        timestamp, log_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_date(value: Optional[str], end_of_day: bool = False) -> Optional[datetime]:
+    """Parse an ISO date or datetime query argument; a bare end date covers the whole day."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed
+
+
+def page_size(value: Optional[str]) -> int:
+    try:
+        size = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        size = DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def log_item(log) -> dict:
+    return {
+        'id': log.id,
+        'timestamp': log.timestamp.isoformat() if log.timestamp else None,
+        'focus_score': log.focus_score,
+        'frustration_score': log.frustration_score,
+        'source': log.source_details,
+    }
+
+
+def stream_page(logs: Iterable, limit: int) -> Iterator[str]:
+    """
+    Stream one page as JSON: {"items": [...], "next_cursor": ...}.
+
+    `logs` may hold one row more than `limit`; its presence means another
+    page exists and the cursor points at the last row returned. Rows are
+    encoded one at a time so the response starts before the page is built.
+    """
+    yield '{"items": ['
+    last = None
+    for count, log in enumerate(logs):
+        if count == limit:
+            break
+        yield (',' if count else '') + json.dumps(log_item(log), default=str)
+        last = log
+    else:
+        last = None  # Ran out before limit + 1 rows: this is the final page
+    next_cursor = encode_cursor(last.timestamp, last.id) if last is not None else None
+    yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+from services.behavior_window_cache import behavior_window_cache
+
+BEHAVIOR_UPDATE_EVENT = 'behavior_update'
+
+
+def student_room(student_id: int) -> str:
+    return f'student_{student_id}'
+
+
+def behavior_payload(window: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Format a BehaviorWindowCache snapshot the way get_live_behavior_data
+    does (percentages), plus the 1-minute averages shown by the monitoring
+    status widget. Returns None if there are no recent samples.
+    """
+    if not window['count_5m']:
+        return None
+
+    def percent(value):
+        return round(value * 100, 1) if value is not None else None
+
+    return {
+        'latest_focus': percent(window['latest_focus']),
+        'latest_frustration': percent(window['latest_frustration']),
+        'avg_focus': percent(window['avg_focus_5m']),
+        'avg_frustration': percent(window['avg_frustration_5m']),
+        'avg_focus_1m': percent(window['avg_focus_1m']),
+        'avg_frustration_1m': percent(window['avg_frustration_1m']),
+        'trend': window['trend'],
+        'last_updated': window['last_updated'].isoformat() if window['last_updated'] else None,
+        'recent_logs_count': window['count_5m'],
+    }
+
+
+class BehaviorPushNotifier:
+    """
+    Pushes `behavior_update` events to each student's Socket.IO room.
+
+    Every sample recorded in the BehaviorWindowCache marks the student
+    dirty. Once per `interval_ms` the dirty students are snapshotted and an
+    update is emitted only if a displayed value moved by at least
+    `threshold` percentage points, the trend changed, or `heartbeat_seconds`
+    passed since the last push. Bursts of samples therefore coalesce into at
+    most one event per interval per student.
+    """
+
+    WATCHED_FIELDS = ('latest_focus', 'latest_frustration', 'avg_focus', 'avg_frustration',
+                      'avg_focus_1m', 'avg_frustration_1m')
+
+    def __init__(self, interval_ms: int = 1000, threshold: float = 1.0, heartbeat_seconds: float = 30.0):
+        self.app = None
+        self.socketio = None
+        self.interval = interval_ms / 1000.0
+        self.threshold = threshold
+        self.heartbeat_seconds = heartbeat_seconds
+        self._dirty = set()
+        self._last_pushed: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._task = None
+        self._stats = {'pushes': 0, 'suppressed': 0}
+
+    def init_app(self, app, socketio):
+        self.app = app
+        self.socketio = socketio
+        self.interval = app.config.get('BEHAVIOR_PUSH_INTERVAL_MS', self.interval * 1000) / 1000.0
+        self.threshold = app.config.get('BEHAVIOR_PUSH_THRESHOLD', self.threshold)
+        self.heartbeat_seconds = app.config.get('BEHAVIOR_PUSH_HEARTBEAT_SECONDS', self.heartbeat_seconds)
+        behavior_window_cache.add_listener(self.mark_dirty)
+        app.extensions['behavior_push'] = self
+        self.start()
+
+    def start(self):
+        """
+        Start the push loop on the Socket.IO server's event loop. Called from
+        init_app(), never from mark_dirty(): samples can be recorded on plain
+        OS threads (the monitor scheduler), where a green thread would be
+        created on a hub that never runs.
+        """
+        with self._lock:
+            if self._task is None and self.socketio is not None:
+                self._task = self.socketio.start_background_task(self._run)
+
+    def mark_dirty(self, student_id: int):
+        # May run on any thread; the push loop picks the student up on its next pass
+        with self._lock:
+            self._dirty.add(student_id)
+
+    def should_push(self, student_id: int, payload: Dict[str, Any], now: Optional[float] = None) -> bool:
+        now = now if now is not None else time.monotonic()
+        previous = self._last_pushed.get(student_id)
+        if previous is None:
+            return True
+        pushed_at, last = previous
+        if now - pushed_at >= self.heartbeat_seconds or payload['trend'] != last['trend']:
+            return True
+        for field in self.WATCHED_FIELDS:
+            old, new = last.get(field), payload.get(field)
+            if (old is None) != (new is None):
+                return True
+            if old is not None and abs(new - old) >= self.threshold:
+                return True
+        return False
+
+    def flush(self) -> int:
+        """Emit updates for dirty students whose values changed enough. Returns the number pushed."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        pushed = 0
+        for student_id in dirty:
+            payload = behavior_payload(behavior_window_cache.snapshot(student_id))
+            if payload is None:
+                continue
+            now = time.monotonic()
+            if not self.should_push(student_id, payload, now):
+                self._stats['suppressed'] += 1
+                continue
+            self._last_pushed.pop(student_id, None)
+            self._last_pushed[student_id] = (now, payload)
+            while len(self._last_pushed) > behavior_window_cache.max_students:
+                self._last_pushed.popitem(last=False)
+            self.socketio.emit(BEHAVIOR_UPDATE_EVENT, payload, to=student_room(student_id))
+            pushed += 1
+        self._stats['pushes'] += pushed
+        return pushed
+
+    def current_payload(self, student_id: int) -> Optional[Dict[str, Any]]:
+        """Current values for one student, e.g. for a tab that just connected."""
+        return behavior_payload(behavior_window_cache.snapshot(student_id))
+
+    def forget(self, student_id: int):
+        with self._lock:
+            self._dirty.discard(student_id)
+            self._last_pushed.pop(student_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            dirty = len(self._dirty)
+        return dict(self._stats, dirty=dirty, tracked=len(self._last_pushed))
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                print(f"Behavior push error: {str(e)}")
+
+
+behavior_push = BehaviorPushNotifier()
@@ -0,0 +1,93 @@
+from typing import Optional, List, Dict, Any, Sequence
+
+import numpy as np
+
+# One column per behavior signal, in the order used by the weight matrix
+FEATURE_COLUMNS = (
+    'face_attention',
+    'face_angry',
+    'face_sad',
+    'face_disgusted',
+    'voice_tone',
+    'voice_volume',
+    'keyboard_activity',
+    'keyboard_typing_speed',
+    'mouse_movement',
+    'mouse_clicks',
+)
+
+SCORE_ROWS = ('focus', 'frustration')
+
+# Row 0 is focus, row 1 is frustration; same weights as the scalar aggregate_* functions
+DEFAULT_WEIGHTS = np.array([
+    #  attn  angry  sad   disg  tone  vol   kb    speed move  clicks
+    [0.5,  0.0,  0.0,  0.0,  0.0,  0.1,  0.2,  0.0,  0.1,  0.01],
+    [0.0,  0.3,  0.2,  0.1,  0.2,  0.0,  0.0,  0.1,  0.1,  0.0],
+])
+
+
+def features_from_sources(sources: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    Build an (N, len(FEATURE_COLUMNS)) feature matrix from monitor source
+    dicts shaped like {'face': ..., 'voice': ..., 'keyboard': ..., 'mouse': ...}.
+    """
+    features = np.zeros((len(sources), len(FEATURE_COLUMNS)), dtype=np.float64)
+    for i, source in enumerate(sources):
+        face = source.get('face') or {}
+        emotions = face.get('emotions') or {}
+        voice = source.get('voice') or {}
+        keyboard = source.get('keyboard') or {}
+        mouse = source.get('mouse') or {}
+        features[i] = (
+            face.get('attention', 0.0),
+            emotions.get('angry', 0.0),
+            emotions.get('sad', 0.0),
+            emotions.get('disgusted', 0.0),
+            voice.get('tone', 0.0),
+            voice.get('volume', 0.0),
+            keyboard.get('activity', 0.0),
+            keyboard.get('typing_speed', 0.0),
+            mouse.get('movement', 0.0),
+            mouse.get('clicks', 0),
+        )
+    return features
+
+
+class BehaviorScorer:
+    """
+    Scores a batch of student-ticks in one matrix product.
+
+    `weights` is a (2, len(FEATURE_COLUMNS)) matrix whose rows give the
+    focus and frustration weights; scores are clipped to [0, 1].
+    """
+
+    def __init__(self, weights: Optional[Any] = None):
+        self.weights = DEFAULT_WEIGHTS
+        if weights is not None:
+            self.set_weights(weights)
+
+    def init_app(self, app):
+        weights = app.config.get('BEHAVIOR_SCORE_WEIGHTS')
+        if weights is not None:
+            self.set_weights(weights)
+        app.extensions['behavior_scorer'] = self
+
+    def set_weights(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != (len(SCORE_ROWS), len(FEATURE_COLUMNS)):
+            raise ValueError(
+                f"Behavior score weights must have shape {(len(SCORE_ROWS), len(FEATURE_COLUMNS))}, got {weights.shape}"
+            )
+        self.weights = weights
+
+    def score(self, features: np.ndarray):
+        """Return (focus, frustration) vectors for an (N, F) feature matrix."""
+        features = np.atleast_2d(np.asarray(features, dtype=np.float64))
+        scores = np.clip(features @ self.weights.T, 0.0, 1.0)
+        return scores[:, 0], scores[:, 1]
+
+    def score_sources(self, sources: Sequence[Dict[str, Any]]):
+        return self.score(features_from_sources(sources))
+
+
+behavior_scorer = BehaviorScorer()
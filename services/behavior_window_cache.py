@@ -0,0 +1,252 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Callable, Iterable, Tuple
+
+SHORT_WINDOW = timedelta(minutes=1)
+LONG_WINDOW = timedelta(minutes=5)
+TREND_THRESHOLD = 0.1
+
+Sample = Tuple[datetime, float, float]
+
+
+class RunningWindow:
+    """Samples newer than a cutoff with running focus/frustration sums."""
+
+    __slots__ = ('samples', 'focus_sum', 'frustration_sum')
+
+    def __init__(self):
+        self.samples = deque()
+        self.focus_sum = 0.0
+        self.frustration_sum = 0.0
+
+    def push(self, sample: Sample):
+        self.samples.append(sample)
+        self.focus_sum += sample[1]
+        self.frustration_sum += sample[2]
+
+    def pop_oldest(self) -> Sample:
+        sample = self.samples.popleft()
+        self.focus_sum -= sample[1]
+        self.frustration_sum -= sample[2]
+        return sample
+
+    def push_oldest(self, sample: Sample):
+        self.samples.appendleft(sample)
+        self.focus_sum += sample[1]
+        self.frustration_sum += sample[2]
+
+    def pop_newest(self) -> Sample:
+        sample = self.samples.pop()
+        self.focus_sum -= sample[1]
+        self.frustration_sum -= sample[2]
+        return sample
+
+    def expire(self, cutoff: datetime):
+        while self.samples and self.samples[0][0] < cutoff:
+            self.pop_oldest()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def averages(self):
+        count = len(self.samples)
+        if not count:
+            return None, None
+        return self.focus_sum / count, self.frustration_sum / count
+
+
+class StudentWindow:
+    """
+    Recent samples of one student.
+
+    `short` holds the last minute. The five-minute window is split into
+    `newer` and `older` halves (newer holds count // 2 samples, as the old
+    trend query did), so the average and the trend are both O(1) to read.
+    """
+
+    __slots__ = ('short', 'newer', 'older', 'latest', 'local', 'loaded_at')
+
+    def __init__(self):
+        self.short = RunningWindow()
+        self.newer = RunningWindow()
+        self.older = RunningWindow()
+        self.latest: Optional[Sample] = None
+        self.local = False
+        self.loaded_at = 0.0
+
+    def add(self, sample: Sample):
+        if self.latest is not None and sample[0] < self.latest[0]:
+            return  # Out of order samples are rare; keep the windows monotonic
+        self.latest = sample
+        self.short.push(sample)
+        self.newer.push(sample)
+        self._rebalance()
+
+    def expire(self, now: datetime):
+        self.short.expire(now - SHORT_WINDOW)
+        long_cutoff = now - LONG_WINDOW
+        self.older.expire(long_cutoff)
+        if not self.older:
+            self.newer.expire(long_cutoff)
+        self._rebalance()
+
+    def _rebalance(self):
+        target = (len(self.newer) + len(self.older)) // 2
+        while len(self.newer) > target:
+            self.older.push(self.newer.pop_oldest())
+        while len(self.newer) < target:
+            self.newer.push_oldest(self.older.pop_newest())
+
+    def samples(self):
+        return list(self.older.samples) + list(self.newer.samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        count = len(self.newer) + len(self.older)
+        avg_focus_1m, avg_frustration_1m = self.short.averages()
+        if count:
+            avg_focus_5m = (self.newer.focus_sum + self.older.focus_sum) / count
+            avg_frustration_5m = (self.newer.frustration_sum + self.older.frustration_sum) / count
+        else:
+            avg_focus_5m = avg_frustration_5m = None
+
+        trend = 'stable'
+        newer_focus, _ = self.newer.averages()
+        older_focus, _ = self.older.averages()
+        if newer_focus is not None and older_focus is not None:
+            if newer_focus > older_focus + TREND_THRESHOLD:
+                trend = 'improving'
+            elif newer_focus < older_focus - TREND_THRESHOLD:
+                trend = 'declining'
+
+        return {
+            'latest_focus': self.latest[1] if self.latest else None,
+            'latest_frustration': self.latest[2] if self.latest else None,
+            'last_updated': self.latest[0] if self.latest else None,
+            'avg_focus_1m': avg_focus_1m,
+            'avg_frustration_1m': avg_frustration_1m,
+            'count_1m': len(self.short),
+            'avg_focus_5m': avg_focus_5m,
+            'avg_frustration_5m': avg_frustration_5m,
+            'count_5m': count,
+            'trend': trend,
+        }
+
+
+class BehaviorWindowCache:
+    """
+    Per-student rolling windows of recent focus/frustration samples.
+
+    The EmotionLog writer records every sample as it is queued, so the live
+    behavior endpoints read latest values, 1- and 5-minute averages and the
+    trend from memory instead of re-querying EmotionLog. A student with no
+    window yet (cold start, or samples written by another worker) is loaded
+    from the database through `loader` on first read; windows with no local
+    writes are reloaded after `reload_seconds` because this process does not
+    see their writes.
+    """
+
+    def __init__(self, app=None, max_students: int = 10000, reload_seconds: float = 5.0,
+                 loader: Optional[Callable[[int, datetime], Iterable[Sample]]] = None):
+        self.max_students = max_students
+        self.reload_seconds = reload_seconds
+        self.loader = loader
+        self._windows: OrderedDict = OrderedDict()
+        self._listeners = []
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_students = app.config.get('BEHAVIOR_CACHE_MAX_STUDENTS', self.max_students)
+        self.reload_seconds = app.config.get('BEHAVIOR_CACHE_RELOAD_SECONDS', self.reload_seconds)
+        if self.loader is None:
+            self.loader = load_recent_samples
+        app.extensions['behavior_window_cache'] = self
+
+    def _window(self, student_id: int) -> StudentWindow:
+        window = self._windows.pop(student_id, None) or StudentWindow()
+        self._windows[student_id] = window
+        while len(self._windows) > self.max_students:
+            self._windows.popitem(last=False)
+        return window
+
+    def add_listener(self, listener: Callable[[int], None]):
+        """Call `listener(student_id)` after every recorded sample."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def record(self, student_id: int, timestamp: Optional[datetime], focus_score: float, frustration_score: float):
+        sample = (timestamp or datetime.utcnow(), float(focus_score or 0.0), float(frustration_score or 0.0))
+        with self._lock:
+            window = self._window(student_id)
+            window.local = True
+            window.add(sample)
+        for listener in self._listeners:
+            listener(student_id)
+
+    def record_rows(self, rows: Iterable[Dict[str, Any]]):
+        """Record EmotionLog mappings as written by the EmotionLog writer."""
+        for row in rows:
+            self.record(row['student_id'], row.get('timestamp'), row.get('focus_score'), row.get('frustration_score'))
+
+    def _needs_load(self, window: Optional[StudentWindow]) -> bool:
+        if window is None or not window.loaded_at:
+            return True
+        return not window.local and time.monotonic() - window.loaded_at > self.reload_seconds
+
+    def _load(self, student_id: int, now: datetime):
+        rows = self.loader(student_id, now - LONG_WINDOW) if self.loader else []
+        loaded = sorted((ts, float(focus or 0.0), float(frustration or 0.0)) for ts, focus, frustration in rows)
+
+        with self._lock:
+            current = self._windows.get(student_id)
+            window = StudentWindow()
+            local_samples = current.samples() if current is not None and current.local else []
+            # Rows this process already recorded may have been flushed; keep only older DB rows
+            first_local = local_samples[0][0] if local_samples else None
+            for sample in loaded:
+                if first_local is None or sample[0] < first_local:
+                    window.add(sample)
+            for sample in local_samples:
+                window.add(sample)
+            window.local = bool(local_samples)
+            window.loaded_at = time.monotonic()
+            self._windows.pop(student_id, None)
+            self._windows[student_id] = window
+            while len(self._windows) > self.max_students:
+                self._windows.popitem(last=False)
+
+    def snapshot(self, student_id: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Latest sample, windowed averages and trend for one student."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            needs_load = self._needs_load(self._windows.get(student_id))
+        if needs_load:
+            self._load(student_id, now)
+        with self._lock:
+            window = self._windows.get(student_id) or StudentWindow()
+            window.expire(now)
+            return window.snapshot()
+
+    def forget(self, student_id: int):
+        with self._lock:
+            self._windows.pop(student_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._windows)
+
+
+def load_recent_samples(student_id: int, since: datetime):
+    """Warm a window from EmotionLog rows newer than `since`."""
+    from models import EmotionLog
+
+    return EmotionLog.query.with_entities(EmotionLog.timestamp, EmotionLog.focus_score, EmotionLog.frustration_score)\
+        .filter(EmotionLog.student_id == student_id, EmotionLog.timestamp >= since)\
+        .order_by(EmotionLog.timestamp)\
+        .all()
+
+
+behavior_window_cache = BehaviorWindowCache()
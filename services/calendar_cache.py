@@ -0,0 +1,164 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Callable, Iterable
+
+from flask import Response, jsonify, request
+
+FEED_FORMATS = ('json', 'ics')
+
+
+class CalendarEntry:
+    __slots__ = ('items', 'etag', 'course_ids', 'stamp', 'built_at', 'built_utc')
+
+    def __init__(self, items, course_ids, stamp):
+        self.items = items
+        self.course_ids = course_ids
+        self.stamp = stamp
+        self.built_at = time.monotonic()
+        self.built_utc = datetime.utcnow()
+        digest = hashlib.sha1(json.dumps(items, default=str, sort_keys=True).encode()).hexdigest()
+        self.etag = digest[:20]
+
+
+class CalendarCache:
+    """
+    Per-user materialized calendar items with write-driven invalidation.
+
+    Writes bump a version counter for the course they touch (or for events,
+    which students see globally); an entry is reused only while the
+    versions of its courses are unchanged, so invalidation is O(1) however
+    many users have the course cached. Enrollment changes drop the user's
+    entry outright. Entries also expire after `ttl_seconds` so writes made
+    outside the views (scripts, other workers) show up eventually, and at
+    most `max_users` entries are kept, least recently used first out.
+    """
+
+    def __init__(self, app=None, max_users: int = 5000, ttl_seconds: int = 300):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[int, CalendarEntry]' = OrderedDict()
+        self._course_versions: Dict[int, int] = {}
+        self._events_version = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_users = app.config.get('CALENDAR_CACHE_MAX_USERS', self.max_users)
+        self.ttl_seconds = app.config.get('CALENDAR_CACHE_TTL_SECONDS', self.ttl_seconds)
+        app.extensions['calendar_cache'] = self
+
+    def _stamp(self, course_ids):
+        return self._events_version, tuple(self._course_versions.get(course_id, 0) for course_id in course_ids)
+
+    def get(self, user_id: int, course_ids: Iterable[int],
+            build: Callable[[], List[Dict[str, Any]]]) -> CalendarEntry:
+        """The user's calendar entry, rebuilt with `build()` if it is missing or stale."""
+        course_ids = tuple(sorted(course_ids))
+        with self._lock:
+            stamp = self._stamp(course_ids)
+            entry = self._entries.get(user_id)
+            if (entry is not None and entry.course_ids == course_ids and entry.stamp == stamp
+                    and time.monotonic() - entry.built_at < self.ttl_seconds):
+                self._entries.move_to_end(user_id)
+                self._hits += 1
+                return entry
+            self._misses += 1
+        # Build outside the lock; the stamp taken above marks the entry stale if a write lands meanwhile
+        entry = CalendarEntry(build(), course_ids, stamp)
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate_course(self, course_id: int):
+        """An assignment, quiz or meeting of this course was created, changed or deleted."""
+        with self._lock:
+            self._course_versions[course_id] = self._course_versions.get(course_id, 0) + 1
+
+    def invalidate_events(self):
+        """An Event was created or deleted; events are shown on every student calendar."""
+        with self._lock:
+            self._events_version += 1
+
+    def invalidate_user(self, user_id: int):
+        """The user's enrollments changed."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'users': len(self._entries), 'hits': self._hits, 'misses': self._misses}
+
+
+def _ical_escape(value) -> str:
+    text = str(value or '')
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _ical_time(value: datetime) -> str:
+    return value.strftime('%Y%m%dT%H%M%SZ')  # Dates are stored as naive UTC
+
+
+def to_ical(items: List[Dict[str, Any]], name: str = 'LMS Calendar', now: Optional[datetime] = None) -> str:
+    """Render calendar items as an iCalendar (RFC 5545) document."""
+    stamp = _ical_time(now or datetime.utcnow())
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//LMS//Calendar//EN', 'CALSCALE:GREGORIAN',
+             f'X-WR-CALNAME:{_ical_escape(name)}']
+    for item in items:
+        lines += [
+            'BEGIN:VEVENT',
+            f"UID:{item['type']}-{item['id']}@lms",
+            f'DTSTAMP:{stamp}',
+            f"DTSTART:{_ical_time(item['date'])}",
+        ]
+        if item.get('end_time'):
+            lines.append(f"DTEND:{_ical_time(item['end_time'])}")
+        lines.append(f"SUMMARY:{_ical_escape(item['title'])}")
+        if item.get('description'):
+            lines.append(f"DESCRIPTION:{_ical_escape(item['description'])}")
+        if item.get('course_name'):
+            lines.append(f"CATEGORIES:{_ical_escape(item['course_name'])}")
+        if item.get('meeting_link'):
+            lines.append(f"URL:{item['meeting_link']}")
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def to_json_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{key: value.isoformat() if isinstance(value, datetime) else value for key, value in item.items()}
+            for item in items]
+
+
+def feed_response(entry: CalendarEntry, fmt: str, name: str):
+    """
+    Conditional-GET response for a calendar feed. The ETag is derived from
+    the cached items, so a client that sends it back in If-None-Match gets
+    a bodiless 304 without the feed being rendered.
+    """
+    etag = f'{entry.etag}-{fmt}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif fmt == 'ics':
+        response = Response(to_ical(entry.items, name, now=entry.built_utc), mimetype='text/calendar')
+    else:
+        response = jsonify({'items': to_json_items(entry.items)})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+calendar_cache = CalendarCache()
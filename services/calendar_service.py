@@ -0,0 +1,135 @@
+import heapq
+from datetime import datetime
+from itertools import islice
+from typing import Optional, Dict, Any, List, Iterable, Iterator
+
+from models import db, Course, Assignment, Quiz, Meeting, Event
+
+UNKNOWN_COURSE = 'Unknown Course'
+
+
+def _assignment_item(assignment, course_title):
+    return {
+        'id': assignment.id,
+        'title': f"Assignment: {assignment.title}",
+        'description': assignment.instructions,
+        'date': assignment.due_date,
+        'type': 'assignment',
+        'course_name': course_title or UNKNOWN_COURSE,
+        'color': 'warning',
+        'points': assignment.points
+    }
+
+
+def _quiz_item(quiz, course_title):
+    return {
+        'id': quiz.id,
+        'title': f"Quiz: {quiz.title}",
+        'description': quiz.description,
+        'date': quiz.start_time,
+        'type': 'quiz',
+        'course_name': course_title or UNKNOWN_COURSE,
+        'color': 'info',
+        'end_time': quiz.end_time,
+        'time_limit': quiz.time_limit
+    }
+
+
+def _meeting_item(meeting, course_title):
+    return {
+        'id': meeting.id,
+        'title': meeting.title,
+        'description': meeting.description,
+        'date': meeting.scheduled_time,
+        'type': 'meeting',
+        'course_name': course_title or UNKNOWN_COURSE,
+        'color': 'success',
+        'meeting_link': meeting.meeting_link
+    }
+
+
+def _event_item(event):
+    return {
+        'id': event.id,
+        'title': event.title,
+        'description': event.description,
+        'date': event.event_date,
+        'type': 'event',
+        'course_name': None,
+        'color': 'primary'
+    }
+
+
+# (model, date column, item builder) for each course-scoped source
+COURSE_SOURCES = {
+    'assignment': (Assignment, Assignment.due_date, _assignment_item),
+    'quiz': (Quiz, Quiz.start_time, _quiz_item),
+    'meeting': (Meeting, Meeting.scheduled_time, _meeting_item),
+}
+
+
+def _course_stream(kind: str, course_ids: List[int], start: Optional[datetime],
+                   end: Optional[datetime], limit: Optional[int]) -> Iterator[Dict[str, Any]]:
+    """Items of one type, date-ordered by the database, with the course title joined in."""
+    model, date_column, build = COURSE_SOURCES[kind]
+    query = db.session.query(model, Course.title)\
+        .outerjoin(Course, model.course_id == Course.id)\
+        .filter(model.course_id.in_(course_ids), date_column.isnot(None))
+    if start is not None:
+        query = query.filter(date_column >= start)
+    if end is not None:
+        query = query.filter(date_column <= end)
+    query = query.order_by(date_column, model.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return (build(row, course_title) for row, course_title in query)
+
+
+def _event_stream(event_user_id: Optional[int], start: Optional[datetime],
+                  end: Optional[datetime], limit: Optional[int]) -> Iterator[Dict[str, Any]]:
+    query = Event.query.filter(Event.event_date.isnot(None))
+    if event_user_id is not None:
+        query = query.filter(Event.user_id == event_user_id)
+    if start is not None:
+        query = query.filter(Event.event_date >= start)
+    if end is not None:
+        query = query.filter(Event.event_date <= end)
+    query = query.order_by(Event.event_date, Event.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return (_event_item(event) for event in query)
+
+
+def merge_items(streams: Iterable[Iterable[Dict[str, Any]]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Merge date-sorted item streams into one date-sorted list. Ties keep the
+    order of the streams, as a stable sort of their concatenation would.
+    """
+    merged = heapq.merge(*streams, key=lambda item: item['date'])
+    return list(islice(merged, limit) if limit is not None else merged)
+
+
+def calendar_items(course_ids: List[int], event_user_id: Optional[int] = None, include_events: bool = True,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   limit: Optional[int] = None, order=('assignment', 'quiz', 'meeting', 'event')) -> List[Dict[str, Any]]:
+    """
+    Calendar items for the given courses plus events, sorted by date.
+
+    Events are global unless `event_user_id` restricts them to one author.
+    The date range and `limit` are applied by each query, so at most
+    `limit` rows per source are loaded; `order` sets which source wins ties.
+    """
+    streams = []
+    for kind in order:
+        if kind == 'event':
+            if include_events:
+                streams.append(_event_stream(event_user_id, start, end, limit))
+        elif course_ids:
+            streams.append(_course_stream(kind, course_ids, start, end, limit))
+    return merge_items(streams, limit)
+
+
+def upcoming_items(course_ids: List[int], now: Optional[datetime] = None, limit: int = 5,
+                   event_user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """The next `limit` items dated at or after `now`."""
+    return calendar_items(course_ids, event_user_id=event_user_id, start=now or datetime.utcnow(), limit=limit)
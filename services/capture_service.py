@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+# Formats the frame decoder accepts, in order of preference
+SUPPORTED_FORMATS = ('webp', 'jpeg')
+
+# Capture resolutions the server will ask for, largest first
+RESOLUTIONS = ((320, 240), (240, 180), (160, 120))
+
+DEFAULT_INTERVAL_MS = 2000
+MAX_INTERVAL_MS = 10000
+DEFAULT_ACTIVITY_INTERVAL_MS = 5000
+
+
+def _load_profile(load: float):
+    """Resolution and base capture interval for the given pool utilisation."""
+    if load >= 0.9:
+        return RESOLUTIONS[-1], DEFAULT_INTERVAL_MS * 3
+    if load >= 0.6:
+        return RESOLUTIONS[1], DEFAULT_INTERVAL_MS * 2
+    return RESOLUTIONS[0], DEFAULT_INTERVAL_MS
+
+
+def negotiate_capture(hello: Optional[Dict[str, Any]], load: float = 0.0) -> Dict[str, Any]:
+    """
+    Pick capture settings for a client from its `capture_hello` message.
+
+    `hello` may list the image formats the browser can encode, its maximum
+    capture size and whether it can send binary frames. `load` is the
+    analysis pool utilisation (0.0-1.0); under load the server asks for
+    smaller frames less often.
+    """
+    hello = hello or {}
+    client_formats = [str(f).lower() for f in hello.get('formats') or ['jpeg']]
+    image_format = next((f for f in SUPPORTED_FORMATS if f in client_formats), 'jpeg')
+
+    (width, height), interval_ms = _load_profile(load)
+
+    max_width = hello.get('max_width')
+    max_height = hello.get('max_height')
+    if max_width and max_height and (width > max_width or height > max_height):
+        width, height = int(max_width), int(max_height)
+
+    return {
+        'binary': bool(hello.get('binary', False)),
+        'format': image_format,
+        'width': width,
+        'height': height,
+        'interval_ms': min(interval_ms, MAX_INTERVAL_MS),
+    }
+
+
+class CaptureRateController:
+    """
+    Suggests per-student capture settings from server load and how stable
+    that student's recent scores are.
+
+    Focus scores are tracked as an exponentially weighted mean and variance.
+    A student whose focus has been high and steady is asked for frames less
+    often (up to `max_stability_factor` times the base interval), so capture
+    budget goes to students whose state is changing. Pool load shrinks the
+    resolution and stretches the interval for everyone.
+
+    Only the video frame interval adapts. activity_score() scores raw
+    counts per report, so the activity_data interval stays fixed; a longer
+    report window would inflate focus and feed back into stability.
+    """
+
+    def __init__(self, alpha: float = 0.2, max_students: int = 10000,
+                 stable_variance: float = 0.005, max_stability_factor: int = 4):
+        self.alpha = alpha
+        self.max_students = max_students
+        self.stable_variance = stable_variance
+        self.max_stability_factor = max_stability_factor
+        self._lock = threading.Lock()
+        self._scores: OrderedDict = OrderedDict()  # student_id -> [mean, variance, samples]
+
+    def record(self, student_id: int, focus_score: float):
+        with self._lock:
+            state = self._scores.pop(student_id, None)
+            if state is None:
+                state = [focus_score, 0.0, 1]
+            else:
+                mean, variance, samples = state
+                delta = focus_score - mean
+                mean += self.alpha * delta
+                variance = (1 - self.alpha) * (variance + self.alpha * delta * delta)
+                state = [mean, variance, samples + 1]
+            self._scores[student_id] = state
+            while len(self._scores) > self.max_students:
+                self._scores.popitem(last=False)
+
+    def stability_factor(self, student_id: int) -> int:
+        """1 for unknown or changing students, up to max_stability_factor for steady, focused ones."""
+        with self._lock:
+            state = self._scores.get(student_id)
+        if state is None:
+            return 1
+        mean, variance, samples = state
+        if samples < 5 or variance > self.stable_variance:
+            return 1
+        if mean >= 0.7:
+            return self.max_stability_factor
+        return 2
+
+    def suggest(self, student_id: int, load: float = 0.0) -> Dict[str, int]:
+        (width, height), interval_ms = _load_profile(load)
+        factor = self.stability_factor(student_id)
+        return {
+            'interval_ms': min(interval_ms * factor, MAX_INTERVAL_MS),
+            'width': width,
+            'height': height,
+            'activity_interval_ms': DEFAULT_ACTIVITY_INTERVAL_MS,
+        }
+
+    def forget(self, student_id: int):
+        with self._lock:
+            self._scores.pop(student_id, None)
+
+
+capture_rate_controller = CaptureRateController()
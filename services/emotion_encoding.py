@@ -0,0 +1,188 @@
+"""
+Compact, versioned encoding for EmotionLog source data.
+
+A blob is a 4-byte header (format version, schema id, value count) followed
+by little-endian float32 values in the fixed field order of the schema.
+Missing fields are stored as NaN and left out when decoding.
+"""
+import ast
+import math
+import re
+import struct
+import sys
+from array import array
+from typing import Optional, Dict, Any, List, Sequence
+
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BBH')
+
+SCHEMA_MONITOR = 1
+SCHEMA_DEEPFACE = 2
+SCHEMA_ACTIVITY = 3
+
+# Field paths per schema; a path is a tuple of nested dict keys
+SCHEMAS = {
+    SCHEMA_MONITOR: (
+        ('face', 'emotions', 'happy'),
+        ('face', 'emotions', 'sad'),
+        ('face', 'emotions', 'angry'),
+        ('face', 'emotions', 'surprised'),
+        ('face', 'emotions', 'disgusted'),
+        ('face', 'emotions', 'neutral'),
+        ('face', 'attention'),
+        ('voice', 'tone'),
+        ('voice', 'volume'),
+        ('keyboard', 'activity'),
+        ('keyboard', 'typing_speed'),
+        ('keyboard', 'error_rate'),
+        ('mouse', 'movement'),
+        ('mouse', 'clicks'),
+    ),
+    SCHEMA_DEEPFACE: (
+        ('angry',),
+        ('disgust',),
+        ('fear',),
+        ('happy',),
+        ('sad',),
+        ('surprise',),
+        ('neutral',),
+    ),
+    SCHEMA_ACTIVITY: (
+        ('keypresses',),
+        ('mousemoves',),
+        ('mouseclicks',),
+    ),
+}
+
+# np.float64(0.5) / numpy.float32(1.0) as written by str() of NumPy scalars
+NUMPY_SCALAR = re.compile(r'\b(?:np|numpy)\.[a-z]+\d*\(([^()]*)\)')
+
+SCHEMA_NAMES = {
+    SCHEMA_MONITOR: 'monitor',
+    SCHEMA_DEEPFACE: 'deepface',
+    SCHEMA_ACTIVITY: 'activity',
+}
+
+
+def field_names(schema_id: int) -> List[str]:
+    """Dotted column names for a schema, e.g. 'face.emotions.happy'."""
+    return ['.'.join(path) for path in SCHEMAS[schema_id]]
+
+
+def _lookup(data, path):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return math.nan
+        data = data[key]
+    try:
+        return float(data)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def encode(schema_id: int, data: Dict[str, Any]) -> bytes:
+    """Pack the schema's fields from a (nested) dict into a blob."""
+    paths = SCHEMAS[schema_id]
+    values = array('f', (_lookup(data, path) for path in paths))
+    if values.itemsize != 4:
+        raise RuntimeError("float32 array support is required")
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return HEADER.pack(FORMAT_VERSION, schema_id, len(paths)) + values.tobytes()
+
+
+def encode_monitor(sources: Dict[str, Any]) -> bytes:
+    return encode(SCHEMA_MONITOR, sources)
+
+
+def encode_deepface(emotion: Dict[str, Any]) -> bytes:
+    return encode(SCHEMA_DEEPFACE, emotion)
+
+
+def encode_activity(activity: Dict[str, Any]) -> bytes:
+    return encode(SCHEMA_ACTIVITY, activity)
+
+
+def read_header(blob: bytes):
+    """Return (format_version, schema_id, value_count) for a blob."""
+    version, schema_id, count = HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported source data format version {version}")
+    if schema_id not in SCHEMAS:
+        raise ValueError(f"Unknown source data schema {schema_id}")
+    return version, schema_id, count
+
+
+def decode_values(blob: bytes) -> List[float]:
+    _, _, count = read_header(blob)
+    values = array('f')
+    values.frombytes(blob[HEADER.size:HEADER.size + count * 4])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tolist()
+
+
+def decode(blob: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """Unpack a blob back into the nested dict it was encoded from."""
+    if not blob:
+        return None
+    _, schema_id, _ = read_header(blob)
+    result: Dict[str, Any] = {}
+    for path, value in zip(SCHEMAS[schema_id], decode_values(blob)):
+        if math.isnan(value):
+            continue
+        node = result
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = round(value, 6)
+    return result
+
+
+def decode_columns(blobs: Sequence[Optional[bytes]], schema_id: int):
+    """
+    Decode many blobs of one schema into an (N, fields) float32 NumPy array.
+    Rows whose blob is missing or of another schema are all NaN. Intended for
+    analytics that read fields across many rows without building dicts.
+    """
+    import numpy as np
+
+    width = len(SCHEMAS[schema_id])
+    out = np.full((len(blobs), width), np.nan, dtype=np.float32)
+    for i, blob in enumerate(blobs):
+        if not blob or blob[1] != schema_id:
+            continue
+        _, _, count = read_header(blob)
+        out[i, :min(count, width)] = np.frombuffer(blob, dtype='<f4', count=min(count, width), offset=HEADER.size)
+    return out
+
+
+def schema_for_legacy(data: Dict[str, Any]) -> Optional[int]:
+    """Guess which schema a legacy str(dict) summary belongs to."""
+    if any(key in data for key in ('face', 'voice', 'keyboard', 'mouse')):
+        return SCHEMA_MONITOR
+    if any(key in data for key in ('angry', 'happy', 'neutral', 'sad')):
+        return SCHEMA_DEEPFACE
+    if any(key in data for key in ('keypresses', 'mousemoves', 'mouseclicks')):
+        return SCHEMA_ACTIVITY
+    return None
+
+
+def parse_legacy_summary(summary: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Parse an old `str(dict)` source_data_summary, or return None if it is not a dict repr."""
+    if not summary or not summary.lstrip().startswith('{'):
+        return None
+    try:
+        # Older writers stored NumPy scalars, whose repr literal_eval rejects
+        data = ast.literal_eval(NUMPY_SCALAR.sub(r'\1', summary))
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def encode_legacy_summary(summary: Optional[str]) -> Optional[bytes]:
+    """Convert an old `str(dict)` source_data_summary into a blob when its schema is recognised."""
+    data = parse_legacy_summary(summary)
+    if data is None:
+        return None
+    schema_id = schema_for_legacy(data)
+    return encode(schema_id, data) if schema_id else None
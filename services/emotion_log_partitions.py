@@ -0,0 +1,208 @@
+import re
+import threading
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+
+import sqlalchemy as sa
+
+from models import db, EmotionLog
+
+PARTITION_PREFIX = 'emotion_log_'
+PARTITION_PATTERN = re.compile(r'^emotion_log_(\d{4})(\d{2})$')
+
+
+def month_start(timestamp: datetime) -> datetime:
+    return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def shift_months(start: datetime, months: int) -> datetime:
+    index = start.year * 12 + (start.month - 1) + months
+    return start.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(timestamp: datetime) -> str:
+    return f'{PARTITION_PREFIX}{timestamp.year:04d}{timestamp.month:02d}'
+
+
+def keyset_clause(timestamp_column, id_column, cursor: Tuple[datetime, int], descending: bool):
+    """Rows strictly past `cursor` = (timestamp, id) in (timestamp, id) order."""
+    cursor_timestamp, cursor_id = cursor
+    if descending:
+        return sa.or_(timestamp_column < cursor_timestamp,
+                      sa.and_(timestamp_column == cursor_timestamp, id_column < cursor_id))
+    return sa.or_(timestamp_column > cursor_timestamp,
+                  sa.and_(timestamp_column == cursor_timestamp, id_column > cursor_id))
+
+
+class EmotionLogPartitions:
+    """
+    Optional per-month archive tables for EmotionLog.
+
+    The main `emotion_log` table keeps only the most recent `hot_months`
+    months, which is all the live behavior views read. Older rows are moved
+    by archive() into `emotion_log_YYYYMM` tables with the same columns and
+    indexes, and fetch_range() reads a time range across whichever tables
+    cover it. Rows keep their ids when they move, so (timestamp, id) stays
+    unique across tables; late rows for an archived month are written to the
+    main table and moved on the next archive() run.
+
+    With EMOTION_LOG_PARTITIONING off everything stays in `emotion_log` and
+    fetch_range() is a plain indexed query.
+    """
+
+    def __init__(self, app=None, hot_months: int = 1, archive_batch: int = 5000):
+        self.app = None
+        self.enabled = False
+        self.hot_months = hot_months
+        self.archive_batch = archive_batch
+        self._metadata = sa.MetaData()
+        self._tables: Dict[str, sa.Table] = {}
+        self._existing = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('EMOTION_LOG_PARTITIONING', False)
+        self.hot_months = max(1, app.config.get('EMOTION_LOG_HOT_MONTHS', self.hot_months))
+        self.archive_batch = app.config.get('EMOTION_LOG_ARCHIVE_BATCH', self.archive_batch)
+        app.extensions['emotion_log_partitions'] = self
+
+    def hot_cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """Rows older than this belong in a monthly partition."""
+        return shift_months(month_start(now or datetime.utcnow()), -(self.hot_months - 1))
+
+    def table_for(self, name: str) -> sa.Table:
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None:
+                columns = [sa.Column(c.name, c.type, primary_key=c.primary_key) for c in EmotionLog.__table__.columns]
+                table = sa.Table(
+                    name, self._metadata, *columns,
+                    sa.Index(f'ix_{name}_student_id_timestamp', 'student_id', 'timestamp'),
+                    sa.Index(f'ix_{name}_course_id_timestamp', 'course_id', 'timestamp'),
+                )
+                self._tables[name] = table
+            return table
+
+    def existing_partitions(self, refresh: bool = False) -> List[str]:
+        """Names of the partition tables in the database, oldest first."""
+        if self._existing is None or refresh:
+            names = sa.inspect(db.engine).get_table_names()
+            self._existing = sorted(name for name in names if PARTITION_PATTERN.match(name))
+        return list(self._existing)
+
+    def _ensure_table(self, name: str) -> sa.Table:
+        table = self.table_for(name)
+        if name not in self.existing_partitions():
+            table.create(bind=db.session.connection(), checkfirst=True)
+            self._existing = sorted(set(self._existing) | {name})
+        return table
+
+    def _insert_archived(self, archived: Dict[str, List[Dict[str, Any]]]):
+        for name, rows in archived.items():
+            db.session.execute(self._ensure_table(name).insert(), rows)
+
+    def archive(self, now: Optional[datetime] = None) -> int:
+        """
+        Move rows older than the hot window out of `emotion_log`, one batch
+        per transaction. Returns the number of rows moved.
+        """
+        if not self.enabled:
+            return 0
+        cutoff = self.hot_cutoff(now)
+        main = EmotionLog.__table__
+        moved = 0
+        while True:
+            rows = db.session.execute(
+                sa.select(main).where(main.c.timestamp < cutoff).order_by(main.c.id).limit(self.archive_batch)
+            ).mappings().all()
+            if not rows:
+                break
+            archived = {}
+            for row in rows:
+                archived.setdefault(partition_name(row['timestamp']), []).append(dict(row))
+            self._insert_archived(archived)
+            db.session.execute(main.delete().where(main.c.id.in_([row['id'] for row in rows])))
+            db.session.commit()
+            moved += len(rows)
+        return moved
+
+    def _partitions_for(self, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        cutoff = self.hot_cutoff()
+        if start is not None and start >= cutoff:
+            return []
+        low = partition_name(start) if start is not None else ''
+        high = partition_name(end) if end is not None else '~'
+        return [name for name in self.existing_partitions() if low <= name <= high]
+
+    def tables_for_range(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[sa.Table]:
+        """The main table plus every partition that may hold rows in [start, end]."""
+        tables = [EmotionLog.__table__]
+        if self.enabled:
+            tables.extend(self.table_for(name) for name in self._partitions_for(start, end))
+        return tables
+
+    def fetch_range(self, student_id: Optional[int] = None, course_id: Optional[int] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    descending: bool = False, limit: Optional[int] = None,
+                    after: Optional[Tuple[datetime, int]] = None) -> List[EmotionLog]:
+        """
+        EmotionLog rows in [start, end] ordered by (timestamp, id), read from
+        the main table and every partition that overlaps the range. `after`
+        is a (timestamp, id) keyset cursor; only rows past it are returned.
+        Archived rows are returned as detached EmotionLog instances.
+        """
+        query = EmotionLog.query
+        if student_id is not None:
+            query = query.filter(EmotionLog.student_id == student_id)
+        if course_id is not None:
+            query = query.filter(EmotionLog.course_id == course_id)
+        if start is not None:
+            query = query.filter(EmotionLog.timestamp >= start)
+        if end is not None:
+            query = query.filter(EmotionLog.timestamp <= end)
+        if after is not None:
+            query = query.filter(keyset_clause(EmotionLog.timestamp, EmotionLog.id, after, descending))
+        order = (EmotionLog.timestamp.desc(), EmotionLog.id.desc()) if descending else (EmotionLog.timestamp, EmotionLog.id)
+        query = query.order_by(*order)
+        if limit is not None:
+            query = query.limit(limit)
+        logs = query.all()
+
+        if not self.enabled:
+            return logs
+
+        if after is not None:
+            # The cursor narrows which months can still hold rows
+            if descending:
+                end = after[0] if end is None else min(end, after[0])
+            else:
+                start = after[0] if start is None else max(start, after[0])
+        partitions = self._partitions_for(start, end)
+        if not partitions:
+            return logs
+        for name in partitions:
+            table = self.table_for(name)
+            stmt = sa.select(table)
+            if student_id is not None:
+                stmt = stmt.where(table.c.student_id == student_id)
+            if course_id is not None:
+                stmt = stmt.where(table.c.course_id == course_id)
+            if start is not None:
+                stmt = stmt.where(table.c.timestamp >= start)
+            if end is not None:
+                stmt = stmt.where(table.c.timestamp <= end)
+            if after is not None:
+                stmt = stmt.where(keyset_clause(table.c.timestamp, table.c.id, after, descending))
+            if limit is not None:
+                column_order = (table.c.timestamp.desc(), table.c.id.desc()) if descending else (table.c.timestamp, table.c.id)
+                stmt = stmt.order_by(*column_order).limit(limit)
+            logs.extend(EmotionLog(**row) for row in db.session.execute(stmt).mappings())
+
+        logs.sort(key=lambda log: (log.timestamp, log.id), reverse=descending)
+        return logs[:limit] if limit is not None else logs
+
+
+emotion_log_partitions = EmotionLogPartitions()
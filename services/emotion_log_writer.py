@@ -0,0 +1,300 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from flask import has_app_context
+
+from models import db, Enrollment, EmotionLog
+from services.behavior_window_cache import behavior_window_cache
+from services.emotion_rollups import apply_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class EmotionLogWriter:
+    """
+    Write-behind buffer for EmotionLog rows and enrollment focus updates.
+
+    Socket handlers and monitors enqueue samples here instead of committing
+    them one by one. Pending rows are flushed as one bulk insert plus one bulk
+    enrollment update every `flush_interval_ms`, or as soon as `max_batch`
+    rows are waiting. A batch whose commit fails (e.g. SQLite "database is
+    locked") goes back to the front of the queue and is retried on the next
+    flush, up to `max_attempts` commits, before it is dropped.
+    """
+
+    def __init__(self, app=None, flush_interval_ms: int = 500, max_batch: int = 200, max_attempts: int = 3):
+        self.app = None
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.write_behind = True
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending_logs: List[Dict[str, Any]] = []
+        self._pending_enrollments: Dict[tuple, Dict[str, Any]] = {}
+        self._enrollment_attempts: Dict[tuple, int] = {}
+        self._thread = None
+        self._stopped = False
+        self._stats = {
+            'flushes': 0,
+            'rows_written': 0,
+            'enrollments_updated': 0,
+            'rows_dropped': 0,
+            'flush_errors': 0,
+            'rows_requeued': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'last_flush_at': None,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get('EMOTION_LOG_FLUSH_INTERVAL_MS', self.flush_interval * 1000) / 1000.0
+        self.max_batch = app.config.get('EMOTION_LOG_MAX_BATCH', self.max_batch)
+        self.max_attempts = app.config.get('EMOTION_LOG_FLUSH_ATTEMPTS', self.max_attempts)
+        self.write_behind = app.config.get('EMOTION_LOG_WRITE_BEHIND', True)
+        app.extensions['emotion_log_writer'] = self
+        atexit.register(self.shutdown)
+
+    def enqueue(self, student_id: int, focus_score: float, frustration_score: float,
+                source_data_summary: Optional[str] = None, course_id: Optional[int] = None,
+                timestamp: Optional[datetime] = None, resolve_course: bool = False,
+                source_data: Optional[bytes] = None):
+        """
+        Queue one EmotionLog row.
+
+        With resolve_course=True the course is taken from the student's first
+        enrollment at flush time and the row is dropped if there is none,
+        matching what the media_frame handler used to do inline.
+        `source_data` is a blob from services.emotion_encoding.
+        """
+        row = {
+            'student_id': student_id,
+            'course_id': course_id,
+            'timestamp': timestamp or datetime.utcnow(),
+            'focus_score': focus_score,
+            'frustration_score': frustration_score,
+            'source_data_summary': source_data_summary,
+            'source_data': source_data,
+        }
+        if resolve_course and course_id is None:
+            row['_resolve_course'] = True
+        behavior_window_cache.record(student_id, row['timestamp'], focus_score, frustration_score)
+        with self._lock:
+            self._pending_logs.append(row)
+            depth = len(self._pending_logs)
+        self._after_enqueue(depth)
+
+    def update_enrollment(self, student_id: int, course_id: Optional[int] = None, **fields):
+        """
+        Queue an update of Enrollment columns (latest_focus_score,
+        frustration_level, last_updated, is_monitoring). Updates for the same
+        enrollment are coalesced so only the newest values are written. A
+        course_id of None targets the student's first enrollment.
+        """
+        key = (student_id, course_id)
+        with self._lock:
+            self._pending_enrollments.setdefault(key, {}).update(fields)
+            depth = len(self._pending_logs)
+        self._after_enqueue(depth)
+
+    def _after_enqueue(self, depth: int):
+        if not self.write_behind:
+            self.flush()
+            return
+        self._ensure_started()
+        if depth >= self.max_batch:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='emotion-log-writer')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything that is pending. Returns the number of log rows written."""
+        with self._flush_lock:
+            with self._lock:
+                logs, self._pending_logs = self._pending_logs, []
+                updates, self._pending_enrollments = self._pending_enrollments, {}
+            if not logs and not updates:
+                return 0
+
+            started = time.perf_counter()
+            written = 0
+            try:
+                written, updated = self._commit(logs, updates)
+                self._stats['rows_written'] += written
+                self._stats['enrollments_updated'] += updated
+                self._stats['rows_dropped'] += len(logs) - written
+                if self._enrollment_attempts:
+                    with self._lock:
+                        for key in updates:
+                            self._enrollment_attempts.pop(key, None)
+            except Exception as e:
+                self._stats['flush_errors'] += 1
+                self._requeue(logs, updates, e)
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._stats['flushes'] += 1
+            self._stats['last_flush_ms'] = elapsed_ms
+            self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed_ms)
+            self._stats['total_flush_ms'] += elapsed_ms
+            self._stats['last_flush_at'] = datetime.utcnow()
+            return written
+
+    def _requeue(self, logs, updates, error):
+        """Put a failed batch back ahead of newer work, dropping what has used up its attempts."""
+        retry_logs = []
+        for row in logs:
+            row['_attempts'] = row.get('_attempts', 0) + 1
+            if row['_attempts'] < self.max_attempts:
+                retry_logs.append(row)
+        dropped = len(logs) - len(retry_logs)
+        with self._lock:
+            self._pending_logs = retry_logs + self._pending_logs
+            for key, fields in updates.items():
+                attempts = self._enrollment_attempts.get(key, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._enrollment_attempts.pop(key, None)
+                    continue
+                self._enrollment_attempts[key] = attempts
+                # Values queued since the failed flush are newer and win
+                self._pending_enrollments[key] = dict(fields, **self._pending_enrollments.get(key, {}))
+        self._stats['rows_requeued'] += len(retry_logs)
+        self._stats['rows_dropped'] += dropped
+        if dropped:
+            logger.error("EmotionLog flush failed, dropped %d rows after %d attempts: %s",
+                         dropped, self.max_attempts, error)
+        else:
+            logger.warning("EmotionLog flush failed, retrying %d rows: %s", len(retry_logs), error)
+
+    def write_batch(self, logs: List[Dict[str, Any]], updates: Dict[tuple, Dict[str, Any]]):
+        """
+        Write log rows and enrollment updates immediately in one transaction,
+        bypassing the buffer. `logs` are dicts shaped like enqueue() arguments
+        and `updates` maps (student_id, course_id) to Enrollment columns.
+        Returns (log rows written, enrollments updated).
+        """
+        behavior_window_cache.record_rows(logs)
+        return self._commit(logs, updates)
+
+    def _commit(self, logs, updates):
+        if has_app_context():
+            # Called from a request (write-behind disabled); share its session
+            try:
+                return self._write(logs, updates)
+            except Exception:
+                db.session.rollback()
+                raise
+        with self.app.app_context():
+            try:
+                return self._write(logs, updates)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _write(self, logs, updates):
+        # Resolve the "first enrollment" of every student that needs one in a single query
+        default_students = {row['student_id'] for row in logs if row.get('_resolve_course')}
+        default_students.update(sid for (sid, cid) in updates if cid is None)
+        explicit = {key for key in updates if key[1] is not None}
+
+        first_enrollment = {}
+        if default_students:
+            rows = db.session.query(Enrollment.student_id, Enrollment.id, Enrollment.course_id)\
+                .filter(Enrollment.student_id.in_(default_students))\
+                .order_by(Enrollment.id)\
+                .all()
+            for student_id, enrollment_id, course_id in rows:
+                first_enrollment.setdefault(student_id, (enrollment_id, course_id))
+
+        enrollment_ids = {}
+        if explicit:
+            rows = db.session.query(Enrollment.student_id, Enrollment.course_id, Enrollment.id)\
+                .filter(Enrollment.student_id.in_({sid for sid, _ in explicit}),
+                        Enrollment.course_id.in_({cid for _, cid in explicit}))\
+                .order_by(Enrollment.id)\
+                .all()
+            for student_id, course_id, enrollment_id in rows:
+                enrollment_ids.setdefault((student_id, course_id), enrollment_id)
+
+        log_mappings = []
+        for row in logs:
+            # Work on a copy so a batch that fails to commit can be retried unchanged
+            row = {key: value for key, value in row.items() if key != '_attempts'}
+            if row.pop('_resolve_course', False):
+                enrollment = first_enrollment.get(row['student_id'])
+                if not enrollment:
+                    continue
+                row['course_id'] = enrollment[1]
+            row['rolled_up'] = True
+            log_mappings.append(row)
+
+        # Several keys may point at the same enrollment; merge so each row is updated once
+        merged_updates = {}
+        for (student_id, course_id), fields in updates.items():
+            if course_id is None:
+                enrollment_id = first_enrollment.get(student_id, (None, None))[0]
+            else:
+                enrollment_id = enrollment_ids.get((student_id, course_id))
+            if enrollment_id is not None:
+                merged_updates.setdefault(enrollment_id, {'id': enrollment_id}).update(fields)
+
+        if log_mappings:
+            db.session.bulk_insert_mappings(EmotionLog, log_mappings)
+            # Rollups are updated in the same transaction, so rolled_up stays accurate
+            apply_rollups(log_mappings)
+        if merged_updates:
+            db.session.bulk_update_mappings(Enrollment, list(merged_updates.values()))
+        db.session.commit()
+        return len(log_mappings), len(merged_updates)
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return len(self._pending_logs) + len(self._pending_enrollments)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and flush latency figures for monitoring."""
+        stats = dict(self._stats)
+        flushes = stats.pop('total_flush_ms')
+        stats['avg_flush_ms'] = round(flushes / stats['flushes'], 3) if stats['flushes'] else 0.0
+        stats['last_flush_ms'] = round(stats['last_flush_ms'], 3)
+        stats['max_flush_ms'] = round(stats['max_flush_ms'], 3)
+        stats['last_flush_at'] = stats['last_flush_at'].isoformat() if stats['last_flush_at'] else None
+        stats['queue_depth'] = self.queue_depth()
+        stats['flush_interval_ms'] = int(self.flush_interval * 1000)
+        stats['max_batch'] = self.max_batch
+        return stats
+
+    def shutdown(self):
+        """Stop the background flusher and write whatever is still pending."""
+        self._stopped = True
+        self._wakeup.set()
+        if self.app is not None:
+            self.flush()
+
+
+emotion_log_writer = EmotionLogWriter()
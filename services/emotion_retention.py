@@ -0,0 +1,168 @@
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Tuple
+
+import sqlalchemy as sa
+
+from models import db, EmotionLog, EmotionLogRollup
+from services.emotion_log_partitions import emotion_log_partitions, shift_months, PARTITION_PATTERN
+from services.emotion_rollups import rollup_pending, rollup_horizon, ROLLUP_TTL_DAYS, RESOLUTIONS
+
+
+class EmotionLogRetention:
+    """
+    Deletes raw EmotionLog rows older than a TTL once they are in the rollups.
+
+    Expired rows that were never rolled up are folded in first, so history
+    views keep their minute/hour/day aggregates after the raw samples go.
+    Deletes run in batches of `batch_size` ids, each its own short
+    transaction, with `pause_ms` between batches so SQLite writers are not
+    locked out for the whole run. Archive partitions that lie entirely
+    before the cutoff are folded and dropped.
+
+    Rollups have their own windows, `rollup_ttl_days` per resolution: minute
+    buckets past theirs are deleted the same way, since the hour and day
+    buckets already hold the same samples.
+    """
+
+    def __init__(self, app=None, ttl_days: int = 30, batch_size: int = 500, pause_ms: int = 50,
+                 rollup_ttl_days: Optional[Dict[str, Optional[int]]] = None):
+        self.ttl_days = ttl_days
+        self.rollup_ttl_days = dict(ROLLUP_TTL_DAYS if rollup_ttl_days is None else rollup_ttl_days)
+        self.batch_size = batch_size
+        self.pause_ms = pause_ms
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl_days = app.config.get('EMOTION_LOG_RAW_TTL_DAYS', self.ttl_days)
+        self.batch_size = app.config.get('EMOTION_LOG_RETENTION_BATCH', self.batch_size)
+        self.pause_ms = app.config.get('EMOTION_LOG_RETENTION_PAUSE_MS', self.pause_ms)
+        self.rollup_ttl_days.update(app.config.get('EMOTION_LOG_ROLLUP_TTL_DAYS', {}))
+        app.extensions['emotion_log_retention'] = self
+
+    def cutoff(self, now: Optional[datetime] = None, ttl_days: Optional[int] = None) -> datetime:
+        return (now or datetime.utcnow()) - timedelta(days=self.ttl_days if ttl_days is None else ttl_days)
+
+    def expired_count(self, cutoff: datetime) -> Dict[str, int]:
+        """How many raw rows a run with this cutoff would fold and delete."""
+        base = db.session.query(sa.func.count(EmotionLog.id)).filter(EmotionLog.timestamp < cutoff)
+        return {
+            'expired': base.scalar() or 0,
+            'unrolled': base.filter(EmotionLog.rolled_up == sa.false()).scalar() or 0,
+        }
+
+    def rollup_horizons(self, now: Optional[datetime] = None) -> Dict[str, datetime]:
+        """Per pruned resolution, the bucket_start below which rollups are deleted."""
+        horizons = {}
+        for resolution in RESOLUTIONS:
+            horizon = rollup_horizon(resolution, now, self.rollup_ttl_days)
+            if horizon is not None:
+                horizons[resolution] = horizon
+        return horizons
+
+    def expired_rollup_count(self, horizons: Dict[str, datetime]) -> int:
+        return sum(
+            db.session.query(sa.func.count(EmotionLogRollup.id))
+            .filter(EmotionLogRollup.resolution == resolution, EmotionLogRollup.bucket_start < horizon)
+            .scalar() or 0
+            for resolution, horizon in horizons.items()
+        )
+
+    def _prune_rollups(self, horizons: Dict[str, datetime], max_batches: Optional[int]) -> Tuple[int, int]:
+        table = EmotionLogRollup.__table__
+        deleted = 0
+        batches = 0
+        for resolution, horizon in horizons.items():
+            while max_batches is None or batches < max_batches:
+                ids = db.session.execute(
+                    sa.select(table.c.id)
+                    .where(table.c.resolution == resolution, table.c.bucket_start < horizon)
+                    .order_by(table.c.id)
+                    .limit(self.batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                db.session.execute(table.delete().where(table.c.id.in_(ids)))
+                db.session.commit()
+                deleted += len(ids)
+                batches += 1
+                if self.pause_ms:
+                    time.sleep(self.pause_ms / 1000.0)
+        return deleted, batches
+
+    def _delete_expired(self, cutoff: datetime, max_batches: Optional[int]) -> Tuple[int, int]:
+        table = EmotionLog.__table__
+        deleted = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            ids = db.session.execute(
+                sa.select(table.c.id)
+                .where(table.c.timestamp < cutoff, table.c.rolled_up == sa.true())
+                .order_by(table.c.id)
+                .limit(self.batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            db.session.execute(table.delete().where(table.c.id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+            batches += 1
+            if self.pause_ms:
+                time.sleep(self.pause_ms / 1000.0)
+        return deleted, batches
+
+    def _drop_expired_partitions(self, cutoff: datetime) -> Tuple[int, int, int]:
+        folded = 0
+        deleted = 0
+        dropped = 0
+        for name in emotion_log_partitions.existing_partitions(refresh=True):
+            year, month = map(int, PARTITION_PATTERN.match(name).groups())
+            if shift_months(datetime(year, month, 1), 1) > cutoff:
+                continue  # Partition still holds rows inside the TTL
+            table = emotion_log_partitions.table_for(name)
+            folded += rollup_pending(batch_size=self.batch_size, table=table)
+            deleted += db.session.execute(sa.select(sa.func.count()).select_from(table)).scalar() or 0
+            table.drop(bind=db.session.connection(), checkfirst=True)
+            db.session.commit()
+            dropped += 1
+        if dropped:
+            emotion_log_partitions.existing_partitions(refresh=True)
+        return folded, deleted, dropped
+
+    def run(self, now: Optional[datetime] = None, ttl_days: Optional[int] = None,
+            max_batches: Optional[int] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Fold and delete raw rows older than the TTL, then prune rollups past
+        their resolution's window. Returns a report with the rows folded into
+        rollups, rows deleted, partitions dropped, rollups pruned and seconds
+        taken. With dry_run only the expired row counts are reported.
+        """
+        started = time.perf_counter()
+        cutoff = self.cutoff(now, ttl_days)
+        horizons = self.rollup_horizons(now)
+        report = {'cutoff': cutoff.isoformat(), 'dry_run': dry_run}
+        if dry_run:
+            report.update(self.expired_count(cutoff))
+            report['expired_rollups'] = self.expired_rollup_count(horizons)
+        else:
+            folded = rollup_pending(batch_size=self.batch_size, max_batches=max_batches, before=cutoff)
+            deleted, batches = self._delete_expired(cutoff, max_batches)
+            partition_folded = partition_deleted = dropped = 0
+            if emotion_log_partitions.enabled:
+                partition_folded, partition_deleted, dropped = self._drop_expired_partitions(cutoff)
+            # Raw rows are folded above first, so nothing lands in a bucket after it is pruned
+            remaining = None if max_batches is None else max(max_batches - batches, 0)
+            pruned, prune_batches = self._prune_rollups(horizons, remaining)
+            report.update({
+                'folded': folded + partition_folded,
+                'deleted': deleted + partition_deleted,
+                'batches': batches + prune_batches,
+                'partitions_dropped': dropped,
+                'rollups_pruned': pruned,
+            })
+        report['seconds'] = round(time.perf_counter() - started, 3)
+        return report
+
+
+emotion_log_retention = EmotionLogRetention()
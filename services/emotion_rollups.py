@@ -0,0 +1,279 @@
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+import sqlalchemy as sa
+
+from models import db, EmotionLog, EmotionLogRollup
+
+RESOLUTIONS = ('minute', 'hour', 'day')
+RESOLUTION_STEPS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+# Days each rollup resolution is kept; None keeps it forever. Every sample is
+# folded into all three resolutions at once, so pruning a finer resolution
+# only loses detail: the coarser buckets still hold the same samples.
+ROLLUP_TTL_DAYS = {'minute': 7, 'hour': 365, 'day': None}
+# Ranges offered by the history views; None means everything
+HISTORY_RANGES = {
+    '15m': timedelta(minutes=15),
+    '1h': timedelta(hours=1),
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    'all': None,
+}
+# Ranges up to this long are shown as raw samples
+RAW_MAX_RANGE = timedelta(minutes=15)
+DEFAULT_MAX_POINTS = 500
+# Rows per upsert statement; keeps bound parameters under SQLite's limit
+UPSERT_CHUNK = 90
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    if resolution == 'minute':
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == 'day':
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup resolution: {resolution!r}")
+
+
+def aggregate_rows(rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[int, str, datetime], Dict[str, Any]]:
+    """
+    Fold EmotionLog mappings into rollup buckets for every resolution.
+    Keys are (student_id, resolution, bucket_start).
+    """
+    buckets: Dict[Tuple[int, str, datetime], Dict[str, Any]] = {}
+    for row in rows:
+        timestamp = row.get('timestamp')
+        if timestamp is None or row.get('student_id') is None:
+            continue
+        focus = float(row.get('focus_score') or 0.0)
+        frustration = float(row.get('frustration_score') or 0.0)
+        for resolution in RESOLUTIONS:
+            key = (row['student_id'], resolution, bucket_start(timestamp, resolution))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = {
+                    'student_id': key[0],
+                    'resolution': resolution,
+                    'bucket_start': key[2],
+                    'sample_count': 1,
+                    'focus_sum': focus,
+                    'focus_min': focus,
+                    'focus_max': focus,
+                    'frustration_sum': frustration,
+                    'frustration_min': frustration,
+                    'frustration_max': frustration,
+                }
+                continue
+            bucket['sample_count'] += 1
+            bucket['focus_sum'] += focus
+            bucket['focus_min'] = min(bucket['focus_min'], focus)
+            bucket['focus_max'] = max(bucket['focus_max'], focus)
+            bucket['frustration_sum'] += frustration
+            bucket['frustration_min'] = min(bucket['frustration_min'], frustration)
+            bucket['frustration_max'] = max(bucket['frustration_max'], frustration)
+    return buckets
+
+
+def merge_bucket(existing: Dict[str, Any], bucket: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(existing)
+    merged['sample_count'] += bucket['sample_count']
+    merged['focus_sum'] += bucket['focus_sum']
+    merged['frustration_sum'] += bucket['frustration_sum']
+    for field, pick in (('focus_min', min), ('focus_max', max), ('frustration_min', min), ('frustration_max', max)):
+        merged[field] = bucket[field] if merged[field] is None else pick(merged[field], bucket[field])
+    return merged
+
+
+def _dialect_insert():
+    """The dialect insert() that supports ON CONFLICT DO UPDATE, or None."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    return None
+
+
+def _upsert_statement(insert, buckets: List[Dict[str, Any]]):
+    table = EmotionLogRollup.__table__
+    stmt = insert(table).values(buckets)
+    new = stmt.excluded
+
+    def lower(current, incoming):
+        return sa.case((incoming < current, incoming), else_=current)
+
+    def higher(current, incoming):
+        return sa.case((incoming > current, incoming), else_=current)
+
+    return stmt.on_conflict_do_update(
+        index_elements=['student_id', 'resolution', 'bucket_start'],
+        set_={
+            'sample_count': table.c.sample_count + new.sample_count,
+            'focus_sum': table.c.focus_sum + new.focus_sum,
+            'focus_min': lower(table.c.focus_min, new.focus_min),
+            'focus_max': higher(table.c.focus_max, new.focus_max),
+            'frustration_sum': table.c.frustration_sum + new.frustration_sum,
+            'frustration_min': lower(table.c.frustration_min, new.frustration_min),
+            'frustration_max': higher(table.c.frustration_max, new.frustration_max),
+        }
+    )
+
+
+def apply_rollups(rows: Iterable[Dict[str, Any]]) -> int:
+    """
+    Add EmotionLog mappings to the rollup tables in the caller's transaction.
+    Uses a single upsert where the database supports it, otherwise one read
+    of the affected buckets and a bulk insert/update. Returns buckets touched.
+    """
+    buckets = list(aggregate_rows(rows).values())
+    if not buckets:
+        return 0
+
+    insert = _dialect_insert()
+    if insert is not None:
+        for i in range(0, len(buckets), UPSERT_CHUNK):
+            db.session.execute(_upsert_statement(insert, buckets[i:i + UPSERT_CHUNK]))
+        return len(buckets)
+
+    by_key = {(b['student_id'], b['resolution'], b['bucket_start']): b for b in buckets}
+    existing = EmotionLogRollup.query.filter(
+        EmotionLogRollup.student_id.in_({key[0] for key in by_key}),
+        EmotionLogRollup.bucket_start.in_({key[2] for key in by_key})
+    ).all()
+    updates = []
+    for rollup in existing:
+        key = (rollup.student_id, rollup.resolution, rollup.bucket_start)
+        bucket = by_key.pop(key, None)
+        if bucket is None:
+            continue
+        current = {column: getattr(rollup, column) for column in
+                   ('id', 'sample_count', 'focus_sum', 'focus_min', 'focus_max',
+                    'frustration_sum', 'frustration_min', 'frustration_max')}
+        merged = merge_bucket(current, bucket)
+        updates.append({k: v for k, v in merged.items() if k in current})
+    if updates:
+        db.session.bulk_update_mappings(EmotionLogRollup, updates)
+    if by_key:
+        db.session.bulk_insert_mappings(EmotionLogRollup, list(by_key.values()))
+    return len(buckets)
+
+
+def rollup_pending(batch_size: int = 1000, max_batches: Optional[int] = None,
+                   before: Optional[datetime] = None, table=None) -> int:
+    """
+    Fold EmotionLog rows that were written outside the EmotionLog writer
+    (rolled_up is false) into the rollups, one committed batch at a time.
+    `before` limits this to older rows and `table` targets an archive
+    partition instead of emotion_log. Returns the number of rows folded.
+    """
+    table = table if table is not None else EmotionLog.__table__
+    folded = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        stmt = sa.select(table.c.id, table.c.student_id, table.c.timestamp,
+                         table.c.focus_score, table.c.frustration_score)\
+            .where(table.c.rolled_up == sa.false())
+        if before is not None:
+            stmt = stmt.where(table.c.timestamp < before)
+        rows = db.session.execute(stmt.order_by(table.c.id).limit(batch_size)).mappings().all()
+        if not rows:
+            break
+        apply_rollups(rows)
+        db.session.execute(table.update().where(table.c.id.in_([row['id'] for row in rows])).values(rolled_up=True))
+        db.session.commit()
+        folded += len(rows)
+        batches += 1
+    return folded
+
+
+def rollup_horizon(resolution: str, now: Optional[datetime] = None,
+                   ttl_days: Optional[Dict[str, Optional[int]]] = None) -> Optional[datetime]:
+    """Oldest bucket_start still kept for a resolution, or None if it is never pruned."""
+    days = (ROLLUP_TTL_DAYS if ttl_days is None else ttl_days).get(resolution)
+    if days is None:
+        return None
+    return bucket_start((now or datetime.utcnow()) - timedelta(days=days), resolution)
+
+
+def resolution_for_range(start: Optional[datetime], end: Optional[datetime],
+                         max_points: int = DEFAULT_MAX_POINTS) -> str:
+    """
+    The finest resolution that shows the range in at most `max_points`
+    points: 'raw' for short ranges, then minute, hour or day.
+    """
+    if start is None:
+        return 'day'
+    span = (end or datetime.utcnow()) - start
+    if span <= RAW_MAX_RANGE:
+        return 'raw'
+    for resolution in RESOLUTIONS:
+        if span / RESOLUTION_STEPS[resolution] <= max_points:
+            return resolution
+    return 'day'
+
+
+class RollupPoint:
+    """One rollup bucket shaped like an EmotionLog row for the history templates."""
+
+    __slots__ = ('timestamp', 'focus_score', 'frustration_score', 'focus_min', 'focus_max',
+                 'frustration_min', 'frustration_max', 'sample_count', 'resolution')
+
+    def __init__(self, rollup: EmotionLogRollup):
+        self.timestamp = rollup.bucket_start
+        self.focus_score = rollup.focus_mean or 0.0
+        self.frustration_score = rollup.frustration_mean or 0.0
+        self.focus_min = rollup.focus_min
+        self.focus_max = rollup.focus_max
+        self.frustration_min = rollup.frustration_min
+        self.frustration_max = rollup.frustration_max
+        self.sample_count = rollup.sample_count
+        self.resolution = rollup.resolution
+
+    @property
+    def source_details(self):
+        return {
+            'samples': self.sample_count,
+            'per': self.resolution,
+            'focus_range': [round(self.focus_min or 0.0, 3), round(self.focus_max or 0.0, 3)],
+            'frustration_range': [round(self.frustration_min or 0.0, 3), round(self.frustration_max or 0.0, 3)],
+        }
+
+
+def fetch_history(student_id: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  resolution: Optional[str] = None, max_points: int = DEFAULT_MAX_POINTS):
+    """
+    Newest-first history points for a student over [start, end]. Returns
+    (resolution, points); raw points are EmotionLog rows, others RollupPoint.
+    """
+    from services.emotion_log_partitions import emotion_log_partitions
+
+    requested = resolution
+    resolution = resolution or resolution_for_range(start, end, max_points)
+    if resolution == 'raw':
+        return resolution, emotion_log_partitions.fetch_range(
+            student_id=student_id, start=start, end=end, descending=True, limit=max_points
+        )
+    while True:
+        query = EmotionLogRollup.query.filter(
+            EmotionLogRollup.student_id == student_id,
+            EmotionLogRollup.resolution == resolution
+        )
+        if start is not None:
+            query = query.filter(EmotionLogRollup.bucket_start >= bucket_start(start, resolution))
+        if end is not None:
+            query = query.filter(EmotionLogRollup.bucket_start <= end)
+        rollups = query.order_by(EmotionLogRollup.bucket_start.desc()).limit(max_points).all()
+        # A range reaching past a pruned resolution's horizon is served from the next coarser one
+        horizon = rollup_horizon(resolution)
+        if (rollups or requested or resolution == RESOLUTIONS[-1]
+                or horizon is None or (start is not None and start >= horizon)):
+            return resolution, [RollupPoint(rollup) for rollup in rollups]
+        resolution = RESOLUTIONS[RESOLUTIONS.index(resolution) + 1]
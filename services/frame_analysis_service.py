@@ -0,0 +1,324 @@
+import base64
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from services.emotion_encoding import encode_activity, encode_deepface
+from services.head_pose_service import get_head_pose_estimator
+
+DEFAULT_ACTIVITY = {'keypresses': 0, 'mousemoves': 0, 'mouseclicks': 0}
+
+
+def decode_frame(video) -> Optional[Any]:
+    """
+    Decode a frame into a BGR image. Accepts raw JPEG/WebP bytes from the
+    binary transport (wrapped without copying) or a data URL / base64 string.
+    """
+    if cv2 is None:
+        return None
+    if isinstance(video, (bytes, bytearray, memoryview)):
+        img_data = video
+    else:
+        if video.startswith('data:image'):
+            video = video.split(',')[1]
+        img_data = base64.b64decode(video)
+    np_arr = np.frombuffer(img_data, np.uint8)
+    return cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+
+
+def activity_score(activity: Optional[Dict[str, int]]) -> float:
+    activity = activity or DEFAULT_ACTIVITY
+    return min(1.0, (activity.get('keypresses', 0) + activity.get('mousemoves', 0) + activity.get('mouseclicks', 0)) / 20.0)
+
+
+def _estimate_one(estimator, img, region):
+    try:
+        return estimator.estimate([(img, region)])[0]
+    except Exception as e:
+        print(f"Head pose error: {str(e)}")
+        return None
+
+
+def analyze_frames(payloads: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Decode and analyze a batch of video frames. Runs inside a pool worker, so
+    it only takes and returns plain picklable data. Head pose for every face
+    in the batch is estimated in one pass. A frame that cannot be decoded or
+    analyzed gets None in its slot; the other frames are unaffected.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+    analyzed = []
+    for i, payload in enumerate(payloads):
+        activity = activity_score(payload.get('activity'))
+        if not payload.get('deepface'):
+            # DeepFace not available, use basic activity tracking only
+            results[i] = {
+                'focus_score': activity,
+                'frustration_score': 0.0,  # No emotion data available
+                'source_data_summary': 'DeepFace not available - activity only',
+                'source_data': encode_activity(payload.get('activity') or {})
+            }
+            continue
+
+        try:
+            from deepface import DeepFace
+
+            img = decode_frame(payload['video'])
+            if img is None:
+                continue
+            result = DeepFace.analyze(img, actions=['emotion'], enforce_detection=False)
+            if isinstance(result, list):
+                result = result[0]
+        except Exception as e:
+            # A corrupt frame only loses its own slot, not the rest of the batch
+            print(f"Frame analysis error: {str(e)}")
+            continue
+        analyzed.append((i, img, result.get('region', {}), result.get('emotion', {}), activity))
+
+    if analyzed:
+        estimator = get_head_pose_estimator()
+        try:
+            poses = estimator.estimate([(img, region) for _, img, region, _, _ in analyzed])
+        except Exception:
+            poses = [_estimate_one(estimator, img, region) for _, img, region, _, _ in analyzed]
+        for (i, _, _, emotion, activity), pose in zip(analyzed, poses):
+            focus_score = 1.0 if pose and pose['focused'] else 0.0
+            results[i] = {
+                'focus_score': 0.7 * focus_score + 0.3 * activity,
+                'frustration_score': emotion.get('angry', 0) / 100.0,
+                'source_data_summary': None,
+                'source_data': encode_deepface(emotion)
+            }
+    return results
+
+
+def analyze_frame(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Analyze a single frame; see analyze_frames()."""
+    return analyze_frames([payload])[0]
+
+
+class FrameAnalysisExecutor:
+    """
+    Bounded worker pool for media_frame analysis.
+
+    Each student has at most one frame being analyzed and one frame waiting.
+    A newer frame replaces the waiting one instead of queuing behind it, and
+    frames are rejected outright once `max_in_flight` analyses are running,
+    so a slow frame never builds up a backlog. Frames ready to run are
+    handed to the pool together, up to `batch_size` per analyze_frames()
+    call, so students whose frames queue up while every worker is busy
+    share one head-pose pass.
+
+    Results are handed to `result_handler(student_id, result)`. With a
+    Socket.IO server attached, finished batches are queued by the pool's
+    callback thread and handled by a background task on the server's own
+    event loop, so DB writes and emits never run on a foreign OS thread.
+    Without one they are handled on the callback thread.
+    """
+
+    MODES = ('process', 'thread', 'inline')
+
+    def __init__(self, app=None, result_handler: Optional[Callable] = None,
+                 mode: str = 'process', max_workers: int = 2, max_in_flight: Optional[int] = None,
+                 batch_size: int = 8, poll_interval: float = 0.01):
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight or max_workers * 2
+        self.batch_size = batch_size
+        self.result_handler = result_handler
+        self.socketio = None
+        self.poll_interval = poll_interval
+        self._pool = None
+        self._task = None
+        self._completed: deque = deque()  # (batch, results, error) waiting for the event loop
+        self._lock = threading.Lock()
+        self._slots: Dict[int, Dict[str, Any]] = {}
+        self._ready: deque = deque()  # (student_id, payload, started) not yet handed to the pool
+        self._running_batches = 0
+        self._in_flight = 0
+        self._stats = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'replaced': 0,
+            'rejected': 0,
+            'batches': 0,
+            'total_latency_ms': 0.0,
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, result_handler: Optional[Callable] = None, socketio=None):
+        self.mode = app.config.get('FRAME_ANALYSIS_MODE', self.mode)
+        if self.mode not in self.MODES:
+            raise ValueError(f"FRAME_ANALYSIS_MODE must be one of {self.MODES}, got {self.mode!r}")
+        self.max_workers = app.config.get('FRAME_ANALYSIS_WORKERS', self.max_workers)
+        self.max_in_flight = app.config.get('FRAME_ANALYSIS_MAX_IN_FLIGHT', self.max_workers * 2)
+        self.batch_size = app.config.get('FRAME_ANALYSIS_BATCH_SIZE', self.batch_size)
+        if result_handler is not None:
+            self.result_handler = result_handler
+        if socketio is not None:
+            self.socketio = socketio
+        app.extensions['frame_analysis_executor'] = self
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == 'process':
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='frame-analysis')
+        return self._pool
+
+    def submit(self, student_id: int, payload: Dict[str, Any]) -> str:
+        """
+        Hand a frame to the pool without waiting for it. Returns 'accepted',
+        'queued' (waiting behind the student's running frame), 'replaced'
+        (a stale waiting frame was dropped for this one) or 'rejected'.
+        """
+        with self._lock:
+            self._stats['submitted'] += 1
+            slot = self._slots.get(student_id)
+            if slot is not None:
+                status = 'replaced' if slot['pending'] is not None else 'queued'
+                if status == 'replaced':
+                    self._stats['replaced'] += 1
+                slot['pending'] = payload
+                return status
+            if self._in_flight >= self.max_in_flight:
+                self._stats['rejected'] += 1
+                return 'rejected'
+            self._slots[student_id] = {'pending': None}
+            self._in_flight += 1
+            self._ready.append((student_id, payload, time.perf_counter()))
+            if self._task is None and self.socketio is not None and self.mode != 'inline':
+                self._task = self.socketio.start_background_task(self._run)
+        self._dispatch()
+        return 'accepted'
+
+    def _dispatch(self):
+        # Start batches while workers are free; frames that arrive while all
+        # workers are busy accumulate in _ready and go out together
+        while True:
+            with self._lock:
+                if not self._ready or self._running_batches >= self.max_workers:
+                    return
+                batch = [self._ready.popleft() for _ in range(min(self.batch_size, len(self._ready)))]
+                self._running_batches += 1
+                self._stats['batches'] += 1
+            self._start(batch)
+
+    def _start(self, batch):
+        payloads = [payload for _, payload, _ in batch]
+        if self.mode == 'inline':
+            try:
+                results, error = analyze_frames(payloads), None
+            except Exception as e:
+                results, error = None, e
+            self._finish(batch, results, error)
+            return
+        try:
+            future = self._get_pool().submit(analyze_frames, payloads)
+        except RuntimeError as e:
+            # Pool is shutting down; drop the frames and release their slots
+            self._finish(batch, None, e)
+            return
+        future.add_done_callback(lambda f: self._complete(batch, *self._unwrap(f)))
+
+    @staticmethod
+    def _unwrap(future):
+        try:
+            return future.result(), None
+        except Exception as e:
+            return None, e
+
+    def _complete(self, batch, results, error):
+        # Runs on the pool's callback thread
+        if self.socketio is None:
+            self._finish(batch, results, error)
+        else:
+            self._completed.append((batch, results, error))
+
+    def drain_results(self) -> int:
+        """Handle batches finished since the last call. Returns the number handled."""
+        handled = 0
+        while self._completed:
+            self._finish(*self._completed.popleft())
+            handled += 1
+        return handled
+
+    def _run(self):
+        while True:
+            try:
+                self.drain_results()
+            except Exception as e:
+                print(f"Frame result drain error: {str(e)}")
+            self.socketio.sleep(self.poll_interval)
+
+    def _finish(self, batch, results, error):
+        now = time.perf_counter()
+        with self._lock:
+            self._running_batches -= 1
+            self._stats['total_latency_ms'] += sum((now - started) * 1000 for _, _, started in batch)
+            self._stats['failed' if error is not None else 'completed'] += len(batch)
+        if error is not None:
+            print(f"Frame analysis error: {str(error)}")
+            results = [None] * len(batch)
+
+        for (student_id, _, _), result in zip(batch, results):
+            if result is not None and self.result_handler is not None:
+                try:
+                    self.result_handler(student_id, result)
+                except Exception as e:
+                    print(f"Frame result handler error: {str(e)}")
+
+            with self._lock:
+                slot = self._slots.get(student_id)
+                next_payload = slot['pending'] if slot else None
+                if next_payload is None:
+                    self._slots.pop(student_id, None)
+                    self._in_flight -= 1
+                else:
+                    slot['pending'] = None
+                    self._ready.append((student_id, next_payload, time.perf_counter()))
+        self._dispatch()
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._in_flight + sum(1 for slot in self._slots.values() if slot['pending'] is not None)
+
+    def load(self) -> float:
+        """Fraction of the in-flight budget currently in use (0.0-1.0)."""
+        with self._lock:
+            return min(1.0, self._in_flight / self.max_in_flight) if self.max_in_flight else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._in_flight
+            stats['running_batches'] = self._running_batches
+            stats['undelivered_batches'] = len(self._completed)
+            stats['waiting'] = sum(1 for slot in self._slots.values() if slot['pending'] is not None)
+        finished = stats['completed'] + stats['failed']
+        stats['avg_latency_ms'] = round(stats.pop('total_latency_ms') / finished, 3) if finished else 0.0
+        stats['mode'] = self.mode
+        stats['max_workers'] = self.max_workers
+        stats['max_in_flight'] = self.max_in_flight
+        stats['batch_size'] = self.batch_size
+        return stats
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+
+frame_executor = FrameAnalysisExecutor()
@@ -0,0 +1,145 @@
+from typing import Optional, Dict, Any, List, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+# 3D model points of a generic face
+MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),             # Nose tip
+    (0.0, -63.6, -12.5),         # Chin
+    (-43.3, 32.7, -26.0),        # Left eye left corner
+    (43.3, 32.7, -26.0),         # Right eye right corner
+    (-28.9, -28.9, -24.1),       # Left mouth corner
+    (28.9, -28.9, -24.1)         # Right mouth corner
+])
+
+# Approximate 2D landmark positions as fractions of the face box (same order as MODEL_POINTS)
+LANDMARK_FRACTIONS = np.array([
+    (0.5, 0.5),     # Nose tip (approx)
+    (0.5, 0.8),     # Chin (approx)
+    (0.3, 0.35),    # Left eye left corner (approx)
+    (0.7, 0.35),    # Right eye right corner (approx)
+    (0.25, 0.7),    # Left mouth corner (approx)
+    (0.75, 0.7)     # Right mouth corner (approx)
+])
+
+DIST_COEFFS = np.zeros((4, 1))  # Assuming no lens distortion
+
+# Yaw and pitch within this many degrees count as looking at the screen
+FOCUS_ANGLE_LIMIT = 20.0
+
+
+class HeadPoseEstimator:
+    """
+    Head-pose estimation for face crops.
+
+    The Haar cascade is loaded once per estimator and camera matrices are
+    cached by ROI size, so a worker process can reuse one instance for every
+    frame it sees. `estimate()` takes a batch of frames and does the landmark
+    and Euler-angle math for all of them in single NumPy passes.
+    """
+
+    CASCADE_FILE = 'haarcascade_frontalface_default.xml'
+
+    def __init__(self):
+        if cv2 is None:
+            raise RuntimeError("OpenCV is required for head-pose estimation")
+        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + self.CASCADE_FILE)
+        self._camera_matrices: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def camera_matrix(self, height: int, width: int) -> np.ndarray:
+        key = (height, width)
+        matrix = self._camera_matrices.get(key)
+        if matrix is None:
+            focal_length = width
+            matrix = np.array(
+                [[focal_length, 0, width / 2],
+                 [0, focal_length, height / 2],
+                 [0, 0, 1]], dtype='double'
+            )
+            self._camera_matrices[key] = matrix
+        return matrix
+
+    def _detect(self, img, face_region) -> Optional[Tuple[int, int]]:
+        """Return the (height, width) of the first face found inside face_region."""
+        x, y, w, h = face_region['x'], face_region['y'], face_region['w'], face_region['h']
+        gray = cv2.cvtColor(img[y:y+h, x:x+w], cv2.COLOR_BGR2GRAY)
+        faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
+        if len(faces) == 0:
+            return None
+        (fx, fy, fw, fh) = faces[0]
+        face_roi = gray[fy:fy+fh, fx:fx+fw]
+        return face_roi.shape[0], face_roi.shape[1]
+
+    def estimate(self, frames: List[Tuple[Any, Dict[str, int]]]) -> List[Optional[Dict[str, float]]]:
+        """
+        Estimate head pose for a batch of (image, face_region) pairs.
+        Returns one dict with pitch/yaw/roll in degrees and a `focused` flag
+        per frame, or None where no face could be located.
+        """
+        results: List[Optional[Dict[str, float]]] = [None] * len(frames)
+        sizes = []
+        indices = []
+        for i, (img, face_region) in enumerate(frames):
+            if not face_region or not all(k in face_region for k in ['x', 'y', 'w', 'h']):
+                continue
+            size = self._detect(img, face_region)
+            if size is not None:
+                sizes.append(size)
+                indices.append(i)
+        if not indices:
+            return results
+
+        # Landmarks for every face at once: (N, 6, 2)
+        dims = np.array([(w, h) for (h, w) in sizes], dtype='double')
+        image_points = LANDMARK_FRACTIONS[None, :, :] * dims[:, None, :]
+
+        rotations = []
+        solved = []
+        for n, (height, width) in enumerate(sizes):
+            success, rotation_vector, _ = cv2.solvePnP(
+                MODEL_POINTS, image_points[n], self.camera_matrix(height, width), DIST_COEFFS,
+                flags=cv2.SOLVEPNP_ITERATIVE
+            )
+            if success:
+                rmat, _ = cv2.Rodrigues(rotation_vector)
+                rotations.append(rmat)
+                solved.append(indices[n])
+        if not rotations:
+            return results
+
+        pitch, yaw, roll = rotation_matrices_to_euler(np.stack(rotations))
+        focused = (np.abs(yaw) < FOCUS_ANGLE_LIMIT) & (np.abs(pitch) < FOCUS_ANGLE_LIMIT)
+        for n, i in enumerate(solved):
+            results[i] = {
+                'pitch': float(pitch[n]),
+                'yaw': float(yaw[n]),
+                'roll': float(roll[n]),
+                'focused': bool(focused[n])
+            }
+        return results
+
+
+def rotation_matrices_to_euler(rmats: np.ndarray):
+    """Convert a stack of (N, 3, 3) rotation matrices to pitch, yaw, roll arrays in degrees."""
+    sy = np.sqrt(rmats[:, 0, 0] ** 2 + rmats[:, 1, 0] ** 2)
+    singular = sy < 1e-6
+    x_angle = np.where(singular, np.arctan2(-rmats[:, 1, 2], rmats[:, 1, 1]), np.arctan2(rmats[:, 2, 1], rmats[:, 2, 2]))
+    y_angle = np.arctan2(-rmats[:, 2, 0], sy)
+    z_angle = np.where(singular, 0.0, np.arctan2(rmats[:, 1, 0], rmats[:, 0, 0]))
+    return np.degrees(x_angle), np.degrees(y_angle), np.degrees(z_angle)
+
+
+_estimator = None
+
+
+def get_head_pose_estimator() -> HeadPoseEstimator:
+    """Return this process's estimator, creating it on first use."""
+    global _estimator
+    if _estimator is None:
+        _estimator = HeadPoseEstimator()
+    return _estimator
@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+
+import sqlalchemy as sa
+
+from services.quiz_plan import DIFFICULTIES
+
+
+class QuizAnalytics:
+    """
+    Everything the quiz results pages show for one quiz, as plain values:
+    per-submission stats (keyed like the templates read them) sorted by
+    score, highest first, plus the score summary.
+    """
+
+    __slots__ = ('quiz_id', 'stats', 'by_submission', 'total_submissions', 'avg_score',
+                 'highest_score', 'lowest_score', 'built_at')
+
+    def __init__(self, quiz_id: int, stats: List[Dict[str, Any]]):
+        self.quiz_id = quiz_id
+        self.stats = sorted(stats, key=lambda stat: stat['submission']['score'], reverse=True)
+        self.by_submission = {stat['submission']['id']: stat for stat in self.stats}
+        scores = [stat['submission']['score'] for stat in self.stats]
+        self.total_submissions = len(scores)
+        self.avg_score = round(sum(scores) / len(scores), 1) if scores else 0
+        self.highest_score = round(max(scores), 1) if scores else 0
+        self.lowest_score = round(min(scores), 1) if scores else 0
+        self.built_at = time.monotonic()
+
+    def for_submission(self, submission_id: int) -> Optional[Dict[str, Any]]:
+        return self.by_submission.get(submission_id)
+
+
+def submission_stats(submission_rows: Iterable[Tuple], behavior: Dict[int, Tuple[float, float]],
+                     breakdown: Dict[int, Dict[str, Tuple[int, int]]]) -> List[Dict[str, Any]]:
+    """
+    Combine the three query results into per-submission stats.
+
+    `submission_rows` are (submission_id, score, start_time, end_time,
+    student_id, email, profile name); `behavior` maps submission id
+    to (avg_focus, avg_frustration); `breakdown` maps submission id to
+    {difficulty: (answered, correct)}.
+    """
+    stats = []
+    for submission_id, score, start_time, end_time, student_id, email, name in submission_rows:
+        avg_focus, avg_frustration = behavior.get(submission_id, (None, None))
+        counts = breakdown.get(submission_id, {})
+        stat = {
+            'student': {'id': student_id, 'email': email, 'name': name},
+            'submission': {'id': submission_id, 'score': score or 0, 'start_time': start_time, 'end_time': end_time},
+            'avg_focus_percent': round((avg_focus or 0) * 100, 1),
+            'avg_frustration_percent': round((avg_frustration or 0) * 100, 1),
+            'time_taken_minutes': round((end_time - start_time).total_seconds() / 60, 1),
+            'total_questions': sum(answered for answered, _ in counts.values()),
+            'correct_answers_count': sum(correct for _, correct in counts.values()),
+        }
+        for difficulty in DIFFICULTIES:
+            answered, correct = counts.get(difficulty, (0, 0))
+            stat[f'{difficulty.lower()}_questions_count'] = answered
+            stat[f'{difficulty.lower()}_correct_count'] = correct
+        stats.append(stat)
+    return stats
+
+
+def _behavior_averages(quiz_id: int, start, end) -> Dict[int, Tuple[float, float]]:
+    """
+    Average focus and frustration of every completed submission over its
+    own start-end window, in one grouped query. The logs come from every
+    EmotionLog table (main and archived partitions) covering the quiz's
+    overall window, joined to the submissions on student and timestamp.
+    """
+    from models import db, QuizSubmission
+    from services.emotion_log_partitions import emotion_log_partitions
+    selects = [sa.select(table.c.student_id, table.c.timestamp, table.c.focus_score, table.c.frustration_score)
+               .where(table.c.timestamp >= start, table.c.timestamp <= end)
+               for table in emotion_log_partitions.tables_for_range(start, end)]
+    logs = (sa.union_all(*selects) if len(selects) > 1 else selects[0]).subquery()
+    query = sa.select(QuizSubmission.id, sa.func.avg(logs.c.focus_score), sa.func.avg(logs.c.frustration_score))\
+        .join(logs, sa.and_(logs.c.student_id == QuizSubmission.student_id,
+                            logs.c.timestamp >= QuizSubmission.start_time,
+                            logs.c.timestamp <= QuizSubmission.end_time))\
+        .where(QuizSubmission.quiz_id == quiz_id, QuizSubmission.end_time.isnot(None))\
+        .group_by(QuizSubmission.id)
+    return {submission_id: (focus, frustration) for submission_id, focus, frustration in db.session.execute(query)}
+
+
+def _difficulty_breakdown(quiz_id: int) -> Dict[int, Dict[str, Tuple[int, int]]]:
+    """(answered, correct) per submission and difficulty, in one aggregate join."""
+    from models import db, QuizAnswer, QuizSubmission, Question
+    rows = db.session.query(QuizAnswer.submission_id, Question.difficulty, sa.func.count(QuizAnswer.id),
+                            sa.func.sum(sa.case((QuizAnswer.is_correct.is_(True), 1), else_=0)))\
+        .join(Question, QuizAnswer.question_id == Question.id)\
+        .join(QuizSubmission, QuizAnswer.submission_id == QuizSubmission.id)\
+        .filter(QuizSubmission.quiz_id == quiz_id, QuizSubmission.end_time.isnot(None))\
+        .group_by(QuizAnswer.submission_id, Question.difficulty).all()
+    breakdown: Dict[int, Dict[str, Tuple[int, int]]] = {}
+    for submission_id, difficulty, answered, correct in rows:
+        breakdown.setdefault(submission_id, {})[difficulty] = (answered, int(correct or 0))
+    return breakdown
+
+
+def compute_quiz_analytics(quiz_id: int) -> QuizAnalytics:
+    """Build a quiz's analytics with three queries, however many students submitted."""
+    from models import db, QuizSubmission, User, StudentProfile
+    submission_rows = db.session.query(QuizSubmission.id, QuizSubmission.score, QuizSubmission.start_time,
+                                       QuizSubmission.end_time, User.id, User.email, StudentProfile.name)\
+        .join(User, QuizSubmission.student_id == User.id)\
+        .outerjoin(StudentProfile, StudentProfile.user_id == User.id)\
+        .filter(QuizSubmission.quiz_id == quiz_id, QuizSubmission.end_time.isnot(None)).all()
+    if not submission_rows:
+        return QuizAnalytics(quiz_id, [])
+    start = min(row[2] for row in submission_rows)
+    end = max(row[3] for row in submission_rows)
+    return QuizAnalytics(quiz_id, submission_stats(submission_rows, _behavior_averages(quiz_id, start, end),
+                                                   _difficulty_breakdown(quiz_id)))
+
+
+class QuizAnalyticsCache:
+    """
+    QuizAnalytics per quiz, kept until something changes a quiz's results:
+    a submission landing, a regrade, or a question edit. Those bump the
+    quiz's version, and an entry built under an older version is rebuilt
+    on the next read. Entries also expire after `ttl_seconds` so behavior
+    logs written late or by other workers show up eventually.
+    """
+
+    def __init__(self, app=None, max_quizzes: int = 500, ttl_seconds: int = 600):
+        self.max_quizzes = max_quizzes
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[int, Tuple[int, QuizAnalytics]]' = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_quizzes = app.config.get('QUIZ_ANALYTICS_CACHE_MAX', self.max_quizzes)
+        self.ttl_seconds = app.config.get('QUIZ_ANALYTICS_TTL_SECONDS', self.ttl_seconds)
+        app.extensions['quiz_analytics'] = self
+
+    def get(self, quiz_id: int, build=compute_quiz_analytics) -> QuizAnalytics:
+        with self._lock:
+            version = self._versions.get(quiz_id, 0)
+            cached = self._entries.get(quiz_id)
+            if (cached is not None and cached[0] == version
+                    and time.monotonic() - cached[1].built_at < self.ttl_seconds):
+                self._entries.move_to_end(quiz_id)
+                return cached[1]
+        # Build outside the lock; the version taken above marks it stale if a submission lands meanwhile
+        analytics = build(quiz_id)
+        with self._lock:
+            self._entries[quiz_id] = (version, analytics)
+            self._entries.move_to_end(quiz_id)
+            while len(self._entries) > self.max_quizzes:
+                self._entries.popitem(last=False)
+        return analytics
+
+    def invalidate(self, quiz_id: int):
+        with self._lock:
+            self._versions[quiz_id] = self._versions.get(quiz_id, 0) + 1
+            self._entries.pop(quiz_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'quizzes': len(self._entries)}
+
+
+quiz_analytics = QuizAnalyticsCache()
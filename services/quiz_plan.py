@@ -0,0 +1,253 @@
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Iterable, Sequence, Mapping
+
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+LETTERS = ('A', 'B', 'C', 'D')
+
+
+def parse_options(raw: Optional[str]) -> List[str]:
+    if not raw:
+        return []
+    try:
+        options = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    return options if isinstance(options, list) else []
+
+
+def correct_letter(options: Sequence[str], correct_answer: Optional[str]) -> Optional[str]:
+    """Letter of the option whose text is the correct answer, or None if no option matches."""
+    for letter, option in zip(LETTERS, options):
+        if option == correct_answer:
+            return letter
+    return None
+
+
+def item_ranks(quiz_id: int, question_ids: Iterable[int]) -> Dict[int, float]:
+    """
+    Finer-grained difficulty of each question from how often completed
+    attempts got it wrong: the error rate with one correct and one wrong
+    answer added (so an unanswered question ranks 0.5), from one
+    aggregate query over quiz_answer.
+    """
+    import sqlalchemy as sa
+    from models import db, QuizAnswer, QuizSubmission
+    counts = {question_id: (answered, int(correct or 0)) for question_id, answered, correct in
+              db.session.query(QuizAnswer.question_id, sa.func.count(QuizAnswer.id),
+                               sa.func.sum(sa.case((QuizAnswer.is_correct.is_(True), 1), else_=0)))
+              .join(QuizSubmission, QuizAnswer.submission_id == QuizSubmission.id)
+              .filter(QuizSubmission.quiz_id == quiz_id, QuizSubmission.end_time.isnot(None))
+              .group_by(QuizAnswer.question_id)}
+    ranks = {}
+    for question_id in question_ids:
+        answered, correct = counts.get(question_id, (0, 0))
+        ranks[question_id] = 1.0 - (correct + 1.0) / (answered + 2.0)
+    return ranks
+
+
+class PlannedQuestion:
+    """A question as rendered and graded during an attempt, with its options already parsed."""
+
+    __slots__ = ('id', 'question_text', 'difficulty', 'options', 'correct_letter')
+
+    def __init__(self, question_id, question_text, difficulty, options, correct):
+        self.id = question_id
+        self.question_text = question_text
+        self.difficulty = difficulty
+        self.options = options
+        self.correct_letter = correct
+
+    @classmethod
+    def from_model(cls, question):
+        options = parse_options(question.options)
+        return cls(question.id, question.question_text, question.difficulty, options,
+                   correct_letter(options, question.correct_answer))
+
+
+class QuizPlan:
+    """
+    One attempt's questions, answer key and remaining difficulty pools.
+
+    Built once when the attempt starts; every step afterwards is a dict
+    lookup or a heap pop. Each difficulty pool is a heap ordered by
+    `item_rank` (finer-grained item difficulty, lower first) and then quiz
+    order, so taking the next item of a difficulty is O(log n). Questions
+    leave their pool when served, so a question is never shown twice even
+    when the adaptive choice keeps asking for the same difficulty.
+    """
+
+    def __init__(self, submission_id: int, quiz_id: int, questions: Iterable[PlannedQuestion],
+                 answered: Iterable[int] = (), item_rank: Optional[Mapping[int, float]] = None):
+        self.submission_id = submission_id
+        self.quiz_id = quiz_id
+        self.questions: Dict[int, PlannedQuestion] = OrderedDict((q.id, q) for q in questions)
+        self.order = list(self.questions)
+        self.pools = {difficulty: [] for difficulty in DIFFICULTIES}
+        self.served: List[int] = []
+        self._served_set = set()
+        self._next_in_order = 0
+        self.current_question_id: Optional[int] = None
+        self.touched = time.monotonic()
+        answered = set(answered)
+        item_rank = item_rank or {}
+        for position, question in enumerate(self.questions.values()):
+            if question.id in answered:
+                self._mark_served(question.id)
+            elif question.difficulty in self.pools:
+                self.pools[question.difficulty].append((item_rank.get(question.id, 0.0), position, question.id))
+        for pool in self.pools.values():
+            heapq.heapify(pool)
+
+    @classmethod
+    def from_models(cls, submission_id: int, quiz_id: int, questions, answered: Iterable[int] = (),
+                    item_rank: Optional[Mapping[int, float]] = None):
+        return cls(submission_id, quiz_id, (PlannedQuestion.from_model(q) for q in questions), answered, item_rank)
+
+    @property
+    def total(self) -> int:
+        return len(self.order)
+
+    @property
+    def answer_key(self) -> Dict[int, Optional[str]]:
+        return {question_id: question.correct_letter for question_id, question in self.questions.items()}
+
+    def _mark_served(self, question_id: int):
+        if question_id not in self._served_set:
+            self._served_set.add(question_id)
+            self.served.append(question_id)
+
+    def _serve(self, question_id: int) -> PlannedQuestion:
+        self._mark_served(question_id)
+        self.current_question_id = question_id
+        return self.questions[question_id]
+
+    def current(self) -> Optional[PlannedQuestion]:
+        return self.questions.get(self.current_question_id)
+
+    def next_in_order(self) -> Optional[PlannedQuestion]:
+        """The first question in quiz order that has not been served yet."""
+        while self._next_in_order < len(self.order):
+            question_id = self.order[self._next_in_order]
+            self._next_in_order += 1
+            if question_id not in self._served_set:
+                return self._serve(question_id)
+        return None
+
+    def take(self, preference: Sequence[str]) -> Optional[PlannedQuestion]:
+        """
+        Serve the next question from the first non-empty pool in
+        `preference` (difficulty names), falling back to quiz order.
+        """
+        for difficulty in preference:
+            pool = self.pools.get(difficulty)
+            while pool:
+                question_id = heapq.heappop(pool)[2]
+                if question_id not in self._served_set:
+                    return self._serve(question_id)
+        return self.next_in_order()
+
+    def remaining(self, difficulty: str) -> int:
+        """Upper bound on unserved questions of a difficulty (served ones are dropped lazily)."""
+        return len(self.pools.get(difficulty, ()))
+
+    def answered_question(self, form) -> Optional[int]:
+        """Id of the question whose radio group was posted in `form`."""
+        if self.current_question_id is not None:
+            if form.get(f'question_{self.current_question_id}'):
+                return self.current_question_id
+            return None
+        # Rebuilt plan: the served question is unknown, so find it in the form
+        for key in form:
+            if key.startswith('question_'):
+                try:
+                    question_id = int(key[len('question_'):])
+                except ValueError:
+                    continue
+                if question_id in self.questions:
+                    return question_id
+        return None
+
+    def valid_answers(self, answers: Mapping[Any, Any]) -> Dict[int, str]:
+        """The {question_id: letter} pairs that name a question of this quiz and an option letter."""
+        return {int(question_id): letter for question_id, letter in answers.items()
+                if str(question_id).isdigit() and int(question_id) in self.questions and letter in LETTERS}
+
+    def is_correct(self, question_id: int, letter: Optional[str]) -> bool:
+        question = self.questions.get(question_id)
+        return question is not None and letter is not None and letter == question.correct_letter
+
+
+class QuizPlanStore:
+    """
+    Server-side QuizPlans keyed by QuizSubmission.id.
+
+    Plans live in process memory; a plan missing here (expired, evicted,
+    or the attempt moved to another worker) is rebuilt from the quiz's
+    questions, with those already answered removed from the pools.
+    """
+
+    def __init__(self, app=None, max_plans: int = 2000, ttl_seconds: int = 4 * 3600):
+        self.max_plans = max_plans
+        self.ttl_seconds = ttl_seconds
+        self._plans: 'OrderedDict[int, QuizPlan]' = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_plans = app.config.get('QUIZ_PLAN_MAX', self.max_plans)
+        self.ttl_seconds = app.config.get('QUIZ_PLAN_TTL_SECONDS', self.ttl_seconds)
+        app.extensions['quiz_plans'] = self
+
+    def put(self, plan: QuizPlan) -> QuizPlan:
+        with self._lock:
+            self._plans[plan.submission_id] = plan
+            self._plans.move_to_end(plan.submission_id)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def get(self, submission_id: int) -> Optional[QuizPlan]:
+        with self._lock:
+            plan = self._plans.get(submission_id)
+            if plan is None:
+                return None
+            now = time.monotonic()
+            if now - plan.touched > self.ttl_seconds:
+                del self._plans[submission_id]
+                return None
+            plan.touched = now
+            self._plans.move_to_end(submission_id)
+            return plan
+
+    def build(self, submission, questions) -> QuizPlan:
+        ranks = item_ranks(submission.quiz_id, [question.id for question in questions])
+        return self.put(QuizPlan.from_models(submission.id, submission.quiz_id, questions, item_rank=ranks))
+
+    def load(self, submission, answered: Iterable[int] = ()) -> QuizPlan:
+        """
+        The cached plan for a submission, or one rebuilt from its quiz with
+        the `answered` question ids (from the answer buffer) already served.
+        """
+        plan = self.get(submission.id)
+        if plan is not None:
+            return plan
+        from models import Question
+        questions = Question.query.filter_by(quiz_id=submission.quiz_id).order_by(Question.id).all()
+        ranks = item_ranks(submission.quiz_id, [question.id for question in questions])
+        return self.put(QuizPlan.from_models(submission.id, submission.quiz_id, questions, answered, ranks))
+
+    def discard(self, submission_id: int):
+        with self._lock:
+            self._plans.pop(submission_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'plans': len(self._plans)}
+
+
+quiz_plans = QuizPlanStore()
@@ -0,0 +1,138 @@
+import copy
+import hashlib
+import threading
+from collections import deque
+from typing import Optional, List, Dict, Any
+
+import socketio
+
+LOCAL_QUEUE_URL = 'local://'
+
+
+class LocalQueueManager(socketio.PubSubManager):
+    """
+    In-process stand-in for a Redis/Kombu message queue.
+
+    Every manager created with the same channel in this process receives
+    the others' emits, which is enough to run several Socket.IO servers
+    side by side in tests and the worker load test without a broker.
+    """
+
+    name = 'local'
+    _subscribers: Dict[str, List[deque]] = {}
+    _subscribers_lock = threading.Lock()
+
+    def __init__(self, channel: str = 'socketio', write_only: bool = False, logger=None,
+                 poll_interval: float = 0.01):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.poll_interval = poll_interval
+        self._inbox = deque()
+        if not write_only:
+            with self._subscribers_lock:
+                self._subscribers.setdefault(channel, []).append(self._inbox)
+
+    def _publish(self, data):
+        # Copy so subscribers never share mutable payloads, as with a real broker
+        with self._subscribers_lock:
+            inboxes = list(self._subscribers.get(self.channel, []))
+        for inbox in inboxes:
+            inbox.append(copy.deepcopy(data))
+
+    def _listen(self):
+        while True:
+            while self._inbox:
+                yield self._inbox.popleft()
+            self.server.sleep(self.poll_interval)
+
+    @classmethod
+    def reset(cls, channel: Optional[str] = None):
+        """Drop all subscribers (or those of one channel); used between tests."""
+        with cls._subscribers_lock:
+            if channel is None:
+                cls._subscribers.clear()
+            else:
+                cls._subscribers.pop(channel, None)
+
+
+def socketio_options(config) -> Dict[str, Any]:
+    """
+    Extra SocketIO.init_app() options for multi-worker deployments.
+
+    SOCKETIO_MESSAGE_QUEUE may be a Redis/Kombu URL shared by all workers,
+    or 'local://' for the in-process stand-in.
+    """
+    queue = config.get('SOCKETIO_MESSAGE_QUEUE')
+    channel = config.get('SOCKETIO_CHANNEL', 'flask-socketio')
+    if not queue:
+        return {}
+    if queue == LOCAL_QUEUE_URL:
+        return {'client_manager': LocalQueueManager(channel=channel)}
+    return {'message_queue': queue, 'channel': channel}
+
+
+class WorkerRing:
+    """
+    Rendezvous-hash routing of students to Socket.IO workers.
+
+    A student always maps to the same worker while the worker list is
+    unchanged, and adding or removing a worker only moves the students
+    that hashed to it. Their activity, capture-rate and frame-slot state
+    therefore stays in one process.
+    """
+
+    def __init__(self, workers: Optional[List[str]] = None):
+        self.workers = list(workers or [])
+
+    @staticmethod
+    def _score(worker: str, key: str) -> int:
+        return int.from_bytes(hashlib.md5(f'{worker}:{key}'.encode()).digest()[:8], 'big')
+
+    def owner(self, student_id) -> Optional[str]:
+        if not self.workers:
+            return None
+        key = str(student_id)
+        return max(self.workers, key=lambda worker: self._score(worker, key))
+
+
+# State kept in each worker's memory that plain HTTP requests read and
+# write. Only Socket.IO connections are routed through WorkerRing, so a
+# multi-worker deployment must also pin each logged-in user's HTTP requests
+# to socketio_url_for(user) (e.g. a load balancer hashing the user id the
+# same way), or run HTTP on a single worker. Otherwise a request landing on
+# another worker sees a missing quiz plan, loses buffered answers, or serves
+# a stale calendar or behavior window.
+PROCESS_LOCAL_STATE = {
+    'quiz_plans': 'quiz plan built when a student starts a quiz attempt',
+    'answer_buffer': 'quiz steps answered since the last autosave to quiz_answer',
+    'calendar_cache': 'per-user calendar feed, invalidated only on the writing worker',
+    'behavior_window_cache': 'rolling focus/frustration window fed by that worker\'s frames',
+    'behavior_scheduler': 'monitoring sessions started through that worker',
+}
+
+
+def process_local_state_warning(config) -> Optional[str]:
+    """Warning to log at startup when several workers are configured, else None."""
+    if len(config.get('SOCKETIO_WORKER_URLS') or []) < 2:
+        return None
+    return ("Multiple Socket.IO workers configured; HTTP requests must be routed "
+            "sticky per user because these are kept per process: " + ', '.join(PROCESS_LOCAL_STATE))
+
+
+def check_worker_config(app):
+    """
+    Refuse to start a multi-worker deployment unless SOCKETIO_STICKY_HTTP
+    says the load balancer pins each user's HTTP requests to their worker.
+    """
+    warning = process_local_state_warning(app.config)
+    if warning is None:
+        return
+    if not app.config.get('SOCKETIO_STICKY_HTTP'):
+        raise ValueError(warning + '. Set SOCKETIO_STICKY_HTTP = True once HTTP requests '
+                         'are routed to socketio_url_for(user), or configure a single worker.')
+    app.logger.warning(warning)
+
+
+def socketio_url_for(config, user_id) -> str:
+    """Socket.IO URL this user's browser should connect to ('' means same origin)."""
+    ring = WorkerRing(config.get('SOCKETIO_WORKER_URLS') or [])
+    return ring.owner(user_id) or ''
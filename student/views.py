@@ -1,10 +1,23 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from models import User, Course, Enrollment, Assignment, Grade, Discussion, Announcement, Meeting, InstructorProfile, StudentProfile, Quiz, Question, QuizSubmission, Module, Attachment, QuizAnswer, EmotionLog, Event, AssignmentSubmission, Lecture, LectureLike
 from app import db
 from services.gemini_service import GeminiService
 from datetime import datetime, timedelta
-from student_behavior_monitor import StudentBehaviorMonitor
+from student_behavior_monitor import behavior_scheduler
+from services.emotion_log_partitions import emotion_log_partitions
+from services.behavior_window_cache import behavior_window_cache
+from services.behavior_push import behavior_payload
+from services.emotion_rollups import fetch_history, HISTORY_RANGES
+from services.behavior_history import decode_cursor, parse_date, page_size, stream_page
+from services.calendar_service import calendar_items as build_calendar_items, upcoming_items
+from services.calendar_cache import calendar_cache, feed_response, FEED_FORMATS
+from services.quiz_plan import quiz_plans, LETTERS
+from services.answer_keys import answer_keys
+from services.answer_buffer import answer_buffer
+from services.adaptive_engine import adaptive_engine, behavior_difficulty, Signals
+from services.quiz_analytics import quiz_analytics
+from sqlalchemy.exc import IntegrityError
 import threading
 import time
 import json
@@ -33,61 +46,7 @@ def dashboard():
 
     # Fetch upcoming events (next 5, from calendar logic)
     enrolled_course_ids = [enrollment.course_id for enrollment in enrollments]
-    assignments_all = Assignment.query.filter(Assignment.course_id.in_(enrolled_course_ids)).all()
-    quizzes = Quiz.query.filter(Quiz.course_id.in_(enrolled_course_ids)).all()
-    meetings = Meeting.query.filter(Meeting.course_id.in_(enrolled_course_ids)).all()
-    events = Event.query.all()  # Global events
-    calendar_items = []
-    for assignment in assignments_all:
-        course = Course.query.get(assignment.course_id)
-        calendar_items.append({
-            'id': assignment.id,
-            'title': f"Assignment: {assignment.title}",
-            'description': assignment.instructions,
-            'date': assignment.due_date,
-            'type': 'assignment',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'warning',
-            'points': assignment.points
-        })
-    for quiz in quizzes:
-        course = Course.query.get(quiz.course_id)
-        calendar_items.append({
-            'id': quiz.id,
-            'title': f"Quiz: {quiz.title}",
-            'description': quiz.description,
-            'date': quiz.start_time,
-            'type': 'quiz',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'info',
-            'end_time': quiz.end_time,
-            'time_limit': quiz.time_limit
-        })
-    for meeting in meetings:
-        course = Course.query.get(meeting.course_id)
-        calendar_items.append({
-            'id': meeting.id,
-            'title': meeting.title,
-            'description': meeting.description,
-            'date': meeting.scheduled_time,
-            'type': 'meeting',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'success',
-            'meeting_link': meeting.meeting_link
-        })
-    for event in events:
-        calendar_items.append({
-            'id': event.id,
-            'title': event.title,
-            'description': event.description,
-            'date': event.event_date,
-            'type': 'event',
-            'course_name': None,
-            'color': 'primary'
-        })
-    calendar_items.sort(key=lambda x: x['date'])
-    current_date = datetime.utcnow()
-    upcoming_events = [item for item in calendar_items if item['date'] >= current_date][:5]
+    upcoming_events = upcoming_items(enrolled_course_ids, limit=5)
     
     return render_template('student_dashboard.html', 
                            enrolled_courses=enrolled_courses,
@@ -109,6 +68,7 @@ def courses():
                 enrollment = Enrollment(student_id=current_user.id, course_id=course_id)
                 db.session.add(enrollment)
                 db.session.commit()
+                calendar_cache.invalidate_user(current_user.id)
                 flash('Enrolled in course successfully!', 'success')
             else:
                 flash('You are already enrolled in this course.', 'info')
@@ -125,6 +85,7 @@ def enroll_course(course_id):
         enrollment = Enrollment(student_id=current_user.id, course_id=course_id)
         db.session.add(enrollment)
         db.session.commit()
+        calendar_cache.invalidate_user(current_user.id)
         flash('Enrolled in course successfully!', 'success')
     else:
         flash('You are already enrolled in this course.', 'info')
@@ -137,72 +98,8 @@ def calendar():
     enrollments = Enrollment.query.filter_by(student_id=current_user.id).all()
     enrolled_course_ids = [enrollment.course_id for enrollment in enrollments]
     
-    # Fetch all events for enrolled courses
-    assignments = Assignment.query.filter(Assignment.course_id.in_(enrolled_course_ids)).all()
-    quizzes = Quiz.query.filter(Quiz.course_id.in_(enrolled_course_ids)).all()
-    meetings = Meeting.query.filter(Meeting.course_id.in_(enrolled_course_ids)).all()
-    events = Event.query.all()  # Global events
-    
-    # Combine all calendar items
-    calendar_items = []
-    
-    # Add assignments
-    for assignment in assignments:
-        course = Course.query.get(assignment.course_id)
-        calendar_items.append({
-            'id': assignment.id,
-            'title': f"Assignment: {assignment.title}",
-            'description': assignment.instructions,
-            'date': assignment.due_date,
-            'type': 'assignment',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'warning',
-            'points': assignment.points
-        })
-    
-    # Add quizzes
-    for quiz in quizzes:
-        course = Course.query.get(quiz.course_id)
-        calendar_items.append({
-            'id': quiz.id,
-            'title': f"Quiz: {quiz.title}",
-            'description': quiz.description,
-            'date': quiz.start_time,
-            'type': 'quiz',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'info',
-            'end_time': quiz.end_time,
-            'time_limit': quiz.time_limit
-        })
-    
-    # Add meetings
-    for meeting in meetings:
-        course = Course.query.get(meeting.course_id)
-        calendar_items.append({
-            'id': meeting.id,
-            'title': meeting.title,
-            'description': meeting.description,
-            'date': meeting.scheduled_time,
-            'type': 'meeting',
-            'course_name': course.title if course else 'Unknown Course',
-            'color': 'success',
-            'meeting_link': meeting.meeting_link
-        })
-    
-    # Add global events
-    for event in events:
-        calendar_items.append({
-            'id': event.id,
-            'title': event.title,
-            'description': event.description,
-            'date': event.event_date,
-            'type': 'event',
-            'course_name': None,
-            'color': 'primary'
-        })
-    
-    # Sort all items by date
-    calendar_items.sort(key=lambda x: x['date'])
+    # All calendar items for enrolled courses plus global events, sorted by date
+    calendar_items = _calendar_entry(enrolled_course_ids).items
     
     # Get upcoming events (next 30 days)
     current_date = datetime.utcnow()
@@ -217,14 +114,22 @@ def calendar():
     
     return render_template('calendar.html', 
                          calendar_items=calendar_items,
-                         events=events,
-                         meetings=meetings,
-                         assignments=assignments,
-                         quizzes=quizzes,
                          courses=courses,
                          upcoming_events=upcoming_events,
                          overdue_events=overdue_events)
 
+def _calendar_entry(enrolled_course_ids):
+    return calendar_cache.get(current_user.id, enrolled_course_ids,
+                              lambda: build_calendar_items(enrolled_course_ids))
+
+@student_bp.route('/calendar/feed.<fmt>')
+@login_required
+def calendar_feed(fmt):
+    if fmt not in FEED_FORMATS:
+        return jsonify({'error': 'Unknown feed format'}), 404
+    enrolled_course_ids = [row.course_id for row in db.session.query(Enrollment.course_id).filter_by(student_id=current_user.id)]
+    return feed_response(_calendar_entry(enrolled_course_ids), fmt, 'My Courses')
+
 @student_bp.route('/history')
 @login_required
 def history():
@@ -624,17 +529,27 @@ def take_quiz(course_id, quiz_id):
         flash('You have already submitted this quiz.', 'warning')
         return redirect(url_for('student.course_detail', course_id=course_id))
     
-    # Get all questions for the quiz
-    all_questions = Question.query.filter_by(quiz_id=quiz_id).all()
-    
-    if not all_questions:
-        flash('This quiz has no questions.', 'warning')
-        return redirect(url_for('student.course_detail', course_id=course_id))
-    
-    # Separate questions by difficulty
-    easy_questions = [q for q in all_questions if q.difficulty == 'Easy']
-    medium_questions = [q for q in all_questions if q.difficulty == 'Medium']
-    hard_questions = [q for q in all_questions if q.difficulty == 'Hard']
+    # Questions, answer key and difficulty pools live in a per-attempt plan
+    # built when the attempt starts, so each step is a lookup rather than a reload
+    if existing_submission:
+        submission = existing_submission
+        plan = quiz_plans.load(submission, answered=answer_buffer.load(submission.id))
+        if not plan.total:
+            flash('This quiz has no questions.', 'warning')
+            return redirect(url_for('student.course_detail', course_id=course_id))
+    else:
+        all_questions = Question.query.filter_by(quiz_id=quiz_id).order_by(Question.id).all()
+        if not all_questions:
+            flash('This quiz has no questions.', 'warning')
+            return redirect(url_for('student.course_detail', course_id=course_id))
+        submission = QuizSubmission(
+            quiz_id=quiz_id,
+            student_id=current_user.id,
+            start_time=current_time
+        )
+        db.session.add(submission)
+        db.session.commit()
+        plan = quiz_plans.build(submission, all_questions)
     
     if request.method == 'POST':
         # Handle multi-part form submission
@@ -650,68 +565,43 @@ def take_quiz(course_id, quiz_id):
         except:
             answers_dict = {}
 
-        # Get current question based on part
-        current_question = None
-        if current_part <= len(all_questions):
-            current_question = all_questions[current_part - 1]
-
-        # Process current answer
-        if current_question:
-            answer_letter = request.form.get(f'question_{current_question.id}')
-            if answer_letter:
-                answers_dict[str(current_question.id)] = answer_letter
-                opts = json.loads(current_question.options) if current_question.options else []
-                letter_map = dict(zip(['A', 'B', 'C', 'D'], opts))
-                answer_text = letter_map.get(answer_letter, '')
-                if answer_letter:  # Defensive check
-                    quiz_answer = QuizAnswer(
-                        submission_id=existing_submission.id,
-                        question_id=current_question.id,
-                        answer=answer_letter,  # store the letter
-                        is_correct=(answer_text == current_question.correct_answer)
-                    )
-                    db.session.add(quiz_answer)
+        # Buffer the answer to the question that was shown; nothing is written until submission
+        answered_id = plan.answered_question(request.form)
+        if answered_id is not None:
+            answer_letter = request.form.get(f'question_{answered_id}')
+            if answer_letter in LETTERS:
+                answers_dict[str(answered_id)] = answer_letter
+                answer_buffer.record(submission.id, {answered_id: answer_letter})
+            else:
+                answered_id = None
 
         # Check if this is the final submission
         if current_part >= total_parts:
-            # Final submission - calculate score
-            if not existing_submission:
-                submission = QuizSubmission(
-                    quiz_id=quiz_id,
-                    student_id=current_user.id,
-                    start_time=current_time
-                )
-                db.session.add(submission)
-                db.session.commit()
-            else:
-                submission = existing_submission
-            
-            # Process all answers
-            score = 0
-            total_questions = len(all_questions)
+            # Autosaved and buffered answers plus the full map the page posts, graded against
+            # the compiled key; question ids and letters the plan does not offer are dropped
+            final_answers = plan.valid_answers(answer_buffer.load(submission.id))
+            if isinstance(answers_dict, dict):
+                final_answers.update(plan.valid_answers(answers_dict))
+            key = answer_keys.get(quiz_id)
+            final_answers = {question_id: letter for question_id, letter in final_answers.items()
+                             if question_id in key.positions}
+            graded = key.grade({str(question_id): letter for question_id, letter in final_answers.items()})
+            correct = dict(zip(key.question_ids.tolist(), graded.tolist()))
 
-            for question in all_questions:
-                answer_letter = answers_dict.get(str(question.id))
-                if not answer_letter:
-                    continue  # Skip if no answer was selected
-                opts = json.loads(question.options) if question.options else []
-                letter_map = dict(zip(['A', 'B', 'C', 'D'], opts))
-                answer_text = letter_map.get(answer_letter, '')
-                if answer_letter:  # Defensive check
-                    quiz_answer = QuizAnswer(
-                        submission_id=submission.id,
-                        question_id=question.id,
-                        answer=answer_letter,  # store the letter
-                        is_correct=(answer_text == question.correct_answer)
-                    )
-                    db.session.add(quiz_answer)
-                    if answer_text == question.correct_answer:
-                        score += 1
-            
-            # Update submission
+            # One bulk write of every answer, in the same transaction as the score
+            answer_buffer.flush(submission.id, final_answers, correct)
             submission.end_time = current_time
-            submission.score = (score / total_questions) * 100 if total_questions > 0 else 0
-            db.session.commit()
+            submission.score = float(graded.sum()) / len(key) * 100 if len(key) else 0
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # A second submit of the same attempt raced this one; its answers are already stored
+                db.session.rollback()
+                flash('This quiz was already submitted.', 'info')
+                return redirect(url_for('student.quiz_result', course_id=course_id, quiz_id=quiz_id))
+            answer_buffer.discard(submission.id)
+            quiz_plans.discard(submission.id)
+            quiz_analytics.invalidate(quiz_id)
             
             flash('Quiz submitted successfully!', 'success')
             return redirect(url_for('student.quiz_result', course_id=course_id, quiz_id=quiz_id))
@@ -719,114 +609,59 @@ def take_quiz(course_id, quiz_id):
         # Continue to next part
         next_part = current_part + 1
 
-        # Determine next question difficulty based on behavior or time
+        # The adaptive engine picks the next question from recent behavior and timing
         next_question = None
         debug_message = ''
-        if next_part <= len(all_questions):
-            # Get recent behavior data
-            recent_logs = EmotionLog.query.filter_by(student_id=current_user.id)\
-                .order_by(EmotionLog.timestamp.desc())\
-                .limit(5)\
-                .all()
-
-            use_behavior = False
-            if recent_logs:
-                avg_focus = sum(log.focus_score for log in recent_logs) / len(recent_logs)
-                avg_frustration = sum(log.frustration_score for log in recent_logs) / len(recent_logs)
-                use_behavior = True
-            else:
-                avg_focus = avg_frustration = None
-
-            # Adaptive difficulty logic
-            if use_behavior and avg_focus is not None and avg_frustration is not None:
-                if avg_focus >= 0.7 and avg_frustration <= 0.3:
-                    debug_message = f'Behavior: High focus/low frustration, picking hard question.'
-                    if hard_questions:
-                        next_question = hard_questions.pop(0)
-                    elif medium_questions:
-                        next_question = medium_questions.pop(0)
-                    else:
-                        next_question = easy_questions.pop(0) if easy_questions else all_questions[next_part - 1]
-                elif avg_focus <= 0.4 or avg_frustration >= 0.6:
-                    debug_message = f'Behavior: Low focus/high frustration, picking easy question.'
-                    if easy_questions:
-                        next_question = easy_questions.pop(0)
-                    elif medium_questions:
-                        next_question = medium_questions.pop(0)
-                    else:
-                        next_question = hard_questions.pop(0) if hard_questions else all_questions[next_part - 1]
-                else:
-                    debug_message = f'Behavior: Medium state, picking medium question.'
-                    if medium_questions:
-                        next_question = medium_questions.pop(0)
-                    elif easy_questions:
-                        next_question = easy_questions.pop(0)
-                    else:
-                        next_question = hard_questions.pop(0) if hard_questions else all_questions[next_part - 1]
-            else:
-                # No behavior data - use time taken
-                if time_taken is not None:
-                    debug_message = f'Time taken: {time_taken:.2f} seconds. '
-                    if time_taken < 20:
-                        debug_message += 'Very quick, picking hard question.'
-                        if hard_questions:
-                            next_question = hard_questions.pop(0)
-                        elif medium_questions:
-                            next_question = medium_questions.pop(0)
-                        else:
-                            next_question = easy_questions.pop(0) if easy_questions else all_questions[next_part - 1]
-                    elif time_taken < 60:
-                        debug_message += 'Medium time, picking medium question.'
-                        if medium_questions:
-                            next_question = medium_questions.pop(0)
-                        elif hard_questions:
-                            next_question = hard_questions.pop(0)
-                        else:
-                            next_question = easy_questions.pop(0) if easy_questions else all_questions[next_part - 1]
-                    else:
-                        debug_message += 'Took a long time, picking easy question.'
-                        if easy_questions:
-                            next_question = easy_questions.pop(0)
-                        elif medium_questions:
-                            next_question = medium_questions.pop(0)
-                        else:
-                            next_question = hard_questions.pop(0) if hard_questions else all_questions[next_part - 1]
-                else:
-                    debug_message = 'No timing info, fallback to default order.'
-                    next_question = all_questions[next_part - 1]
+        if next_part <= plan.total:
+            # Recent behavior from the in-memory window rather than an EmotionLog query
+            signals = Signals.from_window(behavior_window_cache.snapshot(current_user.id), time_taken)
+            if answered_id is not None:
+                adaptive_engine.observe(current_user.id, plan.questions[answered_id].difficulty,
+                                        plan.is_correct(answered_id, answers_dict[str(answered_id)]), signals)
+            next_question, debug_message = adaptive_engine.select(plan, current_user.id, signals)
 
         print(debug_message)  # For server-side debugging
         return render_template('take_quiz_multipart.html', 
                              quiz=quiz,
                              current_question=next_question,
                              current_part=next_part,
-                             total_parts=len(all_questions),
+                             total_parts=plan.total,
                              answers=json.dumps(answers_dict),
                              current_time=current_time,
                              question_start_time=now_timestamp,
                              debug_message=debug_message)
     
-    # Initial quiz start
-    if not existing_submission:
-        submission = QuizSubmission(
-            quiz_id=quiz_id,
-            student_id=current_user.id,
-            start_time=current_time
-        )
-        db.session.add(submission)
-        db.session.commit()
-    
-    # Start with first question
-    first_question = all_questions[0] if all_questions else None
+    # Initial quiz start, or a reload of the question being answered
+    first_question = plan.current() or plan.next_in_order()
     
     return render_template('take_quiz_multipart.html', 
                          quiz=quiz, 
                          current_question=first_question,
-                         current_part=1,
-                         total_parts=len(all_questions),
+                         current_part=max(1, len(plan.served)),
+                         total_parts=plan.total,
                          answers='{}',
                          current_time=current_time)
 
+@student_bp.route('/courses/<int:course_id>/quiz/<int:quiz_id>/save_progress', methods=['POST'])
+@login_required
+def save_quiz_progress(course_id, quiz_id):
+    """Buffer in-progress answers posted by the quiz page's autosave and store them ungraded."""
+    submission = QuizSubmission.query.filter_by(quiz_id=quiz_id, student_id=current_user.id).first()
+    if not submission or submission.end_time:
+        return jsonify({'success': False, 'error': 'No quiz attempt in progress'}), 404
+    answers = (request.get_json(silent=True) or {}).get('answers') or {}
+    if not isinstance(answers, dict):
+        return jsonify({'success': False, 'error': 'answers must be an object'}), 400
+    plan = quiz_plans.load(submission, answered=answer_buffer.load(submission.id))
+    # Written through to quiz_answer so the attempt survives a restart or another worker
+    saved = answer_buffer.save(submission.id, plan.valid_answers(answers))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent autosave inserted the same rows; they stay buffered for the next one
+        db.session.rollback()
+    return jsonify({'success': True, 'saved': saved})
+
 @student_bp.route('/courses/<int:course_id>/quiz/<int:quiz_id>/result')
 @login_required
 def quiz_result(course_id, quiz_id):
@@ -846,53 +681,15 @@ def quiz_result(course_id, quiz_id):
         flash('No completed quiz submission found.', 'warning')
         return redirect(url_for('student.course_detail', course_id=course_id))
     
-    # Calculate additional metrics
-    total_questions = len(submission.answers)
-    correct_answers = sum(1 for answer in submission.answers if answer.is_correct)
-    
-    # Calculate time taken
-    time_taken = submission.end_time - submission.start_time
-    time_taken_minutes = round(time_taken.total_seconds() / 60, 1)
-    
-    # Get behavior data during quiz
-    quiz_start = submission.start_time
-    quiz_end = submission.end_time
-    
-    behavior_logs = EmotionLog.query.filter(
-        EmotionLog.student_id == current_user.id,
-        EmotionLog.timestamp >= quiz_start,
-        EmotionLog.timestamp <= quiz_end
-    ).all()
-    
-    # Calculate average behavior metrics
-    avg_focus = 0
-    avg_frustration = 0
-    
-    if behavior_logs:
-        avg_focus = sum(log.focus_score for log in behavior_logs) / len(behavior_logs)
-        avg_frustration = sum(log.frustration_score for log in behavior_logs) / len(behavior_logs)
-    
-    # Calculate difficulty breakdown
-    easy_questions = [answer for answer in submission.answers if answer.question.difficulty == 'Easy']
-    medium_questions = [answer for answer in submission.answers if answer.question.difficulty == 'Medium']
-    hard_questions = [answer for answer in submission.answers if answer.question.difficulty == 'Hard']
-    
-    easy_correct = sum(1 for answer in easy_questions if answer.is_correct)
-    medium_correct = sum(1 for answer in medium_questions if answer.is_correct)
-    hard_correct = sum(1 for answer in hard_questions if answer.is_correct)
-    
-    # Add calculated properties to submission object
-    submission.correct_answers_count = correct_answers
-    submission.total_questions = total_questions
-    submission.time_taken_minutes = time_taken_minutes
-    submission.avg_focus_percent = round(avg_focus * 100, 1)
-    submission.avg_frustration_percent = round(avg_frustration * 100, 1)
-    submission.easy_questions_count = len(easy_questions)
-    submission.medium_questions_count = len(medium_questions)
-    submission.hard_questions_count = len(hard_questions)
-    submission.easy_correct_count = easy_correct
-    submission.medium_correct_count = medium_correct
-    submission.hard_correct_count = hard_correct
+    # Metrics come from the quiz's cached analytics; a submission missing from
+    # them (submitted through another worker) forces a rebuild
+    stat = quiz_analytics.get(quiz_id).for_submission(submission.id)
+    if stat is None:
+        quiz_analytics.invalidate(quiz_id)
+        stat = quiz_analytics.get(quiz_id).for_submission(submission.id) or {}
+    for name, value in stat.items():
+        if name not in ('student', 'submission'):
+            setattr(submission, name, value)
     
     return render_template('quiz_result.html',
                          quiz=quiz,
@@ -903,18 +700,12 @@ def quiz_result(course_id, quiz_id):
 @login_required
 def start_behavior_monitor():
     try:
-        # Import here to avoid circular imports
-        from student_behavior_monitor import StudentBehaviorMonitor
-        from flask import current_app
-        
         # Get the course_id from request if available
         data = request.get_json(silent=True) or {}
         course_id = data.get('course_id')
         
-        # Create monitor instance and start monitoring
-        monitor = StudentBehaviorMonitor()
-        app = current_app._get_current_object()
-        success = monitor.start_monitoring(current_user.id, course_id, app)
+        # Sessions run on the shared scheduler, keyed by (student_id, course_id)
+        success = behavior_scheduler.start_session(current_user.id, course_id)
         
         if success:
             return jsonify({'message': 'Monitoring started successfully'})
@@ -927,9 +718,7 @@ def start_behavior_monitor():
 @login_required
 def stop_behavior_monitor():
     try:
-        # Stop monitoring by setting a flag in the monitor instance
-        if hasattr(current_app, 'behavior_monitor'):
-            current_app.behavior_monitor.stop_monitoring()
+        behavior_scheduler.stop_session(current_user.id)
         return jsonify({'message': 'Monitoring stopped successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -937,18 +726,11 @@ def stop_behavior_monitor():
 @student_bp.route('/monitoring_status', methods=['GET'])
 @login_required
 def monitoring_status():
-    from datetime import datetime, timedelta
-    now = datetime.utcnow()
-    one_minute_ago = now - timedelta(minutes=1)
-    
-    # Check if monitoring is active in the app context
-    is_monitoring = hasattr(current_app, 'behavior_monitor') and current_app.behavior_monitor.is_monitoring
+    # Check if a monitoring session is active for this student
+    is_monitoring = behavior_scheduler.is_monitoring(current_user.id)
     
-    # Get recent logs
-    logs = EmotionLog.query.filter(
-        EmotionLog.student_id == current_user.id,
-        EmotionLog.timestamp >= one_minute_ago
-    ).all()
+    # Last minute of samples from the in-memory window
+    window = behavior_window_cache.snapshot(current_user.id)
     
     # Get enrollment record to check monitoring status
     enrollment = None
@@ -959,10 +741,10 @@ def monitoring_status():
             course_id=course_id
         ).first()
     
-    if logs:
-        avg_focus = sum(log.focus_score for log in logs) / len(logs)
-        avg_frustration = sum(log.frustration_score for log in logs) / len(logs)
-        last_updated = max(log.timestamp for log in logs)
+    if window['count_1m']:
+        avg_focus = window['avg_focus_1m']
+        avg_frustration = window['avg_frustration_1m']
+        last_updated = window['last_updated']
     elif enrollment and enrollment.last_updated:
         # Use enrollment data if available
         avg_focus = enrollment.latest_focus_score
@@ -981,7 +763,7 @@ def monitoring_status():
         avg_frustration = round(avg_frustration * 100, 1)
         
     return jsonify({
-        'is_monitoring': is_monitoring or (enrollment and enrollment.is_monitoring) or any(logs),
+        'is_monitoring': is_monitoring or (enrollment and enrollment.is_monitoring) or window['count_1m'] > 0,
         'avg_focus': avg_focus,
         'avg_frustration': avg_frustration,
         'last_updated': last_updated.isoformat() if last_updated else None
@@ -991,12 +773,54 @@ def monitoring_status():
 @login_required
 def behavior_tracking():
     student_id = current_user.id
-    logs = EmotionLog.query.filter_by(student_id=student_id).order_by(EmotionLog.timestamp.desc()).all()
+    # Coarser rollups for longer ranges instead of every raw row
+    range_key = request.args.get('range', '7d')
+    if range_key not in HISTORY_RANGES:
+        range_key = '7d'
+    span = HISTORY_RANGES[range_key]
+    start = datetime.utcnow() - span if span else None
+    show_samples = request.args.get('view') == 'samples'
+    if show_samples:
+        # Individual samples are lazy-loaded page by page from behavior_history_api
+        resolution, logs = 'raw', []
+    else:
+        resolution, logs = fetch_history(student_id, start=start)
+        show_samples = resolution == 'raw'
+        if show_samples:
+            logs = []
     return render_template(
         'behavior_tracking.html',
-        logs=logs
+        logs=logs,
+        resolution=resolution,
+        show_samples=show_samples,
+        history_start=start.isoformat() if start else '',
+        history_range=range_key,
+        history_ranges=HISTORY_RANGES
     )
 
+@student_bp.route('/api/behavior_history', methods=['GET'])
+@login_required
+def behavior_history_api():
+    """
+    Newest-first EmotionLog history for the current student, one page at a
+    time. Query args: start/end (ISO date or datetime), limit and the
+    next_cursor of the previous page as cursor.
+    """
+    try:
+        start = parse_date(request.args.get('start'))
+        end = parse_date(request.args.get('end'), end_of_day=True)
+        cursor = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = page_size(request.args.get('limit'))
+
+    # One extra row tells stream_page whether another page follows
+    logs = emotion_log_partitions.fetch_range(
+        student_id=current_user.id, start=start, end=end,
+        descending=True, limit=limit + 1, after=cursor
+    )
+    return Response(stream_with_context(stream_page(logs, limit)), mimetype='application/json')
+
 @student_bp.route('/get_behavior_suggestions', methods=['POST'])
 @login_required
 def get_behavior_suggestions():
@@ -1128,8 +952,8 @@ Format the response as JSON with the following structure:
             'course_suggestions': []
         }
     
-    # Get all logs for the template
-    logs = EmotionLog.query.filter_by(student_id=student_id).order_by(EmotionLog.timestamp.desc()).all()
+    # The template lists the 10 most recent logs
+    logs = emotion_log_partitions.fetch_range(student_id=student_id, descending=True, limit=10)
     
     return render_template('behavior_suggestions_with_camera.html', 
                          logs=logs, 
@@ -1143,91 +967,51 @@ def get_live_behavior_data():
     """Get live behavior data for real-time updates"""
     student_id = current_user.id
     
-    # Get the most recent behavior log
-    latest_log = EmotionLog.query.filter_by(student_id=student_id)\
-        .order_by(EmotionLog.timestamp.desc())\
-        .first()
-    
-    # Get recent logs for trend analysis
-    from datetime import datetime, timedelta
+    from datetime import datetime
     now = datetime.utcnow()
-    five_minutes_ago = now - timedelta(minutes=5)
-    recent_logs = EmotionLog.query.filter(
-        EmotionLog.student_id == student_id,
-        EmotionLog.timestamp >= five_minutes_ago
-    ).order_by(EmotionLog.timestamp.desc()).all()
-    
-    # Calculate averages and prepare response data
-    if recent_logs:
-        avg_focus = sum(log.focus_score for log in recent_logs) / len(recent_logs)
-        avg_frustration = sum(log.frustration_score for log in recent_logs) / len(recent_logs)
-        trend = 'stable'
-        
-        # Determine trend
-        if len(recent_logs) >= 2:
-            recent_half = recent_logs[:len(recent_logs)//2]
-            older_half = recent_logs[len(recent_logs)//2:]
-            
-            if recent_half and older_half:  # Ensure both halves have data
-                recent_avg = sum(log.focus_score for log in recent_half) / len(recent_half)
-                older_avg = sum(log.focus_score for log in older_half) / len(older_half)
-                
-                if recent_avg > older_avg + 0.1:
-                    trend = 'improving'
-                elif recent_avg < older_avg - 0.1:
-                    trend = 'declining'
-        
-        # Get the latest values
-        latest_focus = latest_log.focus_score if latest_log else avg_focus
-        latest_frustration = latest_log.frustration_score if latest_log else avg_frustration
-        last_updated = latest_log.timestamp.isoformat() if latest_log else now.isoformat()
-    else:
+    
+    # Latest sample, 5-minute averages and trend from the in-memory window
+    window = behavior_window_cache.snapshot(student_id, now)
+    
+    # Same payload as the behavior_update socket push
+    payload = behavior_payload(window)
+    if payload is None:
         # If no logs exist, provide simulated default values
         import random
-        avg_focus = random.uniform(0.4, 0.7)  # Reasonable default range
-        avg_frustration = random.uniform(0.3, 0.6)  # Reasonable default range
-        latest_focus = avg_focus
-        latest_frustration = avg_frustration
-        trend = 'stable'
-        last_updated = now.isoformat()
+        avg_focus = round(random.uniform(0.4, 0.7) * 100, 1)  # Reasonable default range
+        avg_frustration = round(random.uniform(0.3, 0.6) * 100, 1)  # Reasonable default range
+        payload = {
+            'latest_focus': avg_focus,
+            'latest_frustration': avg_frustration,
+            'avg_focus': avg_focus,
+            'avg_frustration': avg_frustration,
+            'avg_focus_1m': None,
+            'avg_frustration_1m': None,
+            'trend': 'stable',
+            'last_updated': now.isoformat(),
+            'recent_logs_count': 0
+        }
     
-    return jsonify({
-        'latest_focus': round(latest_focus * 100, 1),
-        'latest_frustration': round(latest_frustration * 100, 1),
-        'avg_focus': round(avg_focus * 100, 1),
-        'avg_frustration': round(avg_frustration * 100, 1),
-        'trend': trend,
-        'last_updated': last_updated,
-        'recent_logs_count': len(recent_logs) if recent_logs else 0
-    })
+    return jsonify(payload)
 
 @student_bp.route('/get_quiz_behavior_data', methods=['GET'])
 @login_required
 def get_quiz_behavior_data():
     """Get real-time behavior data for adaptive quiz difficulty"""
     try:
-        # Get recent behavior logs (last 5 minutes)
-        recent_time = datetime.utcnow() - timedelta(minutes=5)
-        recent_logs = EmotionLog.query.filter(
-            EmotionLog.student_id == current_user.id,
-            EmotionLog.timestamp >= recent_time
-        ).order_by(EmotionLog.timestamp.desc()).limit(10).all()
+        # Recent behavior from the in-memory window; the last minute covers
+        # roughly the 10 samples this used to query
+        window = behavior_window_cache.snapshot(current_user.id)
         
-        if recent_logs:
-            # Calculate averages
-            avg_focus = sum(log.focus_score for log in recent_logs) / len(recent_logs)
-            avg_frustration = sum(log.frustration_score for log in recent_logs) / len(recent_logs)
-            
-            # Determine suggested difficulty
-            if avg_focus >= 0.7 and avg_frustration <= 0.3:
-                suggested_difficulty = 'Hard'
-                difficulty_reason = 'High focus and low frustration detected'
-            elif avg_focus <= 0.4 or avg_frustration >= 0.6:
-                suggested_difficulty = 'Easy'
-                difficulty_reason = 'Low focus or high frustration detected'
+        if window['count_5m']:
+            if window['count_1m']:
+                avg_focus = window['avg_focus_1m']
+                avg_frustration = window['avg_frustration_1m']
             else:
-                suggested_difficulty = 'Medium'
-                difficulty_reason = 'Moderate focus and frustration levels'
+                avg_focus = window['avg_focus_5m']
+                avg_frustration = window['avg_frustration_5m']
+            
+            suggested_difficulty, difficulty_reason = behavior_difficulty(avg_focus, avg_frustration)
             
             return jsonify({
                 'success': True,
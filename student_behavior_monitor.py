@@ -1,10 +1,12 @@
 import threading
 import time
 import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from flask import current_app
-from flask_sqlalchemy import SQLAlchemy
-from models import Enrollment, EmotionLog, db
+from services.emotion_log_writer import emotion_log_writer
+from services.behavior_scoring import behavior_scorer
+from services.emotion_encoding import encode_monitor
 
 # Placeholders for actual imports - in a real implementation, these would be used
 # import cv2
@@ -13,100 +15,39 @@ from models import Enrollment, EmotionLog, db
 # import pynput
 # import mouseinfo
 
-db = SQLAlchemy()
-
 class StudentBehaviorMonitor:
-    def __init__(self):
-        self.running = False
-        self.duration = 300  # 5 minutes default duration
-        self.logs = []
-        self.current_app = None
+    """Collects and scores behavior samples for one monitoring session."""
 
-    def start_monitoring(self, student_id, course_id, app):
-        self.running = True
-        self.current_app = app
-        
-        # Store the monitor instance in the app context for access from other routes
-        app.behavior_monitor = self
-        
-        # Start monitoring in a separate thread
-        monitor_thread = threading.Thread(target=self._monitoring_loop, args=(student_id, course_id, app))
-        monitor_thread.daemon = True  # Thread will exit when main thread exits
-        monitor_thread.start()
-        
-        return True
-    
-    def _monitoring_loop(self, student_id, course_id, app):
-        """The main monitoring loop that runs in a separate thread"""
-        with app.app_context():
-            try:
-                # Initialize monitoring components
-                self.initialize_components()
-                
-                start_time = time.time()
-                while self.running and (time.time() - start_time) < self.duration:
-                    # Collect data from all sources
-                    face_data = self.analyze_face()
-                    voice_data = self.analyze_voice()
-                    keyboard_data = self.analyze_keyboard()
-                    mouse_data = self.analyze_mouse()
-                    
-                    # Aggregate scores
-                    focus_score = self.aggregate_focus_score(face_data, voice_data, keyboard_data, mouse_data)
-                    frustration_score = self.aggregate_frustration_score(face_data, voice_data, keyboard_data, mouse_data)
-                    
-                    # Log the data
-                    log_entry = {
-                        'timestamp': datetime.utcnow().isoformat(),
-                        'focus_score': focus_score,
-                        'frustration_score': frustration_score,
-                        'source_data_summary': {
-                            'face': face_data,
-                            'voice': voice_data,
-                            'keyboard': keyboard_data,
-                            'mouse': mouse_data
-                        }
-                    }
-                    self.logs.append(log_entry)
-                    
-                    # Log to EmotionLog table
-                    elog = EmotionLog(
-                        student_id=student_id,
-                        course_id=course_id,  # Can be None
-                        timestamp=datetime.utcnow(),
-                        focus_score=focus_score,
-                        frustration_score=frustration_score,
-                        source_data_summary=str(log_entry['source_data_summary'])
-                    )
-                    db.session.add(elog)
-                    db.session.commit()
-                    
-                    # Also update the enrollment record if course_id is provided
-                    if course_id:
-                        enrollment = Enrollment.query.filter_by(
-                            student_id=student_id, 
-                            course_id=course_id
-                        ).first()
-                        
-                        if enrollment:
-                            enrollment.latest_focus_score = focus_score
-                            enrollment.frustration_level = frustration_score
-                            enrollment.last_updated = datetime.utcnow()
-                            enrollment.is_monitoring = True
-                            db.session.commit()
-                    
-                    time.sleep(2)  # Wait 2 seconds between measurements
-                    
-            except Exception as e:
-                print(f"Error in monitoring: {str(e)}")
-            finally:
-                self.cleanup()
-                self.running = False
-                if hasattr(app, 'behavior_monitor'):
-                    delattr(app, 'behavior_monitor')
+    def __init__(self, max_logs=150):
+        self.logs = deque(maxlen=max_logs)  # About 5 minutes of samples at one per 2 seconds
+        self.initialize_components()
 
-    def stop_monitoring(self):
-        self.running = False
+    def collect_sources(self):
+        """Collect raw data from all sources."""
+        return {
+            'face': self.analyze_face(),
+            'voice': self.analyze_voice(),
+            'keyboard': self.analyze_keyboard(),
+            'mouse': self.analyze_mouse()
+        }
+
+    def record(self, sources, focus_score, frustration_score):
+        """Store a scored sample in the session history and return the log entry."""
+        log_entry = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'focus_score': focus_score,
+            'frustration_score': frustration_score,
+            'source_data_summary': sources
+        }
+        self.logs.append(log_entry)
+        return log_entry
+
+    def collect_sample(self):
+        """Collect data from all sources and return one scored log entry."""
+        sources = self.collect_sources()
+        focus_score = self.aggregate_focus_score(sources['face'], sources['voice'], sources['keyboard'], sources['mouse'])
+        frustration_score = self.aggregate_frustration_score(sources['face'], sources['voice'], sources['keyboard'], sources['mouse'])
+        return self.record(sources, focus_score, frustration_score)
 
     def initialize_components(self):
         # Initialize camera, microphone, and other components
@@ -232,4 +173,189 @@ class StudentBehaviorMonitor:
         return None
 
     def get_all_logs(self):
-        return self.logs
\ No newline at end of file
+        return list(self.logs)
+
+class MonitorSession:
+    """One (student_id, course_id) monitoring session placed on the timer wheel."""
+
+    __slots__ = ('key', 'monitor', 'expires_at', 'rounds', 'stopped')
+
+    def __init__(self, key, monitor, expires_at):
+        self.key = key
+        self.monitor = monitor
+        self.expires_at = expires_at
+        self.rounds = 0
+        self.stopped = False
+
+
+class BehaviorMonitorScheduler:
+    """
+    Runs every active monitoring session on one timer thread and a fixed
+    worker pool instead of a thread per student.
+
+    Sessions are keyed by (student_id, course_id) and sit in a hashed timer
+    wheel with `wheel_size` slots of `tick_seconds` each. On every tick the
+    sessions due in the current slot are sampled on the pool, scored together
+    by the vectorized BehaviorScorer, and all their EmotionLog rows and
+    enrollment updates are written in one transaction.
+    """
+
+    def __init__(self, app=None, tick_seconds=2.0, interval_ticks=1, duration=300,
+                 max_workers=4, wheel_size=64):
+        self.app = None
+        self.tick_seconds = tick_seconds
+        self.interval_ticks = interval_ticks
+        self.duration = duration
+        self.max_workers = max_workers
+        self.wheel_size = wheel_size
+        self._wheel = [set() for _ in range(wheel_size)]
+        self._sessions = {}
+        self._current_slot = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.tick_seconds = app.config.get('BEHAVIOR_MONITOR_TICK_SECONDS', self.tick_seconds)
+        self.duration = app.config.get('BEHAVIOR_MONITOR_DURATION', self.duration)
+        self.max_workers = app.config.get('BEHAVIOR_MONITOR_WORKERS', self.max_workers)
+        app.extensions['behavior_monitor_scheduler'] = self
+
+    def start_session(self, student_id, course_id=None):
+        """Start (or restart) monitoring for a student and course."""
+        key = (student_id, course_id)
+        with self._lock:
+            existing = self._sessions.get(key)
+            if existing is not None:
+                existing.expires_at = time.time() + self.duration
+                return True
+            session = MonitorSession(key, StudentBehaviorMonitor(), time.time() + self.duration)
+            self._sessions[key] = session
+            self._schedule(session, self.interval_ticks)
+        self._ensure_started()
+        return True
+
+    def stop_session(self, student_id, course_id=None):
+        """Stop one session, or every session of the student when course_id is None."""
+        with self._lock:
+            keys = [key for key in self._sessions
+                    if key[0] == student_id and (course_id is None or key[1] == course_id)]
+            for key in keys:
+                self._sessions.pop(key).stopped = True
+        for _, session_course_id in keys:
+            if session_course_id:
+                emotion_log_writer.update_enrollment(student_id, session_course_id, is_monitoring=False)
+        return bool(keys)
+
+    def is_monitoring(self, student_id, course_id=None):
+        with self._lock:
+            return any(key[0] == student_id and (course_id is None or key[1] == course_id)
+                       for key in self._sessions)
+
+    def get_latest_scores(self, student_id, course_id=None):
+        with self._lock:
+            session = self._sessions.get((student_id, course_id))
+        return session.monitor.get_latest_scores() if session else None
+
+    def active_session_count(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _schedule(self, session, ticks):
+        # Caller holds self._lock
+        session.rounds = (ticks - 1) // self.wheel_size
+        slot = (self._current_slot + ticks) % self.wheel_size
+        self._wheel[slot].add(session)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='behavior-monitor')
+            self._thread = threading.Thread(target=self._run, name='behavior-monitor-scheduler')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.tick_seconds
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            with self._lock:
+                if not self._sessions:
+                    # Nothing left to monitor; the next start_session() restarts the thread
+                    self._thread = None
+                    return
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Error in monitoring: {str(e)}")
+
+    def tick(self):
+        """Advance the wheel one slot and sample every session that is due."""
+        now = time.time()
+        due = []
+        with self._lock:
+            self._current_slot = (self._current_slot + 1) % self.wheel_size
+            slot = self._wheel[self._current_slot]
+            for session in list(slot):
+                if session.stopped:
+                    slot.discard(session)
+                elif session.rounds > 0:
+                    session.rounds -= 1
+                else:
+                    slot.discard(session)
+                    if session.expires_at <= now:
+                        self._sessions.pop(session.key, None)
+                        session.stopped = True
+                    else:
+                        due.append(session)
+                        self._schedule(session, self.interval_ticks)
+        if not due:
+            return 0
+
+        if self._pool is not None and len(due) > 1:
+            sources = list(self._pool.map(lambda s: s.monitor.collect_sources(), due))
+        else:
+            sources = [session.monitor.collect_sources() for session in due]
+
+        # Score every session due this tick in one vectorized pass
+        focus, frustration = behavior_scorer.score_sources(sources)
+        samples = [
+            session.monitor.record(source, float(focus[i]), float(frustration[i]))
+            for i, (session, source) in enumerate(zip(due, sources))
+        ]
+        self._write_samples(due, samples)
+        return len(due)
+
+    def _write_samples(self, sessions, samples):
+        timestamp = datetime.utcnow()
+        logs = []
+        updates = {}
+        for session, sample in zip(sessions, samples):
+            student_id, course_id = session.key
+            logs.append({
+                'student_id': student_id,
+                'course_id': course_id,  # Can be None
+                'timestamp': timestamp,
+                'focus_score': sample['focus_score'],
+                'frustration_score': sample['frustration_score'],
+                'source_data': encode_monitor(sample['source_data_summary'])
+            })
+            # Also update the enrollment record if course_id is provided
+            if course_id:
+                updates[(student_id, course_id)] = {
+                    'latest_focus_score': sample['focus_score'],
+                    'frustration_level': sample['frustration_score'],
+                    'last_updated': timestamp,
+                    'is_monitoring': True
+                }
+        # One transaction for every session sampled this tick
+        emotion_log_writer.write_batch(logs, updates)
+
+
+behavior_scheduler = BehaviorMonitorScheduler()
@@ -0,0 +1,52 @@
+import time
+from services.activity_store import InProcessActivityStore, SQLiteActivityStore, ActivityStore
+
+def test_in_process_store_round_trip():
+    """Test that the latest counters are returned for a user."""
+    store = InProcessActivityStore()
+    store.set(1, {'keypresses': 3, 'mousemoves': 7, 'mouseclicks': 1})
+    assert store.get(1) == {'keypresses': 3, 'mousemoves': 7, 'mouseclicks': 1}
+    assert store.get(2) is None
+
+def test_in_process_store_expires_entries():
+    """Test that records older than the TTL are evicted."""
+    store = InProcessActivityStore(ttl_seconds=0.01)
+    store.set(1, {'keypresses': 1})
+    time.sleep(0.02)
+    assert store.get(1) is None
+    assert len(store) == 0
+
+def test_in_process_store_is_bounded():
+    """Test that the oldest users are dropped once the store is full."""
+    store = InProcessActivityStore(max_entries=2)
+    for user_id in range(5):
+        store.set(user_id, {'keypresses': user_id})
+    assert len(store) == 2
+    assert store.get(0) is None
+    assert store.get(4)['keypresses'] == 4
+
+def test_invalid_counters_are_zeroed():
+    """Test that malformed client payloads do not break the store."""
+    store = InProcessActivityStore()
+    store.set(1, {'keypresses': 'lots', 'mousemoves': -4})
+    assert store.get(1) == {'keypresses': 0, 'mousemoves': 0, 'mouseclicks': 0}
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    """Test that two workers pointing at the same file see each other's writes."""
+    path = str(tmp_path / 'activity.db')
+    writer = SQLiteActivityStore(path)
+    reader = SQLiteActivityStore(path)
+    writer.set(5, {'keypresses': 2, 'mousemoves': 4, 'mouseclicks': 6})
+    assert reader.get(5) == {'keypresses': 2, 'mousemoves': 4, 'mouseclicks': 6}
+
+def test_sqlite_store_prunes_to_max_entries(tmp_path):
+    """Test that pruning keeps only the newest max_entries users."""
+    store = SQLiteActivityStore(str(tmp_path / 'activity.db'), max_entries=3, prune_every=1000)
+    for user_id in range(6):
+        store.set(user_id, {'keypresses': user_id})
+    store.prune()
+    assert len(store) == 3
+
+def test_facade_defaults_to_zero_counters():
+    """Test that unknown users read as no activity."""
+    assert ActivityStore().get(99) == {'keypresses': 0, 'mousemoves': 0, 'mouseclicks': 0}
@@ -0,0 +1,57 @@
+import pytest
+from services.adaptive_engine import AdaptiveEngine, AdaptivePolicy, Signals, behavior_difficulty
+from services.quiz_plan import QuizPlan, PlannedQuestion
+
+
+def _plan():
+    questions = [PlannedQuestion(i, f'Q{i}', difficulty, ['a', 'b'], 'A')
+                 for i, difficulty in enumerate(['Easy', 'Medium', 'Hard', 'Easy', 'Medium', 'Hard'], start=1)]
+    return QuizPlan(1, 1, questions, item_rank={3: 1.2, 6: 0.8})
+
+def test_threshold_policy_keeps_original_rules():
+    """Test that the threshold policy picks by behavior first, then by time taken."""
+    engine = AdaptiveEngine()
+    plan = _plan()
+    question, reason = engine.select(plan, 7, Signals(0.8, 0.2))
+    assert question.id == 6 and reason.startswith('Behavior: High focus')
+    question, reason = engine.select(plan, 7, Signals(time_taken=90))
+    assert question.difficulty == 'Easy' and 'long time' in reason
+    assert engine.select(plan, 7, Signals())[0].id == 2
+    assert behavior_difficulty(0.5, 0.7) == ('Easy', 'Low focus or high frustration detected')
+
+def test_irt_policy_moves_ability_and_target():
+    """Test that correct answers raise the IRT ability estimate and the served difficulty."""
+    engine = AdaptiveEngine(policy='irt')
+    plan = _plan()
+    assert engine.select(plan, 7, Signals())[0].difficulty == 'Medium'
+    for _ in range(4):
+        engine.observe(7, 'Hard', True, Signals())
+    assert engine.state(7).theta > 0.5
+    assert engine.select(plan, 7, Signals())[0].difficulty == 'Hard'
+
+def test_bandit_policy_explores_then_exploits():
+    """Test that the bandit tries each difficulty before favouring the best reward."""
+    engine = AdaptiveEngine(policy='bandit')
+    plan = _plan()
+    served = []
+    for correct in (True, True, False):
+        question, _ = engine.select(plan, 7, Signals())
+        served.append(question.difficulty)
+        engine.observe(7, question.difficulty, correct, Signals())
+    assert served == ['Medium', 'Easy', 'Hard']
+    assert engine.select(plan, 7, Signals())[0].difficulty == 'Medium'
+
+def test_state_is_evicted_least_recently_used():
+    """Test that per-student state is bounded by max_students."""
+    engine = AdaptiveEngine(policy='irt', max_students=1)
+    engine.observe(1, 'Hard', True, Signals())
+    engine.observe(2, 'Hard', True, Signals())
+    assert engine.state(1).answered == 0
+
+def test_policy_without_choose_cannot_be_created():
+    """Test that AdaptivePolicy is abstract, so every policy must implement choose()."""
+    class Incomplete(AdaptivePolicy):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
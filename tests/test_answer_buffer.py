@@ -0,0 +1,70 @@
+import json
+from datetime import datetime
+
+import pytest
+from models import User, Course, Quiz, Question, QuizSubmission, QuizAnswer
+from services.answer_buffer import AnswerBuffer
+
+
+@pytest.fixture
+def submission(db):
+    """Create an open attempt at a two-question quiz."""
+    instructor = User(email='buffer-instructor@example.com', password_hash='x', role='instructor')
+    student = User(email='buffer-student@example.com', password_hash='x', role='student')
+    db.session.add_all([instructor, student])
+    db.session.commit()
+    course = Course(title='Buffer Course', instructor_id=instructor.id)
+    db.session.add(course)
+    db.session.commit()
+    quiz = Quiz(title='Buffer Quiz', course_id=course.id)
+    db.session.add(quiz)
+    db.session.commit()
+    db.session.add_all([
+        Question(quiz_id=quiz.id, question_text=f'Q{i}', options=json.dumps(['a', 'b']), correct_answer='a', difficulty='Easy')
+        for i in range(2)
+    ])
+    submission = QuizSubmission(quiz_id=quiz.id, student_id=student.id, start_time=datetime.utcnow())
+    db.session.add(submission)
+    db.session.commit()
+    yield submission
+    QuizAnswer.query.filter_by(submission_id=submission.id).delete()
+    db.session.delete(submission)
+    Question.query.filter_by(quiz_id=quiz.id).delete()
+    db.session.delete(quiz)
+    db.session.delete(course)
+    db.session.delete(instructor)
+    db.session.delete(student)
+    db.session.commit()
+
+def test_record_merges_latest_answers():
+    """Test that autosaves merge into one answer per question."""
+    buffer = AnswerBuffer()
+    buffer.record(1, {'10': 'A'})
+    assert buffer.record(1, {10: 'C', 11: 'B', 12: None}) == 2
+    assert buffer.answers(1) == {10: 'C', 11: 'B'}
+    buffer.discard(1)
+    assert buffer.answers(1) == {}
+
+def test_flush_is_idempotent(app, db, submission):
+    """Test that flushing an attempt twice leaves one row per question."""
+    question_ids = [q.id for q in Question.query.filter_by(quiz_id=submission.quiz_id).order_by(Question.id)]
+    buffer = AnswerBuffer()
+    answers = {question_ids[0]: 'A', question_ids[1]: 'B'}
+    correct = {question_ids[0]: True, question_ids[1]: False}
+    buffer.flush(submission.id, answers, correct)
+    db.session.commit()
+    buffer.flush(submission.id, {question_ids[1]: 'A'}, {question_ids[1]: True})
+    db.session.commit()
+    rows = QuizAnswer.query.filter_by(submission_id=submission.id).order_by(QuizAnswer.question_id).all()
+    assert [(row.answer, row.is_correct) for row in rows] == [('A', True), ('A', True)]
+
+def test_autosaved_answers_survive_a_buffer_miss(app, db, submission):
+    """Test that answers saved through one buffer are loaded back by another (restart or other worker)."""
+    question_ids = [q.id for q in Question.query.filter_by(quiz_id=submission.quiz_id).order_by(Question.id)]
+    AnswerBuffer().save(submission.id, {question_ids[0]: 'B'})
+    db.session.commit()
+    row = QuizAnswer.query.filter_by(submission_id=submission.id).one()
+    assert row.is_correct is None
+    other = AnswerBuffer()
+    other.record(submission.id, {question_ids[1]: 'A'})
+    assert other.load(submission.id) == {question_ids[0]: 'B', question_ids[1]: 'A'}
@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+
+import pytest
+from models import User, Course, Quiz, Question, QuizSubmission, QuizAnswer
+from services.answer_keys import AnswerKey, answer_keys, regrade_quiz
+
+
+@pytest.fixture
+def quiz(db):
+    """Create a two-question quiz with one completed submission."""
+    instructor = User(email='key-instructor@example.com', password_hash='x', role='instructor')
+    student = User(email='key-student@example.com', password_hash='x', role='student')
+    db.session.add_all([instructor, student])
+    db.session.commit()
+    course = Course(title='Key Course', instructor_id=instructor.id)
+    db.session.add(course)
+    db.session.commit()
+    quiz = Quiz(title='Key Quiz', course_id=course.id)
+    db.session.add(quiz)
+    db.session.commit()
+    first = Question(quiz_id=quiz.id, question_text='2+2', options=json.dumps(['3', '4']), correct_answer='4', difficulty='Easy')
+    second = Question(quiz_id=quiz.id, question_text='3+3', options=json.dumps(['6', '7']), correct_answer='7', difficulty='Easy')
+    db.session.add_all([first, second])
+    db.session.commit()
+    submission = QuizSubmission(quiz_id=quiz.id, student_id=student.id, start_time=datetime.utcnow(), end_time=datetime.utcnow(), score=50)
+    db.session.add(submission)
+    db.session.commit()
+    db.session.add_all([
+        QuizAnswer(submission_id=submission.id, question_id=first.id, answer='B', is_correct=True),
+        QuizAnswer(submission_id=submission.id, question_id=second.id, answer='A', is_correct=False),
+    ])
+    db.session.commit()
+    yield quiz
+    QuizAnswer.query.filter_by(submission_id=submission.id).delete()
+    db.session.delete(submission)
+    Question.query.filter_by(quiz_id=quiz.id).delete()
+    db.session.delete(quiz)
+    db.session.delete(course)
+    db.session.delete(instructor)
+    db.session.delete(student)
+    db.session.commit()
+
+def test_grade_compares_whole_submission():
+    """Test that a submission is graded against the key in question-id order."""
+    key = AnswerKey(1, {12: 'B', 10: 'A', 11: None})
+    graded = key.grade({'10': 'A', '11': 'A', '12': 'C'})
+    assert key.question_ids.tolist() == [10, 11, 12]
+    assert graded.tolist() == [True, False, False]
+    assert key.letter(12) == 'B' and key.letter(11) is None
+    assert abs(key.score({'10': 'A', '12': 'B'}) - 200 / 3) < 1e-9
+
+def test_regrade_after_key_change(app, db, quiz):
+    """Test that fixing a wrong key re-marks answers and re-scores submissions."""
+    second = Question.query.filter_by(quiz_id=quiz.id, question_text='3+3').one()
+    second.correct_answer = '6'
+    db.session.commit()
+    answer_keys.invalidate(quiz.id)
+    result = regrade_quiz(quiz.id)
+    assert result['answers_changed'] == 1
+    assert result['submissions_rescored'] == 1
+    assert QuizSubmission.query.filter_by(quiz_id=quiz.id).one().score == 100
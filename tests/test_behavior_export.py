@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import pytest
+from models import User, EmotionLog
+from services.behavior_export import QuizWindowIndex, iter_chunks
+
+
+@pytest.fixture
+def student(db):
+    """Create a student with a few behavior samples."""
+    student = User(email='export-student@example.com', password_hash='x', role='student')
+    db.session.add(student)
+    db.session.commit()
+    base = datetime(2024, 3, 1, 9, 0, 0)
+    db.session.add_all([
+        EmotionLog(student_id=student.id, timestamp=base + timedelta(minutes=i), focus_score=0.5, frustration_score=0.1)
+        for i in range(5)
+    ])
+    db.session.commit()
+    yield student
+    EmotionLog.query.filter_by(student_id=student.id).delete()
+    db.session.delete(student)
+    db.session.commit()
+
+def test_quiz_window_lookup():
+    """Test that samples are matched to the submission window they fall in."""
+    base = datetime(2024, 3, 1, 9, 0, 0)
+    index = QuizWindowIndex([
+        (10, 1, 7, base, base + timedelta(minutes=20)),
+        (11, 2, 7, base + timedelta(hours=1), None),
+    ])
+    assert index.lookup(7, base + timedelta(minutes=5)) == (10, 1)
+    assert index.lookup(7, base + timedelta(minutes=30)) == (None, None)
+    assert index.lookup(7, base - timedelta(minutes=1)) == (None, None)
+    assert index.lookup(8, base + timedelta(minutes=5)) == (None, None)
+
+def test_export_chunks_are_bounded(app, db, student):
+    """Test that the export yields typed record batches no larger than the chunk size."""
+    pytest.importorskip('pyarrow')
+    batches = list(iter_chunks(student_id=student.id, chunk_size=2))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert str(batches[0].schema.field('focus_score').type) == 'float'
+    ids = [value for batch in batches for value in batch.column('id').to_pylist()]
+    assert ids == sorted(ids)
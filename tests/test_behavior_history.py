@@ -0,0 +1,74 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from models import User, EmotionLog
+from services.behavior_history import encode_cursor, decode_cursor, parse_date, page_size, stream_page
+from services.emotion_log_partitions import emotion_log_partitions
+
+
+class Row:
+    def __init__(self, log_id, timestamp):
+        self.id = log_id
+        self.timestamp = timestamp
+        self.focus_score = 0.5
+        self.frustration_score = 0.2
+        self.source_details = {'keypresses': 1.0}
+
+
+@pytest.fixture
+def student_with_logs(db):
+    """Create a student with logs, two of which share a timestamp."""
+    student = User(email='history-student@example.com', password_hash='x', role='student')
+    db.session.add(student)
+    db.session.commit()
+    base = datetime(2024, 3, 1, 12, 0, 0)
+    timestamps = [base, base + timedelta(minutes=1), base + timedelta(minutes=1), base + timedelta(minutes=2)]
+    db.session.add_all([
+        EmotionLog(student_id=student.id, timestamp=ts, focus_score=0.5, frustration_score=0.1) for ts in timestamps
+    ])
+    db.session.commit()
+    yield student
+    EmotionLog.query.filter_by(student_id=student.id).delete()
+    db.session.delete(student)
+    db.session.commit()
+
+def test_cursor_round_trip():
+    """Test that cursors decode to the (timestamp, id) they were made from."""
+    ts = datetime(2024, 3, 1, 12, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+    assert decode_cursor(None) is None
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+def test_query_argument_parsing():
+    """Test date filters and page size bounds."""
+    assert parse_date('2024-03-01') == datetime(2024, 3, 1)
+    assert parse_date('2024-03-01', end_of_day=True) == datetime(2024, 3, 1, 23, 59, 59, 999999)
+    assert page_size(None) == 50
+    assert page_size('10000') == 500
+    assert page_size('junk') == 50
+
+def test_stream_page_sets_cursor_only_when_more_rows():
+    """Test that the extra lookahead row produces a cursor and is not returned."""
+    base = datetime(2024, 3, 1)
+    rows = [Row(i, base - timedelta(seconds=i)) for i in range(3)]
+    page = json.loads(''.join(stream_page(rows, 2)))
+    assert [item['id'] for item in page['items']] == [0, 1]
+    assert decode_cursor(page['next_cursor']) == (rows[1].timestamp, 1)
+    last_page = json.loads(''.join(stream_page(rows[2:], 2)))
+    assert last_page['next_cursor'] is None and len(last_page['items']) == 1
+
+def test_keyset_pages_cover_ties_without_gaps(app, db, student_with_logs):
+    """Test that paging on (timestamp, id) returns every row once, even with equal timestamps."""
+    seen = []
+    cursor = None
+    while True:
+        page = emotion_log_partitions.fetch_range(
+            student_id=student_with_logs.id, descending=True, limit=2, after=cursor
+        )
+        if not page:
+            break
+        seen.extend(log.id for log in page)
+        cursor = (page[-1].timestamp, page[-1].id)
+    assert len(seen) == 4 and len(set(seen)) == 4
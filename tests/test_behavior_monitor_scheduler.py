@@ -0,0 +1,50 @@
+import pytest
+import student_behavior_monitor
+from student_behavior_monitor import BehaviorMonitorScheduler
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """A scheduler whose ticks are driven by the test and whose writes are captured."""
+    batches = []
+    monkeypatch.setattr(student_behavior_monitor.emotion_log_writer, 'write_batch',
+                        lambda logs, updates: batches.append((logs, updates)))
+    monkeypatch.setattr(student_behavior_monitor.emotion_log_writer, 'update_enrollment',
+                        lambda *args, **kwargs: None)
+    scheduler = BehaviorMonitorScheduler(wheel_size=8)
+    monkeypatch.setattr(scheduler, '_ensure_started', lambda: None)
+    scheduler.batches = batches
+    return scheduler
+
+def test_sessions_are_keyed_by_student_and_course(scheduler):
+    """Test that one student can be monitored in two courses without overwriting."""
+    scheduler.start_session(1, 10)
+    scheduler.start_session(1, 20)
+    scheduler.start_session(1, 10)
+    assert scheduler.active_session_count() == 2
+    assert scheduler.is_monitoring(1, 20)
+
+def test_one_write_per_tick_for_all_sessions(scheduler):
+    """Test that every due session is sampled and written in a single batch."""
+    for student_id in range(5):
+        scheduler.start_session(student_id, 99)
+    assert scheduler.tick() == 5
+    assert len(scheduler.batches) == 1
+    logs, updates = scheduler.batches[0]
+    assert len(logs) == 5
+    assert all(0.0 <= log['focus_score'] <= 1.0 for log in logs)
+    assert set(updates) == {(student_id, 99) for student_id in range(5)}
+
+def test_stopped_sessions_are_not_sampled(scheduler):
+    """Test that stopping a student removes all of their sessions from the wheel."""
+    scheduler.start_session(1, 10)
+    scheduler.start_session(2, 10)
+    scheduler.stop_session(1)
+    assert scheduler.tick() == 1
+    assert not scheduler.is_monitoring(1)
+
+def test_sessions_expire_after_duration(scheduler):
+    """Test that sessions end on their own once the duration has passed."""
+    scheduler.duration = 0
+    scheduler.start_session(1, None)
+    assert scheduler.tick() == 0
+    assert scheduler.active_session_count() == 0
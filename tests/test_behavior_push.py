@@ -0,0 +1,84 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from services import behavior_push as behavior_push_module
+from services.behavior_push import BehaviorPushNotifier, behavior_payload
+from services.behavior_window_cache import BehaviorWindowCache
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, to=None):
+        self.emitted.append((event, data, to))
+
+    def start_background_task(self, target):
+        return object()
+
+
+def make_notifier(monkeypatch, **kwargs):
+    cache = BehaviorWindowCache(loader=lambda student_id, since: [])
+    monkeypatch.setattr(behavior_push_module, 'behavior_window_cache', cache)
+    notifier = BehaviorPushNotifier(**kwargs)
+    notifier.socketio = FakeSocketIO()
+    cache.add_listener(notifier.mark_dirty)
+    return cache, notifier
+
+def test_samples_coalesce_into_one_push(monkeypatch):
+    """Test that several samples in one interval produce a single push to the student's room."""
+    cache, notifier = make_notifier(monkeypatch)
+    now = datetime.utcnow()
+    for i in range(5):
+        cache.record(3, now - timedelta(seconds=5 - i), 0.5 + i * 0.05, 0.2)
+    assert notifier.flush() == 1
+    event, payload, room = notifier.socketio.emitted[0]
+    assert event == 'behavior_update'
+    assert room == 'student_3'
+    assert payload['latest_focus'] == 70.0
+    assert payload['recent_logs_count'] == 5
+
+def test_small_changes_are_suppressed(monkeypatch):
+    """Test that updates below the threshold are not pushed until a value moves enough."""
+    cache, notifier = make_notifier(monkeypatch, threshold=5.0)
+    now = datetime.utcnow()
+    cache.record(3, now - timedelta(seconds=2), 0.50, 0.20)
+    assert notifier.flush() == 1
+    cache.record(3, now - timedelta(seconds=1), 0.51, 0.20)
+    assert notifier.flush() == 0
+    cache.record(3, now, 0.90, 0.20)
+    assert notifier.flush() == 1
+    assert notifier.stats()['suppressed'] == 1
+
+def test_payload_is_none_without_recent_samples():
+    """Test that there is nothing to push for a student with no recent samples."""
+    cache = BehaviorWindowCache(loader=lambda student_id, since: [])
+    assert behavior_payload(cache.snapshot(9)) is None
+
+def test_samples_recorded_off_the_event_loop_are_pushed(monkeypatch):
+    """Test that a student marked dirty from a plain OS thread still gets a push."""
+    class ThreadedSocketIO(FakeSocketIO):
+        def start_background_task(self, target):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            return thread
+
+        def sleep(self, seconds):
+            time.sleep(seconds)
+
+    cache = BehaviorWindowCache(loader=lambda student_id, since: [])
+    monkeypatch.setattr(behavior_push_module, 'behavior_window_cache', cache)
+    notifier = BehaviorPushNotifier(interval_ms=10)
+    socketio = ThreadedSocketIO()
+    notifier.init_app(Flask(__name__), socketio)
+
+    recorder = threading.Thread(target=cache.record, args=(4, datetime.utcnow(), 0.6, 0.1))
+    recorder.start()
+    recorder.join()
+    deadline = time.time() + 5
+    while not socketio.emitted and time.time() < deadline:
+        time.sleep(0.01)
+    assert [room for _, _, room in socketio.emitted] == ['student_4']
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from services.behavior_scoring import BehaviorScorer, features_from_sources, FEATURE_COLUMNS
+from student_behavior_monitor import StudentBehaviorMonitor
+
+def test_batch_scores_match_scalar_aggregation():
+    """Test that the vectorized path agrees with aggregate_focus/frustration_score."""
+    monitor = StudentBehaviorMonitor()
+    sources = [monitor.collect_sources() for _ in range(50)]
+    focus, frustration = BehaviorScorer().score_sources(sources)
+    for i, source in enumerate(sources):
+        args = (source['face'], source['voice'], source['keyboard'], source['mouse'])
+        assert focus[i] == pytest.approx(monitor.aggregate_focus_score(*args))
+        assert frustration[i] == pytest.approx(monitor.aggregate_frustration_score(*args))
+
+def test_scores_are_clipped():
+    """Test that extreme inputs stay within [0, 1]."""
+    features = np.full((3, len(FEATURE_COLUMNS)), 10.0)
+    focus, frustration = BehaviorScorer().score(features)
+    assert np.all(focus == 1.0) and np.all(frustration == 1.0)
+
+def test_custom_weight_matrix():
+    """Test that weights can be replaced by a configured matrix."""
+    weights = np.zeros((2, len(FEATURE_COLUMNS)))
+    weights[0, FEATURE_COLUMNS.index('keyboard_activity')] = 1.0
+    scorer = BehaviorScorer(weights)
+    focus, frustration = scorer.score_sources([{'keyboard': {'activity': 0.4}}])
+    assert focus[0] == pytest.approx(0.4)
+    assert frustration[0] == 0.0
+
+def test_weight_shape_is_validated():
+    """Test that a malformed weight matrix is rejected."""
+    with pytest.raises(ValueError):
+        BehaviorScorer([[1.0, 2.0]])
+
+def test_missing_sources_default_to_zero():
+    """Test that partial samples produce zero features rather than errors."""
+    assert np.all(features_from_sources([{}]) == 0.0)
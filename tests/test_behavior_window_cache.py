@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from services.behavior_window_cache import BehaviorWindowCache
+
+NOW = datetime(2024, 3, 1, 12, 0, 0)
+
+def seconds_ago(seconds):
+    return NOW - timedelta(seconds=seconds)
+
+def test_window_averages_and_expiry():
+    """Test that 1- and 5-minute averages only include samples inside each window."""
+    cache = BehaviorWindowCache(loader=lambda student_id, since: [])
+    cache.record(1, seconds_ago(400), 0.0, 1.0)  # Outside both windows
+    cache.record(1, seconds_ago(200), 0.2, 0.6)
+    cache.record(1, seconds_ago(30), 0.6, 0.2)
+    cache.record(1, seconds_ago(10), 0.8, 0.0)
+    window = cache.snapshot(1, NOW)
+    assert window['count_5m'] == 3
+    assert window['count_1m'] == 2
+    assert abs(window['avg_focus_5m'] - (0.2 + 0.6 + 0.8) / 3) < 1e-9
+    assert abs(window['avg_focus_1m'] - 0.7) < 1e-9
+    assert window['latest_focus'] == 0.8
+    assert window['last_updated'] == seconds_ago(10)
+
+def test_trend_compares_newer_and_older_halves():
+    """Test the improving/declining trend over the five-minute window."""
+    cache = BehaviorWindowCache(loader=lambda student_id, since: [])
+    for i, focus in enumerate([0.2, 0.2, 0.8, 0.8]):
+        cache.record(1, seconds_ago(240 - i * 60), focus, 0.1)
+    assert cache.snapshot(1, NOW)['trend'] == 'improving'
+    for i, focus in enumerate([0.9, 0.9, 0.3, 0.3]):
+        cache.record(2, seconds_ago(240 - i * 60), focus, 0.1)
+    assert cache.snapshot(2, NOW)['trend'] == 'declining'
+
+def test_cold_start_loads_from_database_once():
+    """Test that an unknown student is warmed through the loader and merged with local samples."""
+    calls = []
+
+    def loader(student_id, since):
+        calls.append(student_id)
+        return [(seconds_ago(120), 0.4, 0.4), (seconds_ago(20), 0.6, 0.2)]
+
+    cache = BehaviorWindowCache(loader=loader)
+    cache.record(7, seconds_ago(20), 0.6, 0.2)  # Same sample the loader returns once flushed
+    window = cache.snapshot(7, NOW)
+    assert window['count_5m'] == 2
+    cache.snapshot(7, NOW)
+    assert calls == [7]
+
+def test_students_are_bounded():
+    """Test that the least recently used students are evicted."""
+    cache = BehaviorWindowCache(max_students=2, loader=lambda student_id, since: [])
+    for student_id in (1, 2, 3):
+        cache.record(student_id, NOW, 0.5, 0.5)
+    assert len(cache) == 2
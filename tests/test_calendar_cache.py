@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from services.calendar_cache import CalendarCache, to_ical
+
+
+def _items(title='Quiz: Midterm'):
+    return [{'id': 1, 'title': title, 'description': 'Chapters 1, 2', 'date': datetime(2024, 3, 1, 9, 0),
+             'type': 'quiz', 'course_name': 'Physics', 'color': 'info', 'end_time': datetime(2024, 3, 1, 10, 0)}]
+
+def test_cache_reuses_entry_until_course_changes():
+    """Test that a course write rebuilds only calendars that include the course."""
+    cache = CalendarCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return _items()
+
+    first = cache.get(1, [10, 11], build)
+    assert cache.get(1, [11, 10], build) is first
+    cache.invalidate_course(99)
+    assert cache.get(1, [10, 11], build) is first
+    cache.invalidate_course(10)
+    rebuilt = cache.get(1, [10, 11], build)
+    assert rebuilt is not first and len(builds) == 2
+    assert rebuilt.etag == first.etag  # Same items, same ETag
+
+def test_events_and_enrollment_invalidate():
+    """Test that event writes and enrollment changes force a rebuild."""
+    cache = CalendarCache()
+    first = cache.get(1, [10], _items)
+    cache.invalidate_events()
+    second = cache.get(1, [10], _items)
+    assert second is not first
+    cache.invalidate_user(1)
+    assert cache.get(1, [10], lambda: _items('Quiz: Final')).etag != second.etag
+
+def test_ical_feed_escapes_text():
+    """Test that the iCal feed has one escaped VEVENT per item."""
+    feed = to_ical(_items(), now=datetime(2024, 2, 1))
+    assert feed.startswith('BEGIN:VCALENDAR\r\n')
+    assert 'UID:quiz-1@lms' in feed
+    assert 'DTSTART:20240301T090000Z' in feed
+    assert 'DESCRIPTION:Chapters 1\\, 2' in feed
+    assert feed.count('BEGIN:VEVENT') == 1
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+import pytest
+from models import User, Course, Assignment, Meeting
+from services.calendar_service import merge_items, upcoming_items, calendar_items
+
+
+@pytest.fixture
+def course(db):
+    """Create a course with past and future assignments and a meeting."""
+    instructor = User(email='calendar-instructor@example.com', password_hash='x', role='instructor')
+    db.session.add(instructor)
+    db.session.commit()
+    course = Course(title='Calendar Course', instructor_id=instructor.id)
+    db.session.add(course)
+    db.session.commit()
+    now = datetime.utcnow()
+    db.session.add_all([
+        Assignment(course_id=course.id, title='Past', due_date=now - timedelta(days=2)),
+        Assignment(course_id=course.id, title='Soon', due_date=now + timedelta(days=1)),
+        Assignment(course_id=course.id, title='Later', due_date=now + timedelta(days=9)),
+        Meeting(course_id=course.id, title='Office hours', scheduled_time=now + timedelta(days=3)),
+    ])
+    db.session.commit()
+    yield course
+    Assignment.query.filter_by(course_id=course.id).delete()
+    Meeting.query.filter_by(course_id=course.id).delete()
+    db.session.delete(course)
+    db.session.delete(instructor)
+    db.session.commit()
+
+def test_merge_items_keeps_date_order_and_limit():
+    """Test that sorted streams are merged by date and cut at the limit."""
+    base = datetime(2024, 3, 1)
+    first = [{'date': base, 'type': 'a'}, {'date': base + timedelta(days=2), 'type': 'a'}]
+    second = [{'date': base, 'type': 'b'}, {'date': base + timedelta(days=1), 'type': 'b'}]
+    merged = merge_items([iter(first), iter(second)], limit=3)
+    assert [(item['date'].day, item['type']) for item in merged] == [(1, 'a'), (1, 'b'), (2, 'b')]
+
+def test_upcoming_items_skip_past_and_join_course(app, db, course):
+    """Test that only future items are returned, in date order, with course titles."""
+    items = upcoming_items([course.id], limit=2, event_user_id=-1)
+    assert [item['title'] for item in items] == ['Assignment: Soon', 'Office hours']
+    assert all(item['course_name'] == 'Calendar Course' for item in items)
+    everything = calendar_items([course.id], include_events=False)
+    assert [item['title'] for item in everything][0] == 'Assignment: Past'
@@ -0,0 +1,38 @@
+from services.capture_service import negotiate_capture, CaptureRateController
+
+def test_defaults_without_hello():
+    """Test that a legacy client gets base64 JPEG at the normal rate."""
+    config = negotiate_capture(None)
+    assert config['binary'] is False
+    assert config['format'] == 'jpeg'
+    assert (config['width'], config['height']) == (320, 240)
+    assert config['interval_ms'] == 2000
+
+def test_prefers_webp_when_client_supports_it():
+    """Test that WebP is chosen when the browser can encode it."""
+    config = negotiate_capture({'binary': True, 'formats': ['webp', 'jpeg']})
+    assert config['binary'] is True
+    assert config['format'] == 'webp'
+
+def test_smaller_and_slower_frames_under_load():
+    """Test that the server asks for fewer, smaller frames when the pool is busy."""
+    idle = negotiate_capture({}, load=0.0)
+    busy = negotiate_capture({}, load=0.95)
+    assert busy['width'] < idle['width']
+    assert busy['interval_ms'] > idle['interval_ms']
+
+def test_stable_focused_student_captures_less_often():
+    """Test that steady high focus stretches the suggested interval."""
+    controller = CaptureRateController()
+    for _ in range(10):
+        controller.record(1, 0.9)
+    assert controller.suggest(1)['interval_ms'] > controller.suggest(2)['interval_ms']
+    # Activity counts are scored per report, so their interval must not stretch
+    assert controller.suggest(1)['activity_interval_ms'] == controller.suggest(2)['activity_interval_ms']
+
+def test_changing_student_keeps_base_interval():
+    """Test that fluctuating scores keep the student at the base rate."""
+    controller = CaptureRateController()
+    for score in [0.1, 0.9] * 5:
+        controller.record(1, score)
+    assert controller.stability_factor(1) == 1
@@ -0,0 +1,74 @@
+import importlib.util
+import math
+import os
+
+import pytest
+
+from services.emotion_encoding import (
+    SCHEMA_ACTIVITY, SCHEMA_DEEPFACE, SCHEMA_MONITOR, HEADER, SCHEMAS,
+    encode_monitor, encode_deepface, encode_activity, decode, read_header,
+    parse_legacy_summary, encode_legacy_summary,
+)
+
+MONITOR_SOURCES = {
+    'face': {
+        'emotions': {'happy': 0.4, 'sad': 0.1, 'angry': 0.05, 'surprised': 0.05, 'disgusted': 0.0, 'neutral': 0.4},
+        'attention': 0.75
+    },
+    'voice': {'tone': 0.3, 'volume': 0.5},
+    'keyboard': {'activity': 0.6, 'typing_speed': 0.5},
+    'mouse': {'movement': 0.4, 'clicks': 3}
+}
+
+def test_monitor_round_trip():
+    """Test that monitor samples decode back to the same nested values."""
+    blob = encode_monitor(MONITOR_SOURCES)
+    decoded = decode(blob)
+    assert decoded['face']['attention'] == MONITOR_SOURCES['face']['attention']
+    assert decoded['mouse']['clicks'] == 3
+    assert math.isclose(decoded['face']['emotions']['sad'], 0.1, rel_tol=1e-6)
+    assert 'error_rate' not in decoded['keyboard']
+
+def test_blob_is_compact():
+    """Test that the blob is a 4-byte header plus 4 bytes per field."""
+    blob = encode_monitor(MONITOR_SOURCES)
+    assert len(blob) == HEADER.size + 4 * len(SCHEMAS[SCHEMA_MONITOR])
+    assert len(blob) < len(str(MONITOR_SOURCES))
+    assert read_header(blob) == (1, SCHEMA_MONITOR, len(SCHEMAS[SCHEMA_MONITOR]))
+
+def test_deepface_and_activity_schemas():
+    """Test the frame analysis schemas, including missing fields."""
+    deepface = decode(encode_deepface({'angry': 12.5, 'happy': 60.0, 'neutral': 27.5}))
+    assert deepface == {'angry': 12.5, 'happy': 60.0, 'neutral': 27.5}
+    activity = decode(encode_activity({'keypresses': 4, 'mousemoves': 10}))
+    assert activity == {'keypresses': 4.0, 'mousemoves': 10.0}
+    assert read_header(encode_activity({}))[1] == SCHEMA_ACTIVITY
+
+def test_legacy_summary_conversion():
+    """Test that old str(dict) summaries are re-encoded and free text is left alone."""
+    blob = encode_legacy_summary(str({'angry': 1.0, 'sad': 2.0}))
+    assert read_header(blob)[1] == SCHEMA_DEEPFACE
+    assert decode(blob) == {'angry': 1.0, 'sad': 2.0}
+    assert encode_legacy_summary('DeepFace not available - activity only') is None
+    assert parse_legacy_summary("{'a': __import__('os')}") is None
+    assert decode(None) is None
+
+def test_legacy_summary_with_numpy_scalars():
+    """Test that summaries holding NumPy scalar reprs from the old writer still parse."""
+    summary = "{'angry': np.float64(12.5), 'happy': numpy.float32(3.0), 'sad': 1}"
+    assert parse_legacy_summary(summary) == {'angry': 12.5, 'happy': 3.0, 'sad': 1}
+    assert decode(encode_legacy_summary(summary)) == {'angry': 12.5, 'happy': 3.0, 'sad': 1.0}
+
+def test_source_data_migration_uses_frozen_encoder():
+    """Test that the migration's frozen copy of format version 1 matches the live encoder and counts bad rows."""
+    path = os.path.join(os.path.dirname(__file__), '..', 'migrations', 'versions',
+                        '5b1e7c2d9a40_add_emotion_log_source_data.py')
+    spec = importlib.util.spec_from_file_location('source_data_migration', path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    summary = "{'angry': np.float64(12.5), 'sad': 2.0}"
+    assert migration._encode_legacy(summary) == encode_legacy_summary(summary)
+    assert migration._decode(migration._encode_legacy(summary)) == decode(encode_legacy_summary(summary))
+    assert migration._encode_legacy('DeepFace not available - activity only') is None
+    with pytest.raises(ValueError):
+        migration._encode_legacy("{'angry': float('nan')}")
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from services.emotion_log_partitions import EmotionLogPartitions, partition_name, shift_months, month_start
+
+def test_partition_names_and_month_math():
+    """Test month naming and shifting across year boundaries."""
+    assert partition_name(datetime(2024, 3, 15, 12, 30)) == 'emotion_log_202403'
+    assert month_start(datetime(2024, 3, 15, 12, 30)) == datetime(2024, 3, 1)
+    assert shift_months(datetime(2024, 1, 1), -1) == datetime(2023, 12, 1)
+    assert shift_months(datetime(2023, 12, 1), 1) == datetime(2024, 1, 1)
+
+def test_hot_cutoff_keeps_recent_months():
+    """Test that the main table keeps the current month plus hot_months - 1 before it."""
+    now = datetime(2024, 3, 20)
+    assert EmotionLogPartitions(hot_months=1).hot_cutoff(now) == datetime(2024, 3, 1)
+    assert EmotionLogPartitions(hot_months=3).hot_cutoff(now) == datetime(2024, 1, 1)
+
+def test_range_reads_only_overlapping_partitions():
+    """Test that a range query only touches the partitions it overlaps."""
+    partitions = EmotionLogPartitions()
+    partitions._existing = ['emotion_log_202401', 'emotion_log_202402', 'emotion_log_202403']
+    assert partitions._partitions_for(datetime(2024, 2, 10), datetime(2024, 3, 5)) == \
+        ['emotion_log_202402', 'emotion_log_202403']
+    assert partitions._partitions_for(None, datetime(2024, 1, 31)) == ['emotion_log_202401']
+    assert partitions._partitions_for(datetime(2999, 1, 1), None) == []
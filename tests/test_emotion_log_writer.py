@@ -0,0 +1,83 @@
+import pytest
+from models import User, Course, Enrollment, EmotionLog
+from services.emotion_log_writer import EmotionLogWriter
+
+
+@pytest.fixture
+def enrolled_student(db):
+    """Create a student enrolled in one course."""
+    student = User(email='writer-student@example.com', password_hash='x', role='student')
+    course = Course(title='Writer Course')
+    db.session.add_all([student, course])
+    db.session.commit()
+    enrollment = Enrollment(student_id=student.id, course_id=course.id)
+    db.session.add(enrollment)
+    db.session.commit()
+    yield student, course, enrollment
+    EmotionLog.query.filter_by(student_id=student.id).delete()
+    db.session.delete(enrollment)
+    db.session.delete(course)
+    db.session.delete(student)
+    db.session.commit()
+
+def test_rows_are_buffered_until_flush(app, db, enrolled_student):
+    """Test that enqueued rows are only written when the buffer is flushed."""
+    student, course, _ = enrolled_student
+    writer = EmotionLogWriter(app)
+
+    writer.enqueue(student.id, 0.8, 0.1, course_id=course.id)
+    writer.enqueue(student.id, 0.6, 0.2, course_id=course.id)
+    assert writer.queue_depth() == 2
+    assert EmotionLog.query.filter_by(student_id=student.id).count() == 0
+
+    assert writer.flush() == 2
+    assert writer.queue_depth() == 0
+    assert EmotionLog.query.filter_by(student_id=student.id).count() == 2
+    assert writer.stats()['flushes'] == 1
+
+def test_resolve_course_uses_first_enrollment(app, db, enrolled_student):
+    """Test that rows without a course are attached to the student's enrollment."""
+    student, course, enrollment = enrolled_student
+    writer = EmotionLogWriter(app)
+
+    writer.enqueue(student.id, 0.5, 0.0, resolve_course=True)
+    writer.update_enrollment(student.id, latest_focus_score=0.2)
+    writer.update_enrollment(student.id, latest_focus_score=0.5)
+    writer.flush()
+
+    log = EmotionLog.query.filter_by(student_id=student.id).one()
+    assert log.course_id == course.id
+    assert Enrollment.query.get(enrollment.id).latest_focus_score == 0.5
+
+def test_rows_without_enrollment_are_dropped(app, db):
+    """Test that unresolvable rows are dropped rather than written without a course."""
+    writer = EmotionLogWriter(app)
+    writer.enqueue(987654, 0.5, 0.0, resolve_course=True)
+    assert writer.flush() == 0
+    assert writer.stats()['rows_dropped'] == 1
+
+def test_failed_flush_is_retried_then_dropped(monkeypatch):
+    """Test that a batch whose commit fails is re-queued a bounded number of times."""
+    writer = EmotionLogWriter(flush_interval_ms=10 ** 7, max_attempts=2)
+    calls = []
+
+    def locked(logs, updates):
+        calls.append([row['focus_score'] for row in logs])
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(writer, '_commit', locked)
+    writer.enqueue(1, 0.5, 0.1, course_id=3)
+    writer.update_enrollment(1, 3, latest_focus_score=0.5)
+    writer.flush()
+    assert writer.queue_depth() == 2
+    writer.enqueue(1, 0.7, 0.1, course_id=3)
+    writer.flush()
+    assert calls == [[0.5], [0.5, 0.7]]
+    # The first row used up its attempts; the newer one is still queued
+    assert writer.queue_depth() == 1
+    stats = writer.stats()
+    assert stats['rows_dropped'] == 1 and stats['flush_errors'] == 2
+
+    monkeypatch.setattr(writer, '_commit', lambda logs, updates: (len(logs), len(updates)))
+    assert writer.flush() == 1
+    assert writer.queue_depth() == 0
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+from models import User, EmotionLog, EmotionLogRollup
+from services.emotion_retention import EmotionLogRetention
+from services.emotion_rollups import rollup_pending
+
+
+@pytest.fixture
+def student(db):
+    """Create a student with no behavior history."""
+    student = User(email='retention-student@example.com', password_hash='x', role='student')
+    db.session.add(student)
+    db.session.commit()
+    # SQLite reuses ids, so drop rollups other tests left behind for this one
+    EmotionLogRollup.query.filter_by(student_id=student.id).delete()
+    db.session.commit()
+    yield student
+    EmotionLogRollup.query.filter_by(student_id=student.id).delete()
+    EmotionLog.query.filter_by(student_id=student.id).delete()
+    db.session.delete(student)
+    db.session.commit()
+
+def test_expired_rows_are_folded_then_deleted(app, db, student):
+    """Test that expired raw rows end up in the rollups and are removed in batches."""
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    old = [EmotionLog(student_id=student.id, timestamp=now - timedelta(days=40, minutes=i),
+                      focus_score=0.5, frustration_score=0.2) for i in range(5)]
+    recent = EmotionLog(student_id=student.id, timestamp=now - timedelta(days=1), focus_score=0.9, frustration_score=0.1)
+    db.session.add_all(old + [recent])
+    db.session.commit()
+
+    retention = EmotionLogRetention(ttl_days=30, batch_size=2, pause_ms=0)
+    assert retention.run(now=now, dry_run=True)['expired'] >= 5
+
+    report = retention.run(now=now)
+    assert report['deleted'] >= 5
+    assert report['batches'] >= 3
+    remaining = EmotionLog.query.filter_by(student_id=student.id).all()
+    assert [log.id for log in remaining] == [recent.id]
+    assert remaining[0].rolled_up is False
+    day = EmotionLogRollup.query.filter_by(student_id=student.id, resolution='day').all()
+    assert sum(rollup.sample_count for rollup in day) == 5
+
+def test_rollups_are_pruned_per_resolution(app, db, student):
+    """Test that minute rollups past their window go while hour and day rollups stay."""
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    db.session.add_all([
+        EmotionLog(student_id=student.id, timestamp=now - timedelta(days=10), focus_score=0.4, frustration_score=0.2),
+        EmotionLog(student_id=student.id, timestamp=now - timedelta(days=1), focus_score=0.8, frustration_score=0.1),
+    ])
+    db.session.commit()
+    rollup_pending()
+
+    retention = EmotionLogRetention(ttl_days=30, batch_size=1, pause_ms=0,
+                                    rollup_ttl_days={'minute': 7, 'hour': None, 'day': None})
+    assert retention.run(now=now, dry_run=True)['expired_rollups'] >= 1
+    assert retention.run(now=now)['rollups_pruned'] >= 1
+    assert retention.run(now=now, dry_run=True)['expired_rollups'] == 0
+    minutes = EmotionLogRollup.query.filter_by(student_id=student.id, resolution='minute').all()
+    assert [rollup.bucket_start for rollup in minutes] == [now - timedelta(days=1)]
+    for resolution in ('hour', 'day'):
+        rollups = EmotionLogRollup.query.filter_by(student_id=student.id, resolution=resolution).all()
+        assert sum(rollup.sample_count for rollup in rollups) == 2
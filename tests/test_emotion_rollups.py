@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+from models import User, EmotionLog, EmotionLogRollup
+from services.emotion_rollups import aggregate_rows, apply_rollups, rollup_pending, resolution_for_range, fetch_history, rollup_horizon
+
+
+@pytest.fixture
+def student(db):
+    """Create a student with no behavior history."""
+    student = User(email='rollup-student@example.com', password_hash='x', role='student')
+    db.session.add(student)
+    db.session.commit()
+    yield student
+    EmotionLogRollup.query.filter_by(student_id=student.id).delete()
+    EmotionLog.query.filter_by(student_id=student.id).delete()
+    db.session.delete(student)
+    db.session.commit()
+
+def test_aggregate_rows_min_mean_max():
+    """Test that samples fold into minute, hour and day buckets."""
+    base = datetime(2024, 3, 1, 10, 15, 0)
+    rows = [
+        {'student_id': 1, 'timestamp': base, 'focus_score': 0.2, 'frustration_score': 0.5},
+        {'student_id': 1, 'timestamp': base + timedelta(seconds=30), 'focus_score': 0.6, 'frustration_score': 0.1},
+        {'student_id': 1, 'timestamp': base + timedelta(minutes=5), 'focus_score': 1.0, 'frustration_score': 0.0},
+    ]
+    buckets = aggregate_rows(rows)
+    minute = buckets[(1, 'minute', base)]
+    assert minute['sample_count'] == 2
+    assert minute['focus_min'] == 0.2 and minute['focus_max'] == 0.6
+    hour = buckets[(1, 'hour', base.replace(minute=0))]
+    assert hour['sample_count'] == 3
+    assert abs(hour['focus_sum'] / hour['sample_count'] - 0.6) < 1e-9
+    assert buckets[(1, 'day', base.replace(hour=0, minute=0))]['frustration_max'] == 0.5
+
+def test_resolution_follows_range():
+    """Test that longer ranges use coarser rollups."""
+    end = datetime(2024, 3, 1)
+    assert resolution_for_range(end - timedelta(minutes=10), end) == 'raw'
+    assert resolution_for_range(end - timedelta(hours=2), end) == 'minute'
+    assert resolution_for_range(end - timedelta(days=7), end) == 'hour'
+    assert resolution_for_range(end - timedelta(days=90), end) == 'day'
+    assert resolution_for_range(None, end) == 'day'
+
+def test_rollup_horizon_per_resolution():
+    """Test that each pruned resolution's horizon is aligned to its bucket and day rollups are kept."""
+    now = datetime(2024, 3, 10, 12, 34, 56)
+    assert rollup_horizon('minute', now) == datetime(2024, 3, 3, 12, 34)
+    assert rollup_horizon('hour', now, {'hour': 2}) == datetime(2024, 3, 8, 12)
+    assert rollup_horizon('day', now) is None
+
+def test_incremental_rollups_merge(app, db, student):
+    """Test that two batches for the same bucket are merged, not duplicated."""
+    ts = datetime(2024, 3, 1, 9, 0, 10)
+    apply_rollups([{'student_id': student.id, 'timestamp': ts, 'focus_score': 0.4, 'frustration_score': 0.3}])
+    db.session.commit()
+    apply_rollups([{'student_id': student.id, 'timestamp': ts, 'focus_score': 0.8, 'frustration_score': 0.1}])
+    db.session.commit()
+    rollup = EmotionLogRollup.query.filter_by(student_id=student.id, resolution='minute').one()
+    assert rollup.sample_count == 2
+    assert abs(rollup.focus_mean - 0.6) < 1e-9
+    assert rollup.frustration_min == 0.1 and rollup.frustration_max == 0.3
+
+def test_pending_rows_are_folded_once(app, db, student):
+    """Test that rows written directly are rolled up and flagged."""
+    now = datetime.utcnow()
+    db.session.add_all([
+        EmotionLog(student_id=student.id, timestamp=now - timedelta(hours=i), focus_score=0.5, frustration_score=0.2)
+        for i in range(3)
+    ])
+    db.session.commit()
+    assert rollup_pending() >= 3
+    assert rollup_pending() == 0
+    resolution, points = fetch_history(student.id, start=now - timedelta(days=7), end=now)
+    assert resolution == 'hour'
+    assert sum(point.sample_count for point in points) == 3
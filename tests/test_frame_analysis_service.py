@@ -0,0 +1,124 @@
+import threading
+import time
+from services import frame_analysis_service
+from services.frame_analysis_service import FrameAnalysisExecutor, analyze_frame, analyze_frames
+
+def test_activity_only_analysis():
+    """Test that frames are scored from activity alone when DeepFace is disabled."""
+    result = analyze_frame({'video': '', 'activity': {'keypresses': 5, 'mousemoves': 5, 'mouseclicks': 0}, 'deepface': False})
+    assert result['focus_score'] == 0.5
+    assert result['frustration_score'] == 0.0
+
+def test_inline_executor_delivers_results():
+    """Test that results are handed to the result handler."""
+    results = []
+    executor = FrameAnalysisExecutor(mode='inline', result_handler=lambda sid, r: results.append((sid, r)))
+    assert executor.submit(1, {'video': '', 'activity': None, 'deepface': False}) == 'accepted'
+    assert results[0][0] == 1
+    assert executor.queue_depth() == 0
+
+def test_stale_frames_are_replaced_not_queued(monkeypatch):
+    """Test per-student backpressure: only the newest waiting frame is kept."""
+    release = threading.Event()
+    delivered = []
+
+    def slow_analysis(payloads):
+        release.wait(5)
+        return analyze_frames(payloads)
+
+    monkeypatch.setattr(frame_analysis_service, 'analyze_frames', slow_analysis)
+    executor = FrameAnalysisExecutor(mode='thread', max_workers=1,
+                                     result_handler=lambda sid, r: delivered.append(r['focus_score']))
+    frame = lambda n: {'video': '', 'activity': {'keypresses': n}, 'deepface': False}
+    assert executor.submit(7, frame(2)) == 'accepted'
+    assert executor.submit(7, frame(4)) == 'queued'
+    assert executor.submit(7, frame(8)) == 'replaced'
+    release.set()
+    deadline = time.time() + 5
+    while executor.queue_depth() and time.time() < deadline:
+        time.sleep(0.01)
+    executor.shutdown()
+    assert delivered == [0.1, 0.4]
+    assert executor.stats()['replaced'] == 1
+
+def test_frames_rejected_when_pool_is_saturated(monkeypatch):
+    """Test that new students are turned away once max_in_flight analyses are running."""
+    release = threading.Event()
+    monkeypatch.setattr(frame_analysis_service, 'analyze_frames', lambda payloads: release.wait(5) and [None] * len(payloads))
+    executor = FrameAnalysisExecutor(mode='thread', max_workers=1, max_in_flight=1)
+    assert executor.submit(1, {'video': '', 'deepface': False}) == 'accepted'
+    assert executor.submit(2, {'video': '', 'deepface': False}) == 'rejected'
+    release.set()
+    executor.shutdown()
+
+def test_frames_queued_behind_busy_workers_share_a_batch(monkeypatch):
+    """Test that frames waiting for a free worker are analyzed in one analyze_frames() call."""
+    release = threading.Event()
+    batch_sizes = []
+
+    def slow_analysis(payloads):
+        batch_sizes.append(len(payloads))
+        release.wait(5)
+        return analyze_frames(payloads)
+
+    monkeypatch.setattr(frame_analysis_service, 'analyze_frames', slow_analysis)
+    delivered = []
+    executor = FrameAnalysisExecutor(mode='thread', max_workers=1, max_in_flight=8,
+                                     result_handler=lambda sid, r: delivered.append(sid))
+    for student_id in range(1, 5):
+        assert executor.submit(student_id, {'video': '', 'activity': None, 'deepface': False}) == 'accepted'
+    release.set()
+    deadline = time.time() + 5
+    while executor.queue_depth() and time.time() < deadline:
+        time.sleep(0.01)
+    executor.shutdown()
+    assert batch_sizes == [1, 3]
+    assert sorted(delivered) == [1, 2, 3, 4]
+    assert executor.stats()['batches'] == 2
+
+def test_results_are_handled_on_the_socketio_loop():
+    """Test that with a Socket.IO server attached, results wait for the server's background task."""
+    class FakeSocketIO:
+        def __init__(self):
+            self.tasks = []
+
+        def start_background_task(self, target):
+            self.tasks.append(target)
+            return object()
+
+    delivered = []
+    executor = FrameAnalysisExecutor(mode='thread', max_workers=1,
+                                     result_handler=lambda sid, r: delivered.append(threading.current_thread()))
+    executor.socketio = FakeSocketIO()
+    assert executor.submit(1, {'video': '', 'activity': None, 'deepface': False}) == 'accepted'
+    assert executor.socketio.tasks == [executor._run]
+    executor.shutdown()
+    assert delivered == []
+    assert executor.queue_depth() == 1
+    assert executor.drain_results() == 1
+    assert delivered == [threading.current_thread()]
+    assert executor.queue_depth() == 0
+
+def test_corrupt_frame_does_not_lose_the_batch(monkeypatch):
+    """Test that one undecodable frame only empties its own slot."""
+    import sys
+    import types
+    import numpy as np
+
+    def fake_decode(video):
+        if video == 'corrupt':
+            raise ValueError('Incorrect padding')
+        return np.zeros((4, 4, 3), np.uint8)
+
+    class FakeEstimator:
+        def estimate(self, frames):
+            return [{'focused': True} for _ in frames]
+
+    deepface = types.SimpleNamespace(analyze=lambda img, **kwargs: {'region': {}, 'emotion': {'angry': 50}})
+    monkeypatch.setitem(sys.modules, 'deepface', types.SimpleNamespace(DeepFace=deepface))
+    monkeypatch.setattr(frame_analysis_service, 'decode_frame', fake_decode)
+    monkeypatch.setattr(frame_analysis_service, 'get_head_pose_estimator', lambda: FakeEstimator())
+    frame = lambda video: {'video': video, 'activity': None, 'deepface': True}
+    results = analyze_frames([frame('good'), frame('corrupt'), frame('good')])
+    assert results[1] is None
+    assert results[0]['frustration_score'] == results[2]['frustration_score'] == 0.5
@@ -0,0 +1,19 @@
+import numpy as np
+from services.head_pose_service import rotation_matrices_to_euler
+
+def test_identity_rotation_has_zero_angles():
+    """Test that an unrotated head gives zero pitch, yaw and roll."""
+    pitch, yaw, roll = rotation_matrices_to_euler(np.eye(3)[None, :, :])
+    assert np.allclose([pitch[0], yaw[0], roll[0]], 0.0)
+
+def test_batch_conversion_matches_single_yaw():
+    """Test that a batch of rotations is converted row by row."""
+    angle = np.radians(30)
+    yaw_matrix = np.array([
+        [np.cos(angle), 0, np.sin(angle)],
+        [0, 1, 0],
+        [-np.sin(angle), 0, np.cos(angle)]
+    ])
+    pitch, yaw, roll = rotation_matrices_to_euler(np.stack([np.eye(3), yaw_matrix]))
+    assert np.allclose(yaw, [0.0, 30.0])
+    assert np.allclose(pitch, 0.0)
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from services.quiz_analytics import QuizAnalytics, QuizAnalyticsCache, submission_stats
+
+
+def _analytics(quiz_id=1):
+    start = datetime(2025, 3, 1, 10, 0)
+    rows = [
+        (11, 50.0, start, start + timedelta(minutes=12), 3, 'a@example.com', 'Ann'),
+        (12, 90.0, start, start + timedelta(minutes=6), 4, 'b@example.com', None),
+    ]
+    behavior = {11: (0.42, 0.61)}
+    breakdown = {11: {'Easy': (2, 2), 'Hard': (2, 0)}, 12: {'Medium': (4, 3)}}
+    return QuizAnalytics(quiz_id, submission_stats(rows, behavior, breakdown))
+
+def test_stats_combine_behavior_and_breakdown():
+    """Test that per-submission stats merge the grouped query results."""
+    analytics = _analytics()
+    assert [stat['submission']['id'] for stat in analytics.stats] == [12, 11]
+    first = analytics.for_submission(11)
+    assert first['avg_focus_percent'] == 42.0 and first['avg_frustration_percent'] == 61.0
+    assert first['easy_correct_count'] == 2 and first['hard_questions_count'] == 2
+    assert first['total_questions'] == 4 and first['correct_answers_count'] == 2
+    assert first['time_taken_minutes'] == 12.0
+    assert analytics.for_submission(12)['avg_focus_percent'] == 0
+    assert (analytics.avg_score, analytics.highest_score, analytics.lowest_score) == (70.0, 90.0, 50.0)
+
+def test_cache_rebuilds_after_invalidate():
+    """Test that a new submission (invalidate) makes the next read rebuild."""
+    cache = QuizAnalyticsCache()
+    builds = []
+
+    def build(quiz_id):
+        builds.append(quiz_id)
+        return _analytics(quiz_id)
+
+    first = cache.get(1, build)
+    assert cache.get(1, build) is first
+    cache.invalidate(1)
+    assert cache.get(1, build) is not first
+    assert builds == [1, 1]
@@ -0,0 +1,84 @@
+import json
+from datetime import datetime
+
+from models import User, Course, Quiz, Question, QuizSubmission, QuizAnswer
+from services.quiz_plan import QuizPlan, PlannedQuestion, QuizPlanStore, item_ranks
+
+
+def _plan(answered=()):
+    questions = [
+        PlannedQuestion(1, 'Q1', 'Easy', ['3', '4'], 'B'),
+        PlannedQuestion(2, 'Q2', 'Hard', ['x', 'y'], 'A'),
+        PlannedQuestion(3, 'Q3', 'Medium', ['p', 'q'], None),
+        PlannedQuestion(4, 'Q4', 'Hard', ['m', 'n'], 'B'),
+    ]
+    return QuizPlan(10, 5, questions, answered)
+
+def test_take_serves_each_question_once():
+    """Test that difficulty pools drain and fall back without repeating questions."""
+    plan = _plan()
+    assert plan.next_in_order().id == 1
+    assert plan.take(('Hard', 'Medium', 'Easy')).id == 2
+    assert plan.take(('Hard', 'Medium', 'Easy')).id == 4
+    assert plan.take(('Hard', 'Medium', 'Easy')).id == 3
+    assert plan.take(('Easy',)) is None
+    assert plan.served == [1, 2, 4, 3]
+
+def test_rebuilt_plan_skips_answered_and_finds_posted_question():
+    """Test that a plan rebuilt mid-attempt resumes and reads the posted answer."""
+    plan = _plan(answered=[1, 2])
+    assert plan.take(('Easy', 'Hard')).id == 4
+    rebuilt = _plan(answered=[1])
+    assert rebuilt.answered_question({'question_2': 'A', 'answers': '{}'}) == 2
+    assert rebuilt.is_correct(2, 'A') and not rebuilt.is_correct(3, 'A')
+
+def test_store_evicts_oldest_plan():
+    """Test that the store keeps at most max_plans attempts."""
+    store = QuizPlanStore(max_plans=1)
+    store.put(_plan())
+    other = QuizPlan(11, 5, [])
+    store.put(other)
+    assert store.get(10) is None and store.get(11) is other
+
+def test_valid_answers_drops_unknown_questions_and_letters():
+    """Test that posted answers are limited to the plan's questions and option letters."""
+    plan = _plan()
+    posted = {'1': 'B', '2': 'Z', '99': 'A', 'x': 'A', 4: 'A', '3': None}
+    assert plan.valid_answers(posted) == {1: 'B', 4: 'A'}
+
+def test_item_ranks_follow_past_error_rates(app, db):
+    """Test that questions answered wrong more often rank harder, and unseen ones rank in the middle."""
+    instructor = User(email='rank-instructor@example.com', password_hash='x', role='instructor')
+    student = User(email='rank-student@example.com', password_hash='x', role='student')
+    db.session.add_all([instructor, student])
+    db.session.commit()
+    course = Course(title='Rank Course', instructor_id=instructor.id)
+    db.session.add(course)
+    db.session.commit()
+    quiz = Quiz(title='Rank Quiz', course_id=course.id)
+    db.session.add(quiz)
+    db.session.commit()
+    questions = [Question(quiz_id=quiz.id, question_text=f'Q{i}', options=json.dumps(['a', 'b']),
+                          correct_answer='a', difficulty='Easy') for i in range(3)]
+    db.session.add_all(questions)
+    submission = QuizSubmission(quiz_id=quiz.id, student_id=student.id,
+                                start_time=datetime.utcnow(), end_time=datetime.utcnow())
+    db.session.add(submission)
+    db.session.commit()
+    db.session.add_all([
+        QuizAnswer(submission_id=submission.id, question_id=questions[0].id, answer='A', is_correct=True),
+        QuizAnswer(submission_id=submission.id, question_id=questions[1].id, answer='B', is_correct=False),
+    ])
+    db.session.commit()
+    try:
+        ranks = item_ranks(quiz.id, [q.id for q in questions])
+        assert ranks[questions[0].id] < ranks[questions[2].id] == 0.5 < ranks[questions[1].id]
+    finally:
+        QuizAnswer.query.filter_by(submission_id=submission.id).delete()
+        db.session.delete(submission)
+        Question.query.filter_by(quiz_id=quiz.id).delete()
+        db.session.delete(quiz)
+        db.session.delete(course)
+        db.session.delete(instructor)
+        db.session.delete(student)
+        db.session.commit()
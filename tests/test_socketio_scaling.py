@@ -0,0 +1,56 @@
+import pytest
+from flask import Flask
+from services.socketio_scaling import (WorkerRing, LocalQueueManager, socketio_options, LOCAL_QUEUE_URL,
+                                       PROCESS_LOCAL_STATE, process_local_state_warning,
+                                       check_worker_config)
+
+def test_ring_routing_is_sticky():
+    """Test that a student always maps to the same worker."""
+    ring = WorkerRing(['http://w1', 'http://w2', 'http://w3'])
+    assert all(ring.owner(42) == ring.owner(42) for _ in range(10))
+
+def test_adding_worker_only_moves_some_students():
+    """Test that growing the pool keeps most students on their worker."""
+    before = WorkerRing(['a', 'b', 'c'])
+    after = WorkerRing(['a', 'b', 'c', 'd'])
+    moved = [sid for sid in range(1000) if before.owner(sid) != after.owner(sid)]
+    assert all(after.owner(sid) == 'd' for sid in moved)
+    assert len(moved) < 500
+
+def test_empty_ring_means_same_origin():
+    """Test that single-process deployments connect to their own origin."""
+    assert WorkerRing().owner(1) is None
+
+def test_local_queue_fans_out_to_all_subscribers():
+    """Test that an emit published by one manager reaches every worker's inbox."""
+    LocalQueueManager.reset('test-channel')
+    first = LocalQueueManager(channel='test-channel')
+    second = LocalQueueManager(channel='test-channel')
+    message = {'method': 'emit', 'event': 'behavior_update', 'data': {'focus': 1}}
+    first._publish(message)
+    assert second._inbox.popleft() == message
+    assert first._inbox.popleft() is not message
+    LocalQueueManager.reset('test-channel')
+
+def test_socketio_options():
+    """Test that the message queue setting selects the client manager."""
+    assert socketio_options({}) == {}
+    assert isinstance(socketio_options({'SOCKETIO_MESSAGE_QUEUE': LOCAL_QUEUE_URL})['client_manager'], LocalQueueManager)
+    assert socketio_options({'SOCKETIO_MESSAGE_QUEUE': 'redis://localhost:6379/0'})['message_queue'] == 'redis://localhost:6379/0'
+
+def test_process_local_state_warning_only_for_multiple_workers():
+    """Test that the sticky-HTTP warning names the per-process state once several workers are configured."""
+    assert process_local_state_warning({}) is None
+    assert process_local_state_warning({'SOCKETIO_WORKER_URLS': ['http://w1']}) is None
+    warning = process_local_state_warning({'SOCKETIO_WORKER_URLS': ['http://w1', 'http://w2']})
+    assert all(name in warning for name in PROCESS_LOCAL_STATE)
+
+def test_multiple_workers_require_sticky_http():
+    """Test that a multi-worker config without sticky HTTP routing refuses to start."""
+    app = Flask(__name__)
+    check_worker_config(app)
+    app.config['SOCKETIO_WORKER_URLS'] = ['http://w1', 'http://w2']
+    with pytest.raises(ValueError):
+        check_worker_config(app)
+    app.config['SOCKETIO_STICKY_HTTP'] = True
+    check_worker_config(app)